@@ -0,0 +1,199 @@
+import os
+import re
+import json
+import shutil
+import argparse
+from collections import namedtuple
+
+from data_source import LocalDataSource, write_atomic
+
+# Season archive for the AFL repo: the round data partitioned by season and
+# round, with a catalog the app reads first, so it only ever lists and opens the
+# partitions of the season being viewed. Older seasons cost nothing until a view
+# asks for them, however many the archive holds.
+#
+#   catalog.json                            seasons, their rounds and files, and the current round
+#   year=2024/round=20/<match folder>/...   one round, laid out as a Round_N folder
+#   year=2024/AFLFixtures2024.xlsx          the season's fixture
+#   year=2024/game_log.arrow                the season's game log (see game_log.py)
+#
+# A checkout without catalog.json has the flat layout (Round_N folders,
+# current_round.json and one AFLFixtures<year>.xlsx at the root) and is read as
+# a one-season catalog, so both layouts work while the repo moves over.
+#
+#   python archive.py migrate                        copy the flat layout into year=<year>/ and write the catalog
+#   python archive.py migrate --move                 move it instead
+#   python archive.py catalog --current-round 21     rescan the partitions and rewrite the catalog
+
+CATALOG_FILE = 'catalog.json'
+CURRENT_ROUND_FILE = 'current_round.json'
+GAME_LOG_FILE = 'game_log.arrow'
+# Bump when the catalog layout changes
+CATALOG_VERSION = 1
+
+ROUND_DIR = re.compile(r'Round_(\d+)')
+YEAR_PARTITION = re.compile(r'year=(\d{4})')
+ROUND_PARTITION = re.compile(r'round=(\d+)')
+FIXTURE_WORKBOOK = re.compile(r'AFLFixtures(\d{4})\.xlsx')
+
+# rounds: {round number: folder path}; fixture and game_log are paths in the AFL repo, players is the
+# workbook's name in AFLPlayerStatsRepo
+Season = namedtuple('Season', ['year', 'rounds', 'fixture', 'players', 'game_log'])
+
+
+def partition_path(year, round_number=None):
+    path = f'year={year}'
+    return path if round_number is None else f'{path}/round={round_number}'
+
+
+def players_file(year):
+    return f'AFLPlayers{year}.xlsx'
+
+
+def fixture_file(year):
+    return f'AFLFixtures{year}.xlsx'
+
+
+class Catalog:
+    def __init__(self, data):
+        self.flat = data.get('layout') == 'flat'
+        self.current_year = int(data['current']['year'])
+        self.current_round = int(data['current']['round'])
+        self.seasons = {}
+        for year, season in data['seasons'].items():
+            rounds = {int(number): path for number, path in season['rounds'].items()}
+            self.seasons[int(year)] = Season(int(year), dict(sorted(rounds.items())), season['fixture'],
+                                             season['players'], season.get('game_log'))
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(json.loads(data))
+
+    @classmethod
+    def from_flat(cls, root_contents, current_round):
+        # The flat layout as a one-season catalog; the season is the year of the fixture workbook
+        names = {entry.name for entry in root_contents if entry.type == 'file'}
+        years = [int(match.group(1)) for match in map(FIXTURE_WORKBOOK.fullmatch, names) if match]
+        if not years:
+            raise FileNotFoundError(f'no {CATALOG_FILE} and no AFLFixtures<year>.xlsx at the root')
+        year = max(years)
+        rounds = {int(match.group(1)): entry.path for entry in root_contents
+                  if entry.type == 'dir' and (match := ROUND_DIR.fullmatch(entry.name))}
+        return cls({'layout': 'flat', 'current': {'year': year, 'round': current_round},
+                    'seasons': {str(year): {'rounds': rounds, 'fixture': fixture_file(year),
+                                            'players': players_file(year),
+                                            'game_log': GAME_LOG_FILE if GAME_LOG_FILE in names else None}}})
+
+    def years(self):
+        # Newest first
+        return sorted(self.seasons, reverse=True)
+
+    def season(self, year):
+        return self.seasons[year]
+
+    def round_path(self, year, round_number):
+        # A round the catalog doesn't list yet is where it would be written
+        default = f'Round_{round_number}' if self.flat else partition_path(year, round_number)
+        return self.seasons[year].rounds.get(round_number, default)
+
+    def round_paths(self, year=None):
+        # Every round folder of one season, or of the whole archive
+        years = self.years() if year is None else [year]
+        return [path for year in years for path in self.seasons[year].rounds.values()]
+
+    def to_dict(self):
+        return {'catalog_version': CATALOG_VERSION,
+                'current': {'year': self.current_year, 'round': self.current_round},
+                'seasons': {str(year): {'rounds': {str(number): path for number, path in season.rounds.items()},
+                                        'fixture': season.fixture, 'players': season.players,
+                                        'game_log': season.game_log}
+                            for year, season in sorted(self.seasons.items())}}
+
+
+def load_catalog(source, root_contents=None):
+    # The source's catalog, or its flat layout read as one
+    root_contents = source.list_dir('') if root_contents is None else root_contents
+    if any(entry.name == CATALOG_FILE for entry in root_contents):
+        return Catalog.from_bytes(source.read_bytes(CATALOG_FILE))
+    current_round = json.loads(source.read_bytes(CURRENT_ROUND_FILE))['CURRENT_ROUND']
+    return Catalog.from_flat(root_contents, current_round)
+
+
+def scan_catalog(root, current_year=None, current_round=None):
+    # Catalog of the year=YYYY/round=N partitions under root; the current round defaults to the
+    # newest season's last round
+    source = LocalDataSource(root)
+    seasons = {}
+    for year_entry in source.list_dir(''):
+        year_match = YEAR_PARTITION.fullmatch(year_entry.name)
+        if year_entry.type != 'dir' or not year_match:
+            continue
+        year = int(year_match.group(1))
+        season_contents = source.list_dir(year_entry.path)
+        rounds = {int(match.group(1)): entry.path for entry in season_contents
+                  if entry.type == 'dir' and (match := ROUND_PARTITION.fullmatch(entry.name))}
+        names = {entry.name for entry in season_contents if entry.type == 'file'}
+        seasons[str(year)] = {'rounds': rounds, 'fixture': f'{year_entry.path}/{fixture_file(year)}',
+                              'players': players_file(year),
+                              'game_log': f'{year_entry.path}/{GAME_LOG_FILE}' if GAME_LOG_FILE in names else None}
+    if not seasons:
+        raise FileNotFoundError(f'no year=YYYY partitions under {root}')
+    if current_year is None:
+        current_year = max(map(int, seasons))
+    if current_round is None:
+        current_round = max(seasons[str(current_year)]['rounds'], default=0)
+    return Catalog({'current': {'year': current_year, 'round': current_round}, 'seasons': seasons})
+
+
+def write_catalog(root, catalog):
+    write_atomic(os.path.join(root, CATALOG_FILE), json.dumps(catalog.to_dict(), indent=2).encode('utf-8'))
+
+
+def migrate(root, move=False):
+    # Copies (or moves) the flat layout's rounds, fixture and game log into year=<year>/ and writes the
+    # catalog, keeping any seasons already partitioned. Returns the migrated season.
+    source = LocalDataSource(root)
+    root_contents = source.list_dir('')
+    flat = load_catalog(source, [entry for entry in root_contents if entry.name != CATALOG_FILE])
+    year = flat.current_year
+    season = flat.season(year)
+    transfer = shutil.move if move else shutil.copytree
+    for round_number, path in season.rounds.items():
+        target = os.path.join(root, partition_path(year, round_number))
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            transfer(os.path.join(root, path), target)
+    for name in filter(None, [season.fixture, season.game_log]):
+        target = os.path.join(root, partition_path(year), name)
+        if not os.path.exists(target):
+            (shutil.move if move else shutil.copy2)(os.path.join(root, name), target)
+    write_catalog(root, scan_catalog(root, year, flat.current_round))
+    return year
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Season/round partitioned archive of the AFL repo')
+    parser.add_argument('--root', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='local checkout of the AFL repo')
+    commands = parser.add_subparsers(dest='command', required=True)
+    migrate_parser = commands.add_parser('migrate', help='move the flat Round_N layout into year=<year>/round=N')
+    migrate_parser.add_argument('--move', action='store_true', help='move the folders instead of copying them')
+    catalog_parser = commands.add_parser('catalog', help=f'rescan the partitions and rewrite {CATALOG_FILE}')
+    catalog_parser.add_argument('--current-year', type=int, help='default: the newest season')
+    catalog_parser.add_argument('--current-round', type=int, help="default: the current season's last round")
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        year = migrate(args.root, move=args.move)
+        catalog = load_catalog(LocalDataSource(args.root))
+        print(f'{partition_path(year)}: {len(catalog.season(year).rounds)} rounds; '
+              f'current round {catalog.current_round}')
+    else:
+        catalog = scan_catalog(args.root, args.current_year, args.current_round)
+        write_catalog(args.root, catalog)
+        print(f'{CATALOG_FILE}: seasons {catalog.years()}; current {catalog.current_year} round '
+              f'{catalog.current_round}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# The partitioned archive (archive.py) as seasons are added: this checkout's
+# rounds migrated to year=2024/, plus copies of them as older seasons, served
+# through mock_github.py. For one season and for --seasons, a fresh process
+# loads the current round's page once and reports its wall time, the upstream
+# requests it made and its peak RSS; none of them should grow with
+# the older seasons, which are only read when picked.
+#
+#   python benchmarks/bench_archive.py --seasons 5
+import os
+import sys
+import json
+import resource
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import REPO_DIR, build_private_repo, configure_environment, make_app_test
+from mock_github import MockGitHub
+from archive import CURRENT_ROUND_FILE, migrate, partition_path, fixture_file, scan_catalog, write_catalog
+
+
+def load_page():
+    # The current round's page once, in this process: (seconds, peak RSS in MB, seasons offered)
+    app_test = make_app_test()
+    start = time.perf_counter()
+    app_test.run()
+    elapsed = time.perf_counter() - start
+    assert not app_test.exception, app_test.exception
+    seasons = [box.options for box in app_test.sidebar.selectbox if box.label == 'Season']
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, len(seasons[0]) if seasons else 1
+
+
+def load_in_process(archive_dir, work_dir):
+    # A fresh process against a mock serving archive_dir, so nothing is warm
+    mock = MockGitHub(archive_dir, 'hermclane/AFL')
+    url = mock.start()
+    env = dict(os.environ, AFL_DATA_SOURCE='github', AFL_GITHUB_API=url,
+               AFL_ROUND_STORE_DIR=os.path.join(work_dir, 'round_store'),
+               AFL_FIXTURE_INDEX=os.path.join(work_dir, 'fixture.arrow'),
+               AFL_PLAYER_INDEX=os.path.join(work_dir, 'no_index.arrow'),
+               AFL_PRERENDER_DIR=os.path.join(work_dir, 'no_prerender'))
+    try:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), '--load'], env=env, check=True,
+                                capture_output=True, text=True).stdout
+    finally:
+        mock.stop()
+    seconds, peak_mb, seasons = json.loads(output.strip().splitlines()[-1])
+    return {'seasons_offered': seasons, 'first_load_s': round(seconds, 2), 'upstream_requests': mock.counts['requests'],
+            'peak_rss_mb': round(peak_mb, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seasons', type=int, default=5)
+    parser.add_argument('--load', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.load:
+        print(json.dumps(load_page()))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        private_dir = os.path.join(tmp, 'private')
+        build_private_repo(private_dir)
+        configure_environment(private_dir)
+
+        archive_dir = os.path.join(tmp, 'archive')
+        os.makedirs(archive_dir)
+        for name in os.listdir(REPO_DIR):
+            if name.startswith('Round_'):
+                shutil.copytree(os.path.join(REPO_DIR, name), os.path.join(archive_dir, name))
+        for name in ('AFLFixtures2024.xlsx', CURRENT_ROUND_FILE):
+            shutil.copy2(os.path.join(REPO_DIR, name), archive_dir)
+        year = migrate(archive_dir, move=True)
+        catalog = scan_catalog(archive_dir)
+
+        results = {}
+        for seasons in sorted({1, args.seasons}):
+            # Older seasons are copies of this one
+            for older in range(year - seasons + 1, year):
+                season_dir = os.path.join(archive_dir, partition_path(older))
+                if not os.path.exists(season_dir):
+                    shutil.copytree(os.path.join(archive_dir, partition_path(year)), season_dir)
+                    os.rename(os.path.join(season_dir, fixture_file(year)), os.path.join(season_dir, fixture_file(older)))
+            write_catalog(archive_dir, scan_catalog(archive_dir, year, catalog.current_round))
+            results[seasons] = load_in_process(archive_dir, os.path.join(tmp, f'work_{seasons}'))
+
+    print(json.dumps({'rounds_per_season': len(catalog.season(year).rounds), 'by_seasons': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
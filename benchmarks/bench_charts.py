@@ -0,0 +1,222 @@
+# Chart spec cost per player: the inline Altair construction the page used to
+# run on every rerun (eight+ alt.Chart objects, alt.layer, to_dict() with schema
+# validation) vs charts.py (template built once, only datasets swapped in).
+# Both sides are timed up to the JSON Streamlit sends to the browser, and the
+# specs are checked to be identical apart from the dataset names.
+#
+#   python benchmarks/bench_charts.py --round 20 --players 40
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from io import BytesIO
+
+import altair as alt
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import REPO_DIR, build_private_repo, slugify
+from data_source import LocalDataSource
+from player_index import prepare_season_df
+import charts
+from charts import round_names, season_specs, previous_specs
+
+
+def legacy_season_charts(season_df, window, average_disposals, average_goals):
+    # The construction streamlit_app.py ran inline before charts.py
+    custom_axis = alt.Axis(title="Round", titleFontSize=25, labelFontSize=17, labelAngle=0)
+    line_chart = alt.Chart(season_df).mark_line(color="#488f31", strokeWidth=3).encode(
+        x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),
+        y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40, labelFontSize=17)))
+    point_chart = alt.Chart(season_df).mark_point(size=300, color="#488f31", strokeWidth=4, filled=True).encode(
+        x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),
+        y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40)),
+        tooltip=[alt.Tooltip(field="Round", title="Round"), alt.Tooltip(field="D", title="Disposals")])
+    goals_line_chart = alt.Chart(season_df).mark_line(color="#488f31", strokeWidth=3).encode(
+        x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),
+        y=alt.Y("G", axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, titleFontSize=30, labelFontSize=17,
+                                   format='d')))
+    goals_point_chart = alt.Chart(season_df).mark_point(size=300, color="#488f31", strokeWidth=3, filled=True).encode(
+        x=alt.X('DisplayRound:N', sort=round_names), y=alt.Y("G", scale=alt.Scale(nice=False)),
+        tooltip=[alt.Tooltip("Round", title="Round"), alt.Tooltip("G", title="Goals")])
+    behinds_point_chart = alt.Chart(season_df).mark_point(size=100, color="#f54242", filled=True).encode(
+        x=alt.X('DisplayRound:N', sort=round_names),
+        y=alt.Y("B", axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, titleFontSize=30, labelFontSize=17,
+                                   format='d')),
+        tooltip=[alt.Tooltip("Round", title="Round"), alt.Tooltip("B", title="Behinds")])
+    average_disposals_rule = alt.Chart(pd.DataFrame({f'{window} Disposals': [average_disposals]})).mark_rule(
+        color="#AEC6CF", strokeWidth=2.5, strokeDash=[5, 5]).encode(y=f'{window} Disposals:Q')
+    average_goals_rule = alt.Chart(pd.DataFrame({f'{window} Goals': [average_goals]})).mark_rule(
+        color="#AEC6CF", strokeWidth=2.5, strokeDash=[5, 5]).encode(y=f'{window} Goals:Q')
+    return (alt.layer(line_chart, point_chart, average_disposals_rule),
+            alt.layer(goals_line_chart, goals_point_chart, behinds_point_chart, average_goals_rule))
+
+
+def year_scale(previous_df, nice):
+    # The x domain the page now derives from the games (charts._with_year_domain) instead of 2021-2025
+    dates = previous_df['Date'].dropna()
+    if dates.empty:
+        return alt.Scale(nice=nice)
+    return alt.Scale(domain=[alt.DateTime(year=int(dates.min().year)), alt.DateTime(year=int(dates.max().year) + 1)],
+                     nice=nice)
+
+
+def legacy_previous_charts(previous_df, opponent, average_disposals, average_goals):
+    custom_axis = alt.Axis(title='Year', titleFontSize=25, tickCount=5, labelExpr="year(datum.value)",
+                           labelFontSize=20)
+    tooltip = [alt.Tooltip(field="Year", title="Year"), alt.Tooltip(field="Round", title="Round")]
+    disposal_chart = alt.Chart(previous_df).mark_point(size=300, color="#488f31", strokeWidth=4, filled=True).encode(
+        x=alt.X('Date:T', axis=custom_axis, scale=year_scale(previous_df, True)),
+        y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40)),
+        tooltip=tooltip + [alt.Tooltip(field="D", title="Disposals")])
+    disposal_line_chart = alt.Chart(previous_df).mark_line(color="#488f31", strokeWidth=3).encode(
+        x=alt.X('Date:T', axis=custom_axis),
+        y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40)))
+    goals_chart = alt.Chart(previous_df).mark_point(size=300, color="#488f31", strokeWidth=4, filled=True).encode(
+        x=alt.X('Date:T', axis=custom_axis, scale=year_scale(previous_df, True)),
+        y=alt.Y("G", axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, format='d', tickCount=5,
+                                   titleFontSize=30), scale=alt.Scale(domainMin=0, nice=False)),
+        tooltip=tooltip + [alt.Tooltip(field="G", title="Goals")])
+    goals_line_chart = alt.Chart(previous_df).mark_line(color="#488f31", strokeWidth=3).encode(
+        x=alt.X('Date:T', axis=custom_axis, scale=year_scale(previous_df, True)),
+        y=alt.Y("G", axis=alt.Axis(labelAngle=0, format='d', tickCount=5, titleFontSize=30)))
+    behinds_chart = alt.Chart(previous_df).mark_circle(size=100, color="#f54242").encode(
+        x=alt.X('Date:T', axis=custom_axis, scale=year_scale(previous_df, False)),
+        y=alt.Y("B", axis=alt.Axis(title="Goals 🟢 Behinds 🔴", format='d', tickCount=5, titleFontSize=30),
+                scale=alt.Scale(domainMin=0, nice=False)),
+        tooltip=tooltip + [alt.Tooltip(field="B", title="Behinds")])
+    average_disposals_rule = alt.Chart(pd.DataFrame({f'Average Disposals vs {opponent}': [average_disposals]})).mark_rule(
+        color="#AEC6CF", strokeWidth=2.5, strokeDash=[5, 5]).encode(y=f'Average Disposals vs {opponent}:Q')
+    average_goals_rule = alt.Chart(pd.DataFrame({f'Average Goals vs {opponent}': [average_goals]})).mark_rule(
+        color="#AEC6CF", strokeWidth=2.5, strokeDash=[5, 5]).encode(y=f'Average Goals vs {opponent}:Q')
+    combined_disposal_chart = alt.layer(disposal_line_chart, disposal_chart, average_disposals_rule)
+    combined_chart = alt.layer(goals_chart, behinds_chart, goals_line_chart, average_goals_rule)
+    return (combined_disposal_chart.configure_axisY(labelFontSize=20, titleFontSize=20),
+            combined_chart.configure_axisY(labelFontSize=30, titleFontSize=20))
+
+
+def altair_to_json(chart):
+    # What st.altair_chart does: swap the data for named references, validate and serialize
+    datasets = {}
+
+    def id_transform(data):
+        name = str(id(data))
+        datasets[name] = data
+        return {'name': name}
+
+    alt.data_transformers.register('bench_id', id_transform)
+    with alt.data_transformers.enable('bench_id'):
+        spec = chart.to_dict()
+    spec.pop('datasets', None)
+    return spec, json.dumps(spec), datasets
+
+
+def spec_to_json(spec):
+    # What st.vega_lite_chart does with a spec whose data is in 'datasets'
+    spec = dict(spec)
+    datasets = spec.pop('datasets')
+    return spec, json.dumps(spec), datasets
+
+
+def normalized(spec):
+    # Rename datasets in order of first appearance, so the two paths can be compared
+    names = {}
+
+    def walk(value):
+        if isinstance(value, dict):
+            if set(value) == {'name'}:
+                return {'name': names.setdefault(value['name'], f'data{len(names)}')}
+            return {key: walk(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [walk(item) for item in value]
+        return value
+    return walk(spec)
+
+
+def sample_players(round_dir, season_dir, limit):
+    # (season_df, previous_df, opponent, averages) for players in the round's matches
+    source = LocalDataSource(REPO_DIR)
+    season_files = {name[:-len('.csv')]: os.path.join(root, name)
+                    for root, _, names in os.walk(season_dir) for name in names if name.endswith('.csv')}
+    players = []
+    for match in source.list_dir(round_dir):
+        if match.type != 'dir':
+            continue
+        home, away = match.name.split(' vs ')
+        for team, opponent in ((home, away), (away, home)):
+            previous_path = f'{match.path}/{team} Previous H2H Games.csv'
+            previous_all = pd.read_csv(BytesIO(source.read_bytes(previous_path)), parse_dates=['Date'], dayfirst=True)
+            previous_all['Year'] = previous_all['Year'].astype(str)
+            for player, previous_df in previous_all.groupby('Player Name'):
+                if slugify(player) not in season_files:
+                    continue
+                season_df = prepare_season_df(pd.read_csv(season_files[slugify(player)]))
+                # As in the player index, Round is text (finals are named)
+                season_df['Round'] = season_df['Round'].astype(str)
+                players.append((season_df, previous_df, opponent, (season_df['D'].mean(), season_df['G'].mean()),
+                                (previous_df['D'].mean(), previous_df['G'].mean())))
+                if len(players) >= limit:
+                    return players
+    return players
+
+
+def time_path(players, window, build):
+    times = []
+    for season_df, previous_df, opponent, season_averages, previous_averages in players:
+        start = time.perf_counter()
+        build(season_df, previous_df, opponent, season_averages, previous_averages)
+        times.append((time.perf_counter() - start) * 1000)
+    return {'mean_ms': round(statistics.mean(times), 3), 'p95_ms': round(sorted(times)[int(0.95 * (len(times) - 1))], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--round', type=int, default=20)
+    parser.add_argument('--players', type=int, default=40)
+    parser.add_argument('--window', default='Season Average')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as season_dir:
+        build_private_repo(season_dir)
+        players = sample_players(f'Round_{args.round}', season_dir, args.players)
+
+    window = args.window
+
+    def legacy(season_df, previous_df, opponent, season_averages, previous_averages):
+        charts = legacy_season_charts(season_df, window, *season_averages)
+        charts += legacy_previous_charts(previous_df, opponent, *previous_averages)
+        return [altair_to_json(chart) for chart in charts]
+
+    def factory(season_df, previous_df, opponent, season_averages, previous_averages):
+        specs = season_specs(season_df, window, *season_averages)
+        specs += previous_specs(previous_df, opponent, *previous_averages)
+        return [spec_to_json(spec) for spec in specs]
+
+    # Both paths must send the browser the same chart
+    for player in players:
+        for (old_spec, _, _), (new_spec, _, _) in zip(legacy(*player), factory(*player)):
+            assert normalized(old_spec) == normalized(new_spec), 'chart specs differ'
+
+    for cached in (charts._season_base, charts._previous_base, charts.season_templates, charts.previous_templates):
+        cached.cache_clear()
+    start = time.perf_counter()
+    factory(*players[0])
+    first_ms = (time.perf_counter() - start) * 1000
+
+    report = {
+        'players': len(players),
+        'charts_per_player': 4,
+        'legacy': time_path(players, window, legacy),
+        'factory': time_path(players, window, factory),
+        'factory_first_build_ms': round(first_ms, 3),
+    }
+    report['speedup'] = round(report['legacy']['mean_ms'] / report['factory']['mean_ms'], 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+# Parse time for every CSV in the repo (all Round_N folders: averages, H2H games,
+# H2H results), plus the stand-in player season files: the pd.read_csv calls the
+# loaders used to make vs the typed pyarrow reads from csv_schema.py. The bytes
+# are read up front, so only parsing is timed; each variant is the best of
+# --repeat passes. Every typed frame is checked against the pandas one.
+#
+#   python benchmarks/bench_csv_ingest.py --repeat 3
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import tempfile
+from io import BytesIO
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import REPO_DIR, build_private_repo
+from round_store import classify_csv
+from player_index import drop_columns_2024
+from csv_schema import SCHEMAS, read_csv
+
+
+def pandas_read(data, kind):
+    # What the loaders did before csv_schema.py
+    if kind == 'h2h_games':
+        return pd.read_csv(BytesIO(data), parse_dates=['Date'], dayfirst=True)
+    df = pd.read_csv(BytesIO(data))
+    if kind == 'h2h_results':
+        df['Date'] = pd.to_datetime(df['Date'])
+    elif kind == 'season':
+        df['Date'] = pd.to_datetime(df['Date'], dayfirst=True)
+        df = df.drop(columns=drop_columns_2024)
+    return df
+
+
+def pandas_pyarrow_read(data, kind):
+    # The pyarrow engine on its own, still inferring every type
+    return pd.read_csv(BytesIO(data), engine='pyarrow')
+
+
+def best_of(repeat, files, read):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for kind, data in files:
+            read(data, kind)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def check_same_values(files):
+    for kind, data in files:
+        expected, typed = pandas_read(data, kind), read_csv(data, kind)
+        if 'Round' in expected:
+            expected['Round'] = expected['Round'].astype(str)
+        pd.testing.assert_frame_equal(typed, expected[SCHEMAS[kind].columns], check_dtype=False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    repo_files = []
+    for path in sorted(glob.glob(os.path.join(REPO_DIR, 'Round_*', '**', '*.csv'), recursive=True)):
+        kind = classify_csv(os.path.basename(path))[0]
+        with open(path, 'rb') as f:
+            repo_files.append((kind, f.read()))
+    with tempfile.TemporaryDirectory() as private_dir:
+        build_private_repo(private_dir)
+        season_files = []
+        for path in sorted(glob.glob(os.path.join(private_dir, '*', '*.csv'))):
+            with open(path, 'rb') as f:
+                season_files.append(('season', f.read()))
+
+    check_same_values(repo_files + season_files)
+
+    groups = {kind: [file for file in repo_files if file[0] == kind] for kind in ('average', 'h2h_games', 'h2h_results')}
+    groups['all repo CSVs'] = repo_files
+    groups['season (stand-in)'] = season_files
+    results = {}
+    for name, files in groups.items():
+        pandas_s = best_of(args.repeat, files, pandas_read)
+        engine_s = best_of(args.repeat, files, pandas_pyarrow_read)
+        typed_s = best_of(args.repeat, files, read_csv)
+        results[name] = {'files': len(files), 'MB': round(sum(len(data) for _, data in files) / 2 ** 20, 2),
+                         'pandas_ms': round(pandas_s * 1000, 1),
+                         'pandas_pyarrow_engine_ms': round(engine_s * 1000, 1),
+                         'typed_pyarrow_ms': round(typed_s * 1000, 1),
+                         'speedup': round(pandas_s / typed_s, 2)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+# Cold-load wall time for a full round: every match folder listing plus every CSV
+# parsed, the same work the app does across all match selections.
+#
+#   python benchmarks/bench_data_source.py --round 20
+#
+# The GitHub backend (the original per-file contents API path) is only timed when
+# GITHUB_TOKEN is set.
+import os
+import sys
+import time
+import json
+import shutil
+import argparse
+import tempfile
+from io import BytesIO
+
+import pandas as pd
+from dotenv import load_dotenv
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_source import DataSource, LocalDataSource, GitHubDataSource, MirrorDataSource
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CountingDataSource(DataSource):
+    # Counts the calls that reach the wrapped backend
+    def __init__(self, inner):
+        self.inner = inner
+        self.list_calls = 0
+        self.read_calls = 0
+
+    def list_dir(self, path=''):
+        self.list_calls += 1
+        return self.inner.list_dir(path)
+
+    def read_bytes(self, path):
+        self.read_calls += 1
+        return self.inner.read_bytes(path)
+
+
+def load_round(source, round_path):
+    frames = 0
+    for entry in source.list_dir(round_path):
+        if entry.type == 'dir':
+            for file in source.list_dir(entry.path):
+                if file.name.endswith('.csv'):
+                    pd.read_csv(BytesIO(source.read_bytes(file.path)))
+                    frames += 1
+        elif entry.name.endswith('H2H Results.csv'):
+            pd.read_csv(BytesIO(source.read_bytes(entry.path)))
+            frames += 1
+    return frames
+
+
+def time_load(name, source, round_path):
+    counting = CountingDataSource(source)
+    start = time.perf_counter()
+    frames = load_round(counting, round_path)
+    elapsed = time.perf_counter() - start
+    return {'backend': name, 'seconds': round(elapsed, 4), 'frames': frames,
+            'upstream_list_calls': counting.list_calls, 'upstream_read_calls': counting.read_calls}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--round', type=int, default=None)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    load_dotenv()
+    if args.round is None:
+        with open(os.path.join(REPO_DIR, 'current_round.json')) as f:
+            args.round = json.load(f)['CURRENT_ROUND']
+    round_path = f"Round_{args.round}"
+
+    results = [time_load('local', LocalDataSource(REPO_DIR), round_path)]
+
+    token = os.getenv('GITHUB_TOKEN')
+    if token:
+        from github import Github
+        upstream = GitHubDataSource(Github(token).get_repo('hermclane/AFL'))
+        results.append(time_load('github', upstream, round_path))
+    else:
+        upstream = LocalDataSource(REPO_DIR)
+        print("GITHUB_TOKEN not set: skipping the GitHub backend, mirror reads through the local checkout",
+              file=sys.stderr)
+
+    mirror_dir = tempfile.mkdtemp(prefix='afl-mirror-')
+    try:
+        counting_upstream = CountingDataSource(upstream)
+        mirror = MirrorDataSource(counting_upstream, mirror_dir)
+        for label in ('mirror (cold)', 'mirror (warm)'):
+            before = (counting_upstream.list_calls, counting_upstream.read_calls)
+            result = time_load(label, mirror, round_path)
+            result['upstream_list_calls'] = counting_upstream.list_calls - before[0]
+            result['upstream_read_calls'] = counting_upstream.read_calls - before[1]
+            results.append(result)
+    finally:
+        shutil.rmtree(mirror_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({'round': args.round, 'results': results}, indent=2))
+    else:
+        print(f"Round {args.round}")
+        print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+# Fixture load on a fresh server process: parsing AFLFixtures2024.xlsx with
+# pd.read_excel (what read_fixture() did) vs loading the compiled Arrow file
+# (fixture_index.py), plus the per-match header lookups each way: boolean scans
+# and a strptime round trip vs one dict hit. The header fields are checked to
+# agree for every match in the fixture.
+#
+#   python benchmarks/bench_fixture.py --repeat 5
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+from io import BytesIO
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import REPO_DIR
+from fixture_index import compile_fixture, write_fixture_index, FixtureIndex
+
+WORKBOOK = 'AFLFixtures2024.xlsx'
+
+
+def scan_header(fixture_df, round_number, match_string):
+    # The per-match lookups the page used to do
+    round_df = fixture_df[fixture_df["Round Number"] == round_number]
+    matching_row = round_df[round_df["Match String"] == match_string]
+    game_datetime_np = round_df.loc[round_df['Match String'] == match_string, 'Date'].values[0]
+    game_datetime_obj = datetime.strptime(game_datetime_np.astype(str)[:-3], '%Y-%m-%dT%H:%M:%S.%f')
+    location = round_df.loc[round_df['Match String'] == match_string, 'Location'].values[0]
+    return (matching_row["Home Team"].iloc[0], matching_row["Away Team"].iloc[0],
+            matching_row["Home Team url"].iloc[0], matching_row["Away Team url"].iloc[0], location,
+            game_datetime_obj.strftime('%A, %I:%M %p'))
+
+
+def dict_header(fixture_index, round_number, match_string):
+    match = fixture_index.match(round_number, match_string)
+    return (match.home_team, match.away_team, match.home_team_url, match.away_team_url, match.location,
+            match.day_time)
+
+
+def best_ms(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_DIR, WORKBOOK), 'rb') as f:
+        data = f.read()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'fixture.arrow')
+        compile_ms, table = best_ms(lambda: compile_fixture(data), 1)
+        write_fixture_index(table, path, 'bench')
+        xlsx_ms, fixture_df = best_ms(lambda: pd.read_excel(BytesIO(data)), args.repeat)
+        arrow_ms, fixture_index = best_ms(lambda: FixtureIndex.load(path), args.repeat)
+        artifact_bytes = os.path.getsize(path)
+
+    keys = list(zip(fixture_df['Round Number'], fixture_df['Match String']))
+    scan_ms, scanned = best_ms(lambda: [scan_header(fixture_df, *key) for key in keys], args.repeat)
+    dict_ms, looked_up = best_ms(lambda: [dict_header(fixture_index, *key) for key in keys], args.repeat)
+    assert scanned == looked_up, 'header fields differ'
+
+    print(json.dumps({'matches': len(keys), 'artifact_bytes': artifact_bytes,
+                      'compile_ms': round(compile_ms, 3), 'read_excel_ms': round(xlsx_ms, 3),
+                      'arrow_load_ms': round(arrow_ms, 3), 'parse_ms_saved': round(xlsx_ms - arrow_ms, 3),
+                      'scan_lookup_us_per_match': round(scan_ms * 1000 / len(keys), 3),
+                      'dict_lookup_us_per_match': round(dict_ms * 1000 / len(keys), 3)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+# The canonical game log (game_log.py) against the per-match H2H games files it
+# replaces, over every Round_N folder in this checkout:
+#   - stored bytes and rows: the CSVs vs one log
+#   - every "<Team> Previous H2H Games.csv" is re-derived from the log and must
+#     match the parsed CSV row for row
+#   - bringing the log up to date after a new round reads only that round's files
+#   - per-match load time: derive from the log vs parse the two CSVs
+#
+#   python benchmarks/bench_game_log.py
+import os
+import sys
+import json
+import time
+import tempfile
+import statistics
+from io import BytesIO
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import REPO_DIR
+from bench_data_source import CountingDataSource
+from data_source import LocalDataSource
+from game_log import GameLog, build_game_log, h2h_versions
+from archive import load_catalog
+from csv_schema import H2H_GAMES_COLUMNS
+
+
+class WithoutRound(LocalDataSource):
+    # The checkout as it was before `round_path` was added
+    def __init__(self, root, round_path):
+        super().__init__(root)
+        self.round_path = round_path
+
+    def list_dir(self, path=''):
+        return [entry for entry in super().list_dir(path) if entry.path != self.round_path]
+
+
+def read_csv_games(source, path):
+    df = pd.read_csv(BytesIO(source.read_bytes(path)), parse_dates=['Date'], dayfirst=True)
+    df['Round'] = df['Round'].astype(str)
+    return df
+
+
+def main():
+    source = LocalDataSource(REPO_DIR)
+    catalog = load_catalog(source)
+    round_paths = catalog.round_paths(catalog.current_year)
+    versions = h2h_versions(source, round_paths)
+    csv_bytes = sum(os.path.getsize(os.path.join(REPO_DIR, *path.split('/'))) for path in versions)
+    csv_rows = sum(len(read_csv_games(source, path)) for path in versions)
+    rounds = sorted({path.split('/')[0] for path in versions}, key=lambda name: int(name.split('_')[1]))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, 'game_log.arrow')
+        start = time.perf_counter()
+        build_game_log(source, log_path, round_paths=round_paths)
+        build_s = time.perf_counter() - start
+        log_bytes = os.path.getsize(log_path)
+        game_log = GameLog.open(log_path)
+
+        # Every file, re-derived
+        for path in versions:
+            round_path, match, file_name = path.split('/')
+            derived = game_log.match_games(round_path, match)[file_name.replace(' H2H Games.csv', '')]
+            derived = derived.astype({column: object for column in derived.columns
+                                      if derived[column].dtype == 'category'})
+            pd.testing.assert_frame_equal(derived[H2H_GAMES_COLUMNS], read_csv_games(source, path)[H2H_GAMES_COLUMNS],
+                                          check_dtype=False)
+
+        # The latest round arrives
+        incremental_path = os.path.join(tmp, 'incremental.arrow')
+        build_game_log(WithoutRound(REPO_DIR, rounds[-1]), incremental_path,
+                       round_paths=[path for path in round_paths if path != rounds[-1]])
+        counting = CountingDataSource(source)
+        start = time.perf_counter()
+        files_read, games = build_game_log(counting, incremental_path, GameLog.open(incremental_path),
+                                           round_paths=round_paths)
+        update_s = time.perf_counter() - start
+        assert games == len(game_log) and counting.read_calls == files_read
+        assert files_read == sum(1 for path in versions if path.startswith(rounds[-1] + '/'))
+
+        matches = sorted({tuple(path.split('/')[:2]) for path in versions if path.startswith(rounds[-1] + '/')})
+        csv_ms, log_ms = [], []
+        for round_path, match in matches:
+            paths = [path for path in versions if path.startswith(f'{round_path}/{match}/')]
+            start = time.perf_counter()
+            for path in paths:
+                read_csv_games(source, path)
+            csv_ms.append((time.perf_counter() - start) * 1000)
+            start = time.perf_counter()
+            game_log.match_games(round_path, match)
+            log_ms.append((time.perf_counter() - start) * 1000)
+
+    print(json.dumps({
+        'rounds': len(rounds),
+        'h2h_files': len(versions),
+        'storage': {'csv_bytes': csv_bytes, 'csv_rows': csv_rows, 'log_bytes': log_bytes, 'log_games': len(game_log),
+                    'bytes_ratio': round(csv_bytes / log_bytes, 2)},
+        'full_build_s': round(build_s, 2),
+        f'update_for_{rounds[-1]}': {'files_read': files_read, 'seconds': round(update_s, 2)},
+        'per_match_ms': {'parse_csvs': round(statistics.median(csv_ms), 2),
+                         'derive_from_log': round(statistics.median(log_ms), 2)},
+        'all_files_match': True,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+# FetchClient (http_client.py) against the local mock GitHub API
+# (mock_github.py), serving a scratch copy of the current round. The script
+# checks each behaviour and times the fetches:
+#   - one pass over the round, pooled client vs a new connection per request
+#   - a second pass: every file revalidates as a 304 and the rate limit isn't touched
+#   - injected 502s and a 429 with Retry-After are retried transparently
+#   - with the limit nearly spent, requests wait for the window to reset instead of failing,
+#     and RateLimited is raised once the reset is further away than max_wait
+#   - retries running out raise RateLimited after 429s and UpstreamError after 5xx;
+#     a 403 with Retry-After (the secondary rate limit) is retried, other 4xx raise UpstreamError
+#   - a missing file raises FileNotFoundError
+#   - TreeSync through GitHubRestDataSource mirrors the round byte for byte
+#
+#   python benchmarks/bench_http_client.py --latency-ms 5
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import REPO_DIR
+from mock_github import MockGitHub
+from http_client import FetchClient, RateLimiter, RateLimited, UpstreamError
+from data_source import GitHubRestDataSource, MirrorDataSource
+from tree_sync import TreeSync
+
+
+def round_paths(source, round_path):
+    paths = []
+    for entry in source.list_dir(round_path):
+        if entry.type == 'dir':
+            paths.extend(file.path for file in source.list_dir(entry.path))
+        else:
+            paths.append(entry.path)
+    return paths
+
+
+def timed(mock, run):
+    before = dict(mock.counts)
+    start = time.perf_counter()
+    run()
+    counts = {key: mock.counts[key] - before.get(key, 0) for key in ('requests', 'connections', 200, 304)}
+    return dict(seconds=round(time.perf_counter() - start, 3), **{str(key): value for key, value in counts.items()})
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency-ms', type=float, default=5)
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_DIR, 'current_round.json')) as f:
+        round_path = f"Round_{json.load(f)['CURRENT_ROUND']}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        upstream_dir = os.path.join(tmp, 'upstream')
+        shutil.copytree(os.path.join(REPO_DIR, round_path), os.path.join(upstream_dir, round_path))
+        for name in ('current_round.json', 'AFLFixtures2024.xlsx'):
+            shutil.copy(os.path.join(REPO_DIR, name), upstream_dir)
+        mock = MockGitHub(upstream_dir, latency=args.latency_ms / 1000)
+        base_url = mock.start()
+        try:
+            client = FetchClient(base_url)
+            source = GitHubRestDataSource(client, mock.full_name)
+            paths = round_paths(source, round_path)
+            results = {}
+
+            def unpooled():
+                for path in paths:
+                    requests.get(f"{base_url}/repos/{mock.full_name}/contents/{path}",
+                                 headers={'Accept': 'application/vnd.github.raw', 'Connection': 'close'})
+            results['new connection per request'] = timed(mock, unpooled)
+            results['pooled (cold)'] = timed(mock, lambda: [source.read_bytes(path) for path in paths])
+            remaining = client.rate_limiter.remaining
+            results['pooled (revalidate)'] = timed(mock, lambda: [source.read_bytes(path) for path in paths])
+            assert results['pooled (revalidate)']['304'] == len(paths), 'unchanged files should come back as 304'
+            assert client.rate_limiter.remaining == remaining, '304s should not use up the rate limit'
+
+            # An edited file is fetched again, the rest stay 304
+            with open(os.path.join(upstream_dir, *paths[0].split('/')), 'ab') as f:
+                f.write(b'\n')
+            results['pooled (1 file changed)'] = timed(mock, lambda: [source.read_bytes(path) for path in paths])
+            assert results['pooled (1 file changed)']['200'] == 1
+
+            retries = client.counts['retries']
+            mock.fail_next(2, status=502)
+            mock.fail_next(1, status=429, retry_after=1)
+            start = time.perf_counter()
+            client.get_json(f"repos/{mock.full_name}/contents/{round_path}")
+            results['502, 502, 429 then ok'] = {'retries': client.counts['retries'] - retries,
+                                                'seconds': round(time.perf_counter() - start, 3)}
+            assert client.counts['retries'] - retries == 3
+
+            # Limit nearly spent, resetting in 2 s: the client holds back rather than tripping a 403
+            limited = FetchClient(base_url, rate_limiter=RateLimiter(reserve=5, max_wait=10))
+            limited_source = GitHubRestDataSource(limited, mock.full_name)
+            mock.set_rate_limit(remaining=20, reset_in=2)
+            start = time.perf_counter()
+            for path in paths[:40]:
+                limited_source.read_bytes(path)
+            results['rate limit wait'] = dict(limited.rate_limiter.stats(), seconds=round(time.perf_counter() - start, 3),
+                                              forbidden=mock.counts[403])
+            assert limited.rate_limiter.waits >= 1 and mock.counts[403] == 0
+
+            impatient = FetchClient(base_url, rate_limiter=RateLimiter(reserve=5, max_wait=1))
+            mock.set_rate_limit(remaining=5, reset_in=30)
+            impatient.get_json(f"repos/{mock.full_name}/contents/{round_path}")
+            try:
+                impatient.get_bytes(f"repos/{mock.full_name}/contents/{paths[0]}")
+                raise AssertionError('expected RateLimited')
+            except RateLimited as e:
+                results['rate limit beyond max_wait'] = str(e)
+            mock.set_rate_limit(remaining=5000, reset_in=3600)
+
+            # Retries running out surface as the public exceptions, never the internal retry signal
+            short = FetchClient(base_url, max_attempts=2)
+            mock.fail_next(2, status=503)
+            try:
+                short.get_bytes(f"repos/{mock.full_name}/contents/{paths[0]}")
+                raise AssertionError('expected UpstreamError')
+            except RateLimited:
+                raise AssertionError('a 5xx burst is not a rate limit')
+            except UpstreamError as e:
+                results['5xx beyond max_attempts'] = str(e)
+            mock.fail_next(2, status=429, retry_after=0)
+            try:
+                short.get_bytes(f"repos/{mock.full_name}/contents/{paths[0]}")
+                raise AssertionError('expected RateLimited')
+            except RateLimited as e:
+                results['429 beyond max_attempts'] = str(e)
+            retries = short.counts['retries']
+            mock.fail_next(1, status=403, retry_after=0)
+            short.get_bytes(f"repos/{mock.full_name}/contents/{paths[0]}")
+            assert short.counts['retries'] - retries == 1, 'a secondary rate limit should be retried'
+            mock.fail_next(1, status=401)
+            try:
+                short.get_bytes(f"repos/{mock.full_name}/contents/{paths[0]}")
+                raise AssertionError('expected UpstreamError')
+            except RateLimited:
+                raise AssertionError('a 401 is not a rate limit')
+            except UpstreamError as e:
+                results['401'] = str(e)
+
+            try:
+                source.read_bytes(f"{round_path}/missing.csv")
+                raise AssertionError('expected FileNotFoundError')
+            except FileNotFoundError:
+                pass
+
+            mirror = MirrorDataSource(GitHubRestDataSource(client, mock.full_name), os.path.join(tmp, 'mirror'))
+            sync = TreeSync(mirror).sync_current_round()
+            results['tree sync'] = {'fetched': sync.fetched, 'requests': sync.requests}
+            for path in paths:
+                with open(os.path.join(upstream_dir, *path.split('/')), 'rb') as f:
+                    assert mirror.local.read_bytes(path) == f.read(), f'{path} differs'
+
+            results['client'] = client.stats()
+        finally:
+            mock.stop()
+
+    print(json.dumps({'round': round_path, 'files': len(paths), 'latency_ms': args.latency_ms,
+                      'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
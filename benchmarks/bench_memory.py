@@ -0,0 +1,120 @@
+# Memory held by one match session's frames (the 8 averages tables, the
+# previous H2H games, the players workbook and the season frame of every player
+# in either squad), and by the whole round once every match has been viewed, with
+# the default pandas dtypes vs the compact ones from schema.py. Shared category
+# dictionaries are counted once (see frames_nbytes). The season files come from
+# the synthetic player repo in standin.py.
+#
+#   python benchmarks/bench_memory.py --round 20
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import REPO_DIR, build_private_repo, slugify, team_urls
+from bench_round_store import load_match_csv
+from data_source import LocalDataSource
+from player_index import prepare_season_df
+from schema import CategoryRegistry, compact, compact_dict, frame_nbytes, frames_nbytes
+
+
+def load_session(source, private_dir, match_path, players_df, urls):
+    csv_dict, csv_dict_H2H = load_match_csv(source, match_path)
+    seasons = {}
+    for csv_name, csv_df in csv_dict.items():
+        team = next(team for team in urls if csv_name.startswith(f'{team} '))
+        for player in csv_df['Player']:
+            path = os.path.join(private_dir, urls[team], f'{slugify(player)}.csv')
+            if (team, player) not in seasons and os.path.exists(path):
+                seasons[team, player] = prepare_season_df(pd.read_csv(path))
+    return {'csv_dict': csv_dict, 'csv_dict_H2H': csv_dict_H2H, 'players_df': players_df, 'seasons': seasons}
+
+
+def compact_session(session, players_df, categories):
+    return {'csv_dict': compact_dict(session['csv_dict'], categories),
+            'csv_dict_H2H': compact_dict(session['csv_dict_H2H'], categories),
+            'players_df': players_df,
+            'seasons': compact_dict(session['seasons'], categories)}
+
+
+def frame_pairs(raw, typed):
+    if isinstance(raw, pd.DataFrame):
+        yield raw, typed
+    elif isinstance(raw, dict):
+        for key in raw:
+            yield from frame_pairs(raw[key], typed[key])
+    else:
+        for raw_item, typed_item in zip(raw, typed):
+            yield from frame_pairs(raw_item, typed_item)
+
+
+def check_same_values(raw, typed):
+    for raw_df, typed_df in frame_pairs(raw, typed):
+        pd.testing.assert_frame_equal(raw_df, typed_df.astype({column: object for column in typed_df.columns
+                                                                if typed_df[column].dtype == 'category'}),
+                                      check_dtype=False)
+
+
+def deep_usage(session):
+    # What DataFrame.memory_usage(deep=True) reports, summed frame by frame
+    return sum(int(raw_df.memory_usage(deep=True).sum()) for raw_df, _ in frame_pairs(session, session))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--round', type=int)
+    args = parser.parse_args()
+
+    if args.round is None:
+        with open(os.path.join(REPO_DIR, 'current_round.json')) as f:
+            args.round = json.load(f)['CURRENT_ROUND']
+    round_path = f'Round_{args.round}'
+    source = LocalDataSource(REPO_DIR)
+    urls = team_urls()
+
+    with tempfile.TemporaryDirectory() as private_dir:
+        build_private_repo(private_dir)
+        players_df = pd.read_excel(os.path.join(private_dir, 'AFLPlayers2024.xlsx'))
+        matches = [entry.path for entry in source.list_dir(round_path) if entry.type == 'dir']
+        sessions = [load_session(source, private_dir, match_path, players_df, urls) for match_path in matches]
+
+    categories = CategoryRegistry()
+    start = time.perf_counter()
+    # The workbook is loaded (and typed) once per process, not per session
+    typed_players_df = compact(players_df, categories)
+    typed_sessions = [compact_session(session, typed_players_df, categories) for session in sessions]
+    compact_ms = (time.perf_counter() - start) * 1000
+    for raw, typed in zip(sessions, typed_sessions):
+        check_same_values(raw, typed)
+
+    def report(raw, typed):
+        before, after = frames_nbytes(raw), frames_nbytes(typed)
+        return {'frames': len({id(raw_df) for raw_df, _ in frame_pairs(raw, raw)}), 'before_kb': round(before / 1024, 1),
+                'after_kb': round(after / 1024, 1), 'saved_pct': round(100 * (1 - after / before), 1)}
+
+    one = report(sessions[0], typed_sessions[0])
+    # Per part, categoricals at the cost of their codes; the shared dictionaries are listed separately
+    def codes_kb(value):
+        return round(sum(frame_nbytes(df) for df, _ in frame_pairs(value, value)) / 1024, 1)
+    one['parts_kb'] = {part: [codes_kb(sessions[0][part]), codes_kb(typed_sessions[0][part])] for part in sessions[0]}
+    one['parts_kb']['shared dictionaries'] = [0, round(one['after_kb'] - sum(after for _, after in
+                                                                             one['parts_kb'].values()), 1)]
+    # Why the cache's size_of doesn't use memory_usage(deep=True) any more
+    one['memory_usage_deep_after_kb'] = round(deep_usage(typed_sessions[0]) / 1024, 1)
+    print(json.dumps({
+        'round': round_path,
+        'one match session': dict(one, match=matches[0]),
+        'whole round': report(sessions, typed_sessions),
+        'compact_ms_whole_round': round(compact_ms, 1),
+        'dictionary sizes': categories.stats(),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Cost of the instrumentation in metrics.py on the hot path: a counter, a span
+# and a metered read of every file in the current round, vs the bare calls; and
+# the time to render the Prometheus text once a page's worth of series exist.
+#
+#   python benchmarks/bench_metrics.py --repeat 5
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import REPO_DIR
+from data_source import LocalDataSource
+from metrics import Metrics, MeteredSource
+
+CALLS = 100000
+
+
+def best_of(repeat, run):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    registry = Metrics()
+
+    def counters():
+        for _ in range(CALLS):
+            registry.inc('afl_source_calls_total', source='AFL', op='read')
+
+    def spans():
+        for _ in range(CALLS):
+            with registry.span('afl_stage_seconds', stage='csv parse'):
+                pass
+
+    inc_ns = best_of(args.repeat, counters) / CALLS * 1e9
+    span_ns = best_of(args.repeat, spans) / CALLS * 1e9
+
+    with open(os.path.join(REPO_DIR, 'current_round.json')) as f:
+        round_path = f"Round_{json.load(f)['CURRENT_ROUND']}"
+    source = LocalDataSource(REPO_DIR)
+    paths = [file.path for match in source.list_dir(round_path) if match.type == 'dir'
+             for file in source.list_dir(match.path)]
+    metered = MeteredSource(source, 'AFL', registry)
+    bare_s = best_of(args.repeat, lambda: [source.read_bytes(path) for path in paths])
+    metered_s = best_of(args.repeat, lambda: [metered.read_bytes(path) for path in paths])
+
+    # Series like a busy process has: every stage, loader and source
+    for name in ('fixture load', 'folder listing', 'csv parse', 'styler build', 'chart spec build', 'threshold query'):
+        registry.observe('afl_stage_seconds', 0.01, stage=name)
+    for name in ('get_players_df', 'load_csv_data', 'load_player_H2H_data', 'load_player_season'):
+        registry.observe('afl_loader_seconds', 0.05, function=name)
+    render_ms = best_of(args.repeat, registry.render_prometheus) * 1000
+
+    print(json.dumps({
+        'counter_inc_ns': round(inc_ns),
+        'span_ns': round(span_ns),
+        f'read_{len(paths)}_files_ms': {'bare': round(bare_s * 1000, 2), 'metered': round(metered_s * 1000, 2),
+                                        'overhead_us_per_read': round((metered_s - bare_s) / len(paths) * 1e6, 2)},
+        'render_prometheus_ms': round(render_ms, 2),
+        'series_lines': len(registry.render_prometheus().splitlines()),
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Finding players' season files (name_url) in the players workbook: the old
+# per-player scan of players_df vs player_registry.py, for the selected player
+# and for a whole squad, with the synthetic workbook from standin.py.
+#
+#   python benchmarks/bench_player_registry.py --repeat 5
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import pandas as pd
+
+from standin import build_private_repo
+from player_registry import PlayerRegistry
+from schema import compact
+
+LOOKUPS = 1000
+
+
+def best_of(repeat, run):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build_private_repo(tmp)
+        players_df = compact(pd.read_excel(os.path.join(tmp, 'AFLPlayers2024.xlsx'), engine='openpyxl'))
+
+    team = players_df['Team'].iloc[0]
+    squad = sorted(players_df.loc[players_df['Team'] == team, 'Player'])
+    player = squad[len(squad) // 2]
+
+    build_s = best_of(args.repeat, lambda: PlayerRegistry(players_df))
+    registry = PlayerRegistry(players_df)
+
+    def scan_one():
+        for _ in range(LOOKUPS):
+            players_df.loc[players_df['Player'] == player, 'name_url'].iloc[0]
+
+    def registry_one():
+        for _ in range(LOOKUPS):
+            registry.resolve(team, player)
+
+    def scan_squad():
+        # One scan per player, as the old threshold table and season lookups did
+        return {name: players_df.loc[players_df['Player'] == name, 'name_url'].iloc[0] for name in squad}
+
+    scan_squad_ms = best_of(args.repeat, scan_squad) * 1000
+    registry_squad_ms = best_of(args.repeat, lambda: registry.resolve_squad(team, squad)) * 1000
+    assert registry.resolve_squad(team, squad) == scan_squad()
+
+    print(json.dumps({
+        'players': len(players_df),
+        'squad': len(squad),
+        'build_ms': round(build_s * 1000, 2),
+        'one_player_us': {'scan': round(best_of(args.repeat, scan_one) / LOOKUPS * 1e6, 2),
+                          'registry': round(best_of(args.repeat, registry_one) / LOOKUPS * 1e6, 2)},
+        'squad_ms': {'scan': round(scan_squad_ms, 3), 'registry': round(registry_squad_ms, 3)},
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
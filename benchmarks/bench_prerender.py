@@ -0,0 +1,107 @@
+# The pre-render job (prerender.py) over the stand-in round, and the page it
+# serves. The synthetic player repo and its season index come from standin.py.
+#   - job time with --workers processes vs one
+#   - every match's tables are the same from the artifacts as computed live
+#   - per match switch, wall time and the page's own compute (the csv parse,
+#     styler build and chart spec build stages), served from the artifacts vs
+#     live; each side runs in a fresh process, so live pays for every match's
+#     first render as a new replica would
+#
+#   python benchmarks/bench_prerender.py --workers 4
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import build_private_repo, configure_environment, make_app_test
+from data_source import LocalDataSource
+from player_index import build_player_index
+from prerender import config_from_env, prerender_round
+
+import profiling
+
+COMPUTE_STAGES = ('csv parse', 'styler build', 'chart spec build')
+
+
+def render_matches():
+    # Every match once, from a fresh app: (dataframes per match, wall seconds and compute seconds per switch)
+    app_test = make_app_test()
+    app_test.run()
+    assert not app_test.exception, app_test.exception
+    tables, seconds, compute = [], [], []
+    for match in app_test.sidebar.radio[0].options[1:] + app_test.sidebar.radio[0].options[:1]:
+        profiling.drain()
+        start = time.perf_counter()
+        app_test.sidebar.radio[0].set_value(match).run()
+        seconds.append(time.perf_counter() - start)
+        compute.append(sum(elapsed for name, elapsed in profiling.drain() if name in COMPUTE_STAGES))
+        assert not app_test.exception, app_test.exception
+        tables.append([element.value.to_csv() for element in app_test.dataframe])
+    return tables, seconds, compute
+
+
+def render_in_process(prerender_dir):
+    # The environment is inherited; only where the artifacts are read from differs
+    env = dict(os.environ, AFL_PRERENDER_DIR=prerender_dir)
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--render'], env=env, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median_ms(values):
+    return round(statistics.median(values) * 1000, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--render', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.render:
+        print(json.dumps(render_matches()))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        private_dir = os.path.join(tmp, 'private')
+        build_private_repo(private_dir)
+        configure_environment(private_dir)
+        index_path = os.path.join(tmp, 'season_2024.arrow')
+        build_player_index(LocalDataSource(private_dir), index_path)
+        os.environ['AFL_PLAYER_INDEX'] = index_path
+        config = config_from_env()
+
+        jobs = {}
+        for workers in sorted({1, args.workers}):
+            out_dir = os.path.join(tmp, f'prerender_{workers}')
+            start = time.perf_counter()
+            version, results = prerender_round(config, out_dir, workers=workers)
+            jobs[workers] = {'seconds': round(time.perf_counter() - start, 2),
+                             'median_match_s': round(statistics.median(seconds for _, _, seconds in results.values()), 2)}
+        artifacts = sum(count for count, _, _ in results.values())
+        size = sum(size for _, size, _ in results.values())
+
+        live_tables, live_s, live_compute = render_in_process(os.path.join(tmp, 'none'))
+        prerendered_tables, prerendered_s, prerendered_compute = render_in_process(out_dir)
+        assert prerendered_tables == live_tables
+
+    print(json.dumps({
+        'round': config['round_path'],
+        'cpus': os.cpu_count(),
+        'matches': len(results),
+        'artifacts': artifacts,
+        'artifact_mb': round(size / 2 ** 20, 2),
+        'job_by_workers': jobs,
+        'match_switch_ms': {'live': median_ms(live_s), 'prerendered': median_ms(prerendered_s)},
+        'match_switch_compute_ms': {'live': median_ms(live_compute), 'prerendered': median_ms(prerendered_compute)},
+        'same_tables': True,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+# Headless render-cost benchmark: drives streamlit_app.py through Streamlit's
+# AppTest against the local stand-in (benchmarks/standin.py) and records, for
+# every rerun, the wall time plus the per-stage timings from profiling.stage():
+# fixture load, folder listing, csv parse, styler build, chart spec build.
+#
+#   python benchmarks/bench_render.py --matches 3 --players 2 --out render.json
+#
+# The JSON output is meant to be kept per commit so rerun latency per match,
+# per player and per averages window can be compared over time.
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import REPO_DIR, build_private_repo, configure_environment, make_app_test
+
+import profiling
+
+WINDOWS = ("Season Average", "Last 10 Average", "Last 5 Average", "Last 3 Average")
+
+
+def player_radios(app_test):
+    return [radio for radio in app_test.main.radio if radio.label == "Select a Player"]
+
+
+def team_radio(app_test):
+    # The team selector that replaced st.tabs; None on revisions that still render both tabs
+    for radio in app_test.main.radio:
+        if radio.label == "Team":
+            return radio
+    return None
+
+
+def timed_run(app_test, kind, results, **labels):
+    profiling.drain()
+    start = time.perf_counter()
+    app_test.run()
+    total_ms = (time.perf_counter() - start) * 1000
+    if app_test.exception:
+        raise RuntimeError(f"{kind} rerun failed ({labels}): {app_test.exception[0].value}")
+    results.append(dict(kind=kind, total_ms=round(total_ms, 3), stages=profiling.summarize(profiling.drain()),
+                        **labels))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def summarize_runs(results):
+    summary = {}
+    for kind in dict.fromkeys(result['kind'] for result in results):
+        totals = [result['total_ms'] for result in results if result['kind'] == kind]
+        stage_totals = {}
+        for result in results:
+            if result['kind'] == kind:
+                for name, entry in result['stages'].items():
+                    stage_totals.setdefault(name, []).append(entry['total_ms'])
+        summary[kind] = {
+            'reruns': len(totals),
+            'mean_ms': round(statistics.mean(totals), 3),
+            'p50_ms': round(percentile(totals, 0.5), 3),
+            'p95_ms': round(percentile(totals, 0.95), 3),
+            'stages_mean_ms': {name: round(statistics.mean(values), 3) for name, values in stage_totals.items()},
+        }
+    return summary
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(matches, players, windows):
+    app_test = make_app_test()
+    results = []
+    timed_run(app_test, 'cold start', results)
+    match_radio = app_test.sidebar.radio[0]
+    for match in list(match_radio.options)[:matches]:
+        app_test.sidebar.radio[0].set_value(match)
+        timed_run(app_test, 'match', results, match=match)
+        for window in windows:
+            app_test.selectbox[0].set_value(window)
+            timed_run(app_test, 'window', results, match=match, window=window)
+            teams = list(team_radio(app_test).options) if team_radio(app_test) else [None]
+            for team in teams:
+                if team is not None:
+                    team_radio(app_test).set_value(team)
+                    timed_run(app_test, 'team', results, match=match, window=window, team=team)
+                for side, radio in enumerate(player_radios(app_test)):
+                    for player in list(radio.options)[:players]:
+                        player_radios(app_test)[side].set_value(player)
+                        timed_run(app_test, 'player', results, match=match, window=window, player=player)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--matches', type=int, default=9, help='matches of the current round to visit')
+    parser.add_argument('--players', type=int, default=2, help='players to click per tab')
+    parser.add_argument('--windows', nargs='*', default=list(WINDOWS))
+    parser.add_argument('--private-dir', help='reuse an existing stand-in player repo')
+    parser.add_argument('--out', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    private_dir = args.private_dir or tempfile.mkdtemp(prefix='afl-standin-')
+    try:
+        if not args.private_dir:
+            build_private_repo(private_dir)
+        configure_environment(private_dir)
+        results = run_benchmark(args.matches, args.players, args.windows)
+    finally:
+        if not args.private_dir:
+            shutil.rmtree(private_dir, ignore_errors=True)
+
+    report = {'revision': git_revision(), 'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'summary': summarize_runs(results), 'reruns': results}
+    payload = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(payload)
+        print(json.dumps(report['summary'], indent=2))
+    else:
+        print(payload)
+
+
+if __name__ == '__main__':
+    main()
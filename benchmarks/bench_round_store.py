@@ -0,0 +1,112 @@
+# Per-match load latency and resident memory: parsing the match CSVs (the
+# original load_csv_data / load_player_H2H_data path) vs filtering the
+# memory-mapped Arrow round store.
+#
+#   python benchmarks/bench_round_store.py --round 20
+#
+# Each mode runs in its own subprocess so resident memory isn't shared.
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+from io import BytesIO
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_source import LocalDataSource
+from round_store import compile_round, RoundStore
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_mb():
+    with open('/proc/self/statm') as f:
+        resident_pages = int(f.read().split()[1])
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+def load_match_csv(source, match_path):
+    csv_dict, csv_dict_H2H = {}, {}
+    for file in source.list_dir(match_path):
+        if file.name.endswith('Average.csv'):
+            csv_dict[file.name.replace('.csv', '')] = pd.read_csv(BytesIO(source.read_bytes(file.path)))
+        elif file.name.endswith('H2H Games.csv'):
+            csv_dict_H2H[file.name.replace(' H2H Games.csv', '')] = pd.read_csv(
+                BytesIO(source.read_bytes(file.path)), parse_dates=['Date'], dayfirst=True)
+    return csv_dict, csv_dict_H2H
+
+
+def run_mode(mode, round_path, store_dir):
+    source = LocalDataSource(REPO_DIR)
+    matches = [entry.name for entry in source.list_dir(round_path) if entry.type == 'dir']
+    baseline_rss = rss_mb()
+    start = time.perf_counter()
+    store = None
+    if mode == 'arrow':
+        store = RoundStore(os.path.join(store_dir, round_path))
+        store.ranges('average')
+        store.ranges('h2h_games')
+    open_ms = (time.perf_counter() - start) * 1000
+    latencies = []
+    held = []  # keep every match loaded, like a warm cache would
+    for match in matches:
+        start = time.perf_counter()
+        if mode == 'csv':
+            frames = load_match_csv(source, f'{round_path}/{match}')
+        else:
+            frames = (store.load_averages(match), store.load_h2h_games(match))
+        latencies.append((time.perf_counter() - start) * 1000)
+        held.append(frames)
+    return {'mode': mode, 'matches': len(matches), 'open_ms': round(open_ms, 2),
+            'first_match_ms': round(latencies[0], 2),
+            'mean_match_ms': round(sum(latencies) / len(latencies), 2),
+            'max_match_ms': round(max(latencies), 2),
+            'rss_growth_mb': round(rss_mb() - baseline_rss, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--round', type=int, default=None)
+    parser.add_argument('--mode', choices=['csv', 'arrow'], help=argparse.SUPPRESS)
+    parser.add_argument('--store', help=argparse.SUPPRESS)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    if args.round is None:
+        with open(os.path.join(REPO_DIR, 'current_round.json')) as f:
+            args.round = json.load(f)['CURRENT_ROUND']
+    round_path = f'Round_{args.round}'
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, round_path, args.store)))
+        return
+
+    store_dir = tempfile.mkdtemp(prefix='afl-store-')
+    try:
+        start = time.perf_counter()
+        compile_round(LocalDataSource(REPO_DIR), round_path, store_dir)
+        compile_seconds = time.perf_counter() - start
+        results = []
+        for mode in ('csv', 'arrow'):
+            output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--round', str(args.round),
+                                              '--mode', mode, '--store', store_dir])
+            results.append(json.loads(output))
+    finally:
+        shutil.rmtree(store_dir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({'round': args.round, 'compile_seconds': round(compile_seconds, 3), 'results': results},
+                         indent=2))
+    else:
+        print(f'Round {args.round} (store compiled in {compile_seconds:.2f}s)')
+        print(pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# Upstream traffic with several replicas: each replica is a separate process
+# with its own ContentCache, loading every match's averages and H2H games for
+# the current round (what the page does across all selections). Without the
+# shared disk tier, every replica fetches everything. With it, the replicas
+# share one fetch per file, even when they all miss at the same time. Each read
+# that reaches the stand-in upstream sleeps for --latency-ms.
+# Also times a write with --entries already on disk, which shouldn't grow with
+# them, and has the replicas write into a small budget at once, after which the
+# size ledger must match what is on disk and stay within the budget.
+#
+#   python benchmarks/bench_shared_cache.py --replicas 4 --latency-ms 20 --entries 5000
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import multiprocessing
+from io import BytesIO
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import REPO_DIR
+from bench_data_source import CountingDataSource
+from data_source import LocalDataSource
+from cache import ContentCache, folder_version
+from shared_cache import DiskCache
+
+
+class SlowDataSource(CountingDataSource):
+    def __init__(self, inner, latency):
+        super().__init__(inner)
+        self.latency = latency
+
+    def read_bytes(self, path):
+        time.sleep(self.latency)
+        return super().read_bytes(path)
+
+
+def run_replica(round_path, shared_dir, latency):
+    source = SlowDataSource(LocalDataSource(REPO_DIR), latency)
+    shared = DiskCache(shared_dir) if shared_dir else None
+    content_cache = ContentCache(shared=shared, shared_namespaces=('load_csv_data',))
+
+    @content_cache.memoize
+    def load_csv_data(_source, folder_path):
+        return {entry.name: pd.read_csv(BytesIO(_source.read_bytes(entry.path)))
+                for entry in _source.inner.list_dir(folder_path) if entry.name.endswith('.csv')}
+
+    start = time.perf_counter()
+    frames = 0
+    for entry in source.inner.list_dir(round_path):
+        if entry.type == 'dir':
+            frames += len(load_csv_data(source, entry.path, folder_version(source.inner.list_dir(entry.path))))
+    return {'seconds': time.perf_counter() - start, 'frames': frames, 'upstream_reads': source.read_calls,
+            'shared': shared.stats()['loaders'] if shared else None}
+
+
+def run_replicas(replicas, round_path, shared_dir, latency):
+    with multiprocessing.Pool(replicas) as pool:
+        results = pool.starmap(run_replica, [(round_path, shared_dir, latency)] * replicas)
+    return {'upstream_reads': sum(result['upstream_reads'] for result in results),
+            'slowest_replica_s': round(max(result['seconds'] for result in results), 3),
+            'frames_per_replica': results[0]['frames']}
+
+
+def write_entries(root, prefix, count, size, max_bytes):
+    cache = DiskCache(root, max_bytes=max_bytes)
+    for number in range(count):
+        cache.put('bench', f'{prefix} {number}', 1, b'x' * size)
+
+
+def disk_bytes(root):
+    return sum(size for _, size, _ in DiskCache(root)._entries())
+
+
+def ledger_bytes(root):
+    with open(DiskCache(root)._ledger_path) as f:
+        return int(f.read())
+
+
+def put_cost(entries, puts=200):
+    # Milliseconds per write with `entries` already on disk
+    with tempfile.TemporaryDirectory() as root:
+        write_entries(root, 'old', entries, 1024, 2 * 2 ** 30)
+        cache = DiskCache(root)
+        start = time.perf_counter()
+        for number in range(puts):
+            cache.put('bench', f'new {number}', 1, b'x' * 1024)
+        return round((time.perf_counter() - start) / puts * 1000, 3)
+
+
+def shared_budget(replicas, max_bytes=2 ** 20):
+    with tempfile.TemporaryDirectory() as root:
+        with multiprocessing.Pool(replicas) as pool:
+            pool.starmap(write_entries, [(root, f'replica {replica}', 300, 10 * 1024, max_bytes)
+                                         for replica in range(replicas)])
+        on_disk, ledger = disk_bytes(root), ledger_bytes(root)
+    assert on_disk <= max_bytes and ledger == on_disk, (on_disk, ledger)
+    return {'max_bytes': max_bytes, 'on_disk': on_disk, 'ledger': ledger}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--replicas', type=int, default=4)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--entries', type=int, default=5000)
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_DIR, 'current_round.json')) as f:
+        round_path = f"Round_{json.load(f)['CURRENT_ROUND']}"
+    latency = args.latency_ms / 1000
+
+    results = {'process caches only': run_replicas(args.replicas, round_path, None, latency)}
+    with tempfile.TemporaryDirectory() as shared_dir:
+        results['shared disk tier (cold)'] = run_replicas(args.replicas, round_path, shared_dir, latency)
+        # Every replica restarted: their memory caches are empty, the disk tier isn't
+        results['shared disk tier (restart)'] = run_replicas(args.replicas, round_path, shared_dir, latency)
+        disk_stats = DiskCache(shared_dir).stats()
+
+    print(json.dumps({'round': round_path, 'replicas': args.replicas, 'latency_ms': args.latency_ms,
+                      'results': results, 'disk_entries': disk_stats['entries'], 'disk_bytes': disk_stats['bytes'],
+                      'put_ms': {'empty': put_cost(0), f'{args.entries} entries': put_cost(args.entries)},
+                      'replicas_into_small_budget': shared_budget(args.replicas)},
+                     indent=2))
+
+
+if __name__ == '__main__':
+    main()
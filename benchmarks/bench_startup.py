@@ -0,0 +1,105 @@
+# Cold-start benchmark: time from the start of the page script (its imports
+# included) to the first element sent to the browser, and to the end of the
+# first run. Each sample is a fresh Python process against the local stand-in,
+# so nothing is cached between samples. Also lists which heavy optional modules
+# the page pulled in before its first render and during the whole first run.
+#
+#   python benchmarks/bench_startup.py --runs 5 --max-first-render-ms 300
+#
+# With --max-first-render-ms the script exits non-zero when the median first
+# render is slower, so it can guard the startup path in CI.
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import build_private_repo, configure_environment, make_app_test
+from bench_render import git_revision
+
+# Modules the first paint shouldn't need
+HEAVY_MODULES = ('matplotlib', 'github', 'altair', 'openpyxl', 'PIL.Image')
+
+
+def measure_once():
+    # Runs in the child process
+    start = time.perf_counter()
+    from streamlit.testing.v1 import AppTest  # noqa: F401 (the harness's own imports aren't the page's)
+    from streamlit.runtime.forward_msg_queue import ForwardMsgQueue
+    preloaded = {name for name in HEAVY_MODULES if name in sys.modules}
+    streamlit_import_ms = (time.perf_counter() - start) * 1000
+
+    def loaded():
+        return sorted(name for name in HEAVY_MODULES if name in sys.modules and name not in preloaded)
+
+    first_delta = {}
+    enqueue = ForwardMsgQueue.enqueue
+
+    def recording_enqueue(queue, msg):
+        if 'at' not in first_delta and msg.WhichOneof('type') == 'delta':
+            first_delta['at'] = time.perf_counter()
+            first_delta['modules'] = loaded()
+        return enqueue(queue, msg)
+
+    ForwardMsgQueue.enqueue = recording_enqueue
+    app_test = make_app_test()
+    run_start = time.perf_counter()
+    app_test.run()
+    run_end = time.perf_counter()
+    if app_test.exception:
+        raise RuntimeError(app_test.exception[0].value)
+    return {
+        'streamlit_import_ms': round(streamlit_import_ms, 3),
+        'first_render_ms': round((first_delta['at'] - run_start) * 1000, 3),
+        'first_run_ms': round((run_end - run_start) * 1000, 3),
+        'modules_before_first_render': first_delta['modules'],
+        'modules_in_first_run': loaded(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--private-dir', help='reuse an existing stand-in player repo')
+    parser.add_argument('--max-first-render-ms', type=float, help='fail if the median first render is slower')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure_once()))
+        return
+
+    private_dir = args.private_dir or tempfile.mkdtemp(prefix='afl-standin-')
+    try:
+        if not args.private_dir:
+            build_private_repo(private_dir)
+        configure_environment(private_dir)
+        samples = []
+        for _ in range(args.runs):
+            output = subprocess.check_output([sys.executable, os.path.abspath(__file__), '--child'],
+                                             text=True, stderr=subprocess.DEVNULL)
+            samples.append(json.loads(output.strip().splitlines()[-1]))
+    finally:
+        if not args.private_dir:
+            shutil.rmtree(private_dir, ignore_errors=True)
+
+    report = {'revision': git_revision(), 'runs': args.runs,
+              'modules_before_first_render': samples[-1]['modules_before_first_render'],
+              'modules_in_first_run': samples[-1]['modules_in_first_run']}
+    for metric in ('streamlit_import_ms', 'first_render_ms', 'first_run_ms'):
+        values = [sample[metric] for sample in samples]
+        report[metric] = {'median': round(statistics.median(values), 3), 'min': min(values), 'max': max(values)}
+    print(json.dumps(report, indent=2))
+
+    if args.max_first_render_ms is not None and report['first_render_ms']['median'] > args.max_first_render_ms:
+        sys.exit(f"first render {report['first_render_ms']['median']} ms > {args.max_first_render_ms} ms")
+
+
+if __name__ == '__main__':
+    main()
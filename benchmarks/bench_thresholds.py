@@ -0,0 +1,66 @@
+# Hit rates at arbitrary thresholds for every player in the stand-in season:
+# per-player pandas filtering (what a threshold column costs today) vs one
+# batched GameMatrix query (thresholds.py). Results are checked to agree.
+#
+#   python benchmarks/bench_thresholds.py --thresholds 15 20 25 27 30 --window 5
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import build_private_repo
+from data_source import LocalDataSource
+from player_index import build_player_index, PlayerIndex
+from thresholds import GameMatrix
+
+
+def per_player(logs_df, thresholds, window):
+    rates = []
+    for _, player_df in logs_df.groupby(['team_url', 'name_url'], sort=True):
+        games = player_df.sort_values('Date') if window is None else player_df.sort_values('Date').tail(window)
+        rates.append([round(100 * (games['D'] >= threshold).sum() / len(games)) for threshold in thresholds])
+    return np.array(rates, dtype=float)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--thresholds', nargs='*', type=int, default=[15, 20, 25, 27, 30])
+    parser.add_argument('--window', type=int, default=None)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        private_dir = os.path.join(tmp, 'private')
+        build_private_repo(private_dir)
+        index_path = os.path.join(tmp, 'season.arrow')
+        build_player_index(LocalDataSource(private_dir), index_path)
+        logs_df = PlayerIndex(index_path).game_logs()
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        expected = per_player(logs_df, args.thresholds, args.window)
+    pandas_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+    start = time.perf_counter()
+    matrix = GameMatrix.from_logs(logs_df, ['team_url', 'name_url'])
+    build_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        _, rates = matrix.hit_rates('D', args.thresholds, args.window)
+    query_ms = (time.perf_counter() - start) * 1000 / args.repeat
+
+    # GameMatrix keys come out in the same (team_url, name_url) order as the sorted groupby
+    assert np.array_equal(rates, expected), 'hit rates differ'
+    print(json.dumps({'players': len(matrix), 'games': len(logs_df), 'thresholds': args.thresholds,
+                      'window': args.window, 'per_player_pandas_ms': round(pandas_ms, 3),
+                      'matrix_build_ms': round(build_ms, 3), 'matrix_query_ms': round(query_ms, 3)}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
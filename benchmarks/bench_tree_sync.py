@@ -0,0 +1,172 @@
+# API requests and wall time to bring a mirror of the current round up to date:
+# the read-through mirror walking the contents API (one call per directory and
+# per file) vs tree_sync.py (branch head + one recursive tree + the changed
+# blobs, fetched in parallel). The "GitHub" side is a stand-in repo served from
+# a scratch copy of this checkout, with a fixed latency per request; the
+# mid-week refresh edits a few of the round's CSVs and syncs again. The synced
+# mirror is checked byte for byte against the stand-in afterwards.
+#
+#   python benchmarks/bench_tree_sync.py --latency-ms 30 --changed 5
+import os
+import sys
+import json
+import time
+import glob
+import base64
+import shutil
+import hashlib
+import argparse
+import tempfile
+import threading
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from standin import REPO_DIR
+from data_source import GitHubDataSource, MirrorDataSource
+from tree_sync import TreeSync
+
+
+def blob_sha(data):
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+class StandInRepo:
+    # The slice of PyGithub's Repository the data sources and TreeSync use, over a directory
+    full_name = 'standin/AFL'
+    default_branch = 'main'
+
+    def __init__(self, root, latency):
+        self.root = root
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._blobs = {}
+
+    def _request(self):
+        with self._lock:
+            self.requests += 1
+        time.sleep(self.latency)
+
+    def _walk(self, path):
+        # Tree elements for everything under path, plus the tree's own SHA
+        elements, children = [], []
+        full_path = os.path.join(self.root, *path.split('/')) if path else self.root
+        for name in sorted(os.listdir(full_path)):
+            child = f"{path}/{name}" if path else name
+            if os.path.isdir(os.path.join(full_path, name)):
+                sub_elements, sha = self._walk(child)
+                elements.append(SimpleNamespace(path=child, type='tree', sha=sha, size=None))
+                elements.extend(sub_elements)
+            else:
+                file = self._file(child)
+                sha = file.sha
+                self._blobs[sha] = file.decoded_content
+                elements.append(SimpleNamespace(path=child, type='blob', sha=sha, size=file.size))
+            children.append(f"{name}:{sha}")
+        return elements, hashlib.sha1('\n'.join(children).encode('utf-8')).hexdigest()
+
+    def get_branch(self, name):
+        self._request()
+        _, sha = self._walk('')
+        return SimpleNamespace(commit=SimpleNamespace(sha=sha))
+
+    def get_git_tree(self, sha, recursive=False):
+        self._request()
+        elements, _ = self._walk('')
+        return SimpleNamespace(sha=sha, tree=elements, raw_data={'truncated': False})
+
+    def get_git_blob(self, sha):
+        self._request()
+        return SimpleNamespace(encoding='base64', content=base64.b64encode(self._blobs[sha]).decode('ascii'))
+
+    def _file(self, path):
+        with open(os.path.join(self.root, *path.split('/')), 'rb') as f:
+            data = f.read()
+        return SimpleNamespace(name=path.rpartition('/')[2], path=path, type='file', sha=blob_sha(data),
+                               size=len(data), decoded_content=data)
+
+    def get_contents(self, path, ref=None):
+        self._request()
+        full_path = os.path.join(self.root, *path.split('/')) if path else self.root
+        if os.path.isfile(full_path):
+            return self._file(path)
+        contents = []
+        for name in sorted(os.listdir(full_path)):
+            child = f"{path}/{name}" if path else name
+            if os.path.isdir(os.path.join(full_path, name)):
+                contents.append(SimpleNamespace(name=name, path=child, type='dir', sha=blob_sha(child.encode()),
+                                                size=0))
+            else:
+                contents.append(self._file(child))
+        return contents
+
+
+def walk_round(source, round_path):
+    # What the app reads for a round: root files, every match folder and file
+    source.read_bytes('current_round.json')
+    source.read_bytes('AFLFixtures2024.xlsx')
+    for entry in source.list_dir(round_path):
+        if entry.type == 'dir':
+            for file in source.list_dir(entry.path):
+                source.read_bytes(file.path)
+        else:
+            source.read_bytes(entry.path)
+
+
+def measure(repo, run):
+    before = repo.requests
+    start = time.perf_counter()
+    run()
+    return {'requests': repo.requests - before, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--latency-ms', type=float, default=30)
+    parser.add_argument('--changed', type=int, default=5, help='CSVs edited before the mid-week refresh')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    with open(os.path.join(REPO_DIR, 'current_round.json')) as f:
+        round_path = f"Round_{json.load(f)['CURRENT_ROUND']}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        upstream_dir = os.path.join(tmp, 'upstream')
+        shutil.copytree(os.path.join(REPO_DIR, round_path), os.path.join(upstream_dir, round_path))
+        for name in ('current_round.json', 'AFLFixtures2024.xlsx'):
+            shutil.copy(os.path.join(REPO_DIR, name), upstream_dir)
+        repo = StandInRepo(upstream_dir, args.latency_ms / 1000)
+
+        contents_mirror = MirrorDataSource(GitHubDataSource(repo), os.path.join(tmp, 'contents'))
+        tree_mirror = MirrorDataSource(GitHubDataSource(repo), os.path.join(tmp, 'tree'))
+        tree_sync = TreeSync(tree_mirror, workers=args.workers)
+
+        results = {'contents API (cold)': measure(repo, lambda: walk_round(contents_mirror, round_path)),
+                   'tree sync (cold)': measure(repo, tree_sync.sync_current_round),
+                   'tree sync (unchanged)': measure(repo, tree_sync.sync_current_round)}
+
+        # Mid-week refresh: a few of the round's CSVs get regenerated upstream
+        changed = sorted(glob.glob(os.path.join(upstream_dir, round_path, '*', '*.csv')))[:args.changed]
+        for path in changed:
+            with open(path, 'a') as f:
+                f.write('\n')
+
+        def contents_refresh():
+            contents_mirror.invalidate()
+            walk_round(contents_mirror, round_path)
+        results['contents API (refresh)'] = measure(repo, contents_refresh)
+        results['tree sync (refresh)'] = measure(repo, tree_sync.sync_current_round)
+
+        for path in glob.glob(os.path.join(upstream_dir, '**', '*'), recursive=True):
+            if os.path.isfile(path):
+                relative = os.path.relpath(path, upstream_dir).replace(os.sep, '/')
+                with open(path, 'rb') as f:
+                    assert tree_mirror.local.read_bytes(relative) == f.read(), f'{relative} differs'
+
+    print(json.dumps({'round': round_path, 'latency_ms': args.latency_ms, 'changed_files': len(changed),
+                      'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
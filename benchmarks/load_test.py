@@ -0,0 +1,269 @@
+# Load test: a real app server with many concurrent sessions, all offline.
+#   - both repos come from mock_github.py: the public AFL repo is this checkout's
+#     Round_N tree and AFLPlayerStatsRepo is the synthetic one from standin.py;
+#     the app reaches them through AFL_GITHUB_API, so every fetch, listing and
+#     304 goes through its GitHub client as in production
+#   - the app runs under `streamlit run`, and each session is a websocket client
+#     speaking the browser's protocol: it sends a rerun with its widget states and
+#     waits for script_finished. AppTest can't be used here, as it swaps process
+#     globals (the runtime, st.secrets) for the length of each run.
+#   - every session switches matches, teams, players and averages windows at
+#     random, with think time in between
+# Reports rerun latency percentiles, throughput, the server's RSS growth, the
+# mock's request counts per repo and the app's own afl_* metrics from /metrics.
+#
+#   python benchmarks/load_test.py --sessions 20 --actions 15 --think 0.5
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tornado.websocket import websocket_connect
+from streamlit.proto.BackMsg_pb2 import BackMsg
+from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+from streamlit.proto.WidgetStates_pb2 import WidgetState
+
+from standin import APP_PATH, REPO_DIR, build_private_repo
+from mock_github import MockGitHub
+from prerender import WINDOWS
+
+MATCH_LABEL = 'Select a game (Home Team vs Away Team):'
+TEAM_LABEL = 'Team'
+PLAYER_LABEL = 'Select a Player'
+WINDOW_LABEL = 'Game Averages'
+ACTIONS = {'match': MATCH_LABEL, 'team': TEAM_LABEL, 'player': PLAYER_LABEL, 'window': WINDOW_LABEL}
+
+SECRETS = '''[clientid]
+clientid = "standin"
+[clientsecret]
+clientsecret = "standin"
+[privaterepo]
+privaterepo = "standin"
+'''
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid):
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return None
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def start_app(work_dir, api_url, port, metrics_port, player_index, prerender_dir):
+    # The app's on-disk state (mirror, round store, indexes) goes in work_dir, so runs start cold
+    with open(os.path.join(work_dir, '.streamlit', 'secrets.toml'), 'w') as f:
+        f.write(SECRETS)
+    env = dict(os.environ, AFL_DATA_SOURCE='github', AFL_PRIVATE_DATA_SOURCE='github', AFL_GITHUB_API=api_url,
+               AFL_METRICS_PORT=str(metrics_port),
+               AFL_MIRROR_DIR=os.path.join(work_dir, 'mirror'),
+               AFL_ROUND_STORE_DIR=os.path.join(work_dir, 'round_store'),
+               AFL_FIXTURE_INDEX=os.path.join(work_dir, 'fixture.arrow'),
+               AFL_PLAYER_INDEX=player_index or os.path.join(work_dir, 'no_index.arrow'),
+               AFL_PRERENDER_DIR=prerender_dir or os.path.join(work_dir, 'no_prerender'))
+    env.pop('AFL_SHARED_CACHE_DIR', None)
+    command = [sys.executable, '-m', 'streamlit', 'run', APP_PATH, '--server.headless', 'true',
+               '--server.address', '127.0.0.1', '--server.port', str(port), '--server.fileWatcherType', 'none',
+               '--browser.gatherUsageStats', 'false']
+    process = subprocess.Popen(command, cwd=work_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if urllib.request.urlopen(f'http://127.0.0.1:{port}/_stcore/health', timeout=1).read() == b'ok':
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('app server did not come up')
+
+
+class Session:
+    # One browser tab: its widget states, and the radios and selectboxes the last rerun drew
+
+    def __init__(self, url):
+        self.url = url
+        self.states = {}
+        self.widgets = {}
+        self.latencies = []
+        self.errors = []
+
+    async def connect(self):
+        self.ws = await websocket_connect(self.url, max_message_size=256 * 2 ** 20)
+
+    async def rerun(self):
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        message.rerun_script.widget_states.widgets.extend(
+            WidgetState(id=widget_id, int_value=value) for widget_id, value in self.states.values())
+        start = time.perf_counter()
+        await self.ws.write_message(message.SerializeToString(), binary=True)
+        widgets = {}
+        while True:
+            data = await self.ws.read_message()
+            if data is None:
+                raise ConnectionError('websocket closed')
+            forward = ForwardMsg()
+            forward.ParseFromString(data)
+            kind = forward.WhichOneof('type')
+            if kind == 'delta' and forward.delta.WhichOneof('type') == 'new_element':
+                element = forward.delta.new_element
+                element_type = element.WhichOneof('type')
+                if element_type in ('radio', 'selectbox'):
+                    widget = getattr(element, element_type)
+                    widgets[widget.label] = (widget.id, list(widget.options))
+                elif element_type == 'exception':
+                    self.errors.append(element.exception.message)
+            elif kind == 'script_finished':
+                break
+        self.latencies.append(time.perf_counter() - start)
+        self.widgets = widgets
+        # A widget that wasn't drawn again under the same id (another match's player list) is dropped,
+        # as the browser does
+        self.states = {label: state for label, state in self.states.items()
+                       if label in widgets and widgets[label][0] == state[0]}
+
+    def choose(self, rng):
+        # Picks a new value for one of the widgets on the page; False when there are none
+        actions = [action for action, label in ACTIONS.items() if label in self.widgets]
+        if not actions:
+            return False
+        label = ACTIONS[rng.choice(actions)]
+        widget_id, options = self.widgets[label]
+        if label == WINDOW_LABEL:
+            choices = [index for index, option in enumerate(options) if option in WINDOWS]
+        else:
+            choices = list(range(len(options)))
+        self.states[label] = (widget_id, rng.choice(choices or [0]))
+        return True
+
+    async def run(self, actions, think, seed):
+        rng = random.Random(seed)
+        await self.connect()
+        await self.rerun()
+        for _ in range(actions):
+            await asyncio.sleep(rng.uniform(0, 2 * think))
+            if not self.choose(rng):
+                break
+            await self.rerun()
+        self.ws.close()
+
+
+async def drive(url, sessions, actions, think, ramp, sample):
+    clients = [Session(url) for _ in range(sessions)]
+
+    async def start(index, client):
+        await asyncio.sleep(ramp * index / max(sessions, 1))
+        await client.run(actions, think, seed=index)
+
+    sampler = asyncio.ensure_future(sample())
+    start_time = time.perf_counter()
+    results = await asyncio.gather(*(start(index, client) for index, client in enumerate(clients)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - start_time
+    sampler.cancel()
+    failures = [repr(result) for result in results if isinstance(result, Exception)]
+    return clients, elapsed, failures
+
+
+def scrape_metrics(port):
+    # The afl_* sample lines from the app's /metrics, summed over their labels (timestamps are left out)
+    text = urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5).read().decode()
+    totals = {}
+    for line in text.splitlines():
+        if not line.startswith('afl_') or '_bucket' in line:
+            continue
+        name, value = line.rsplit(' ', 1)
+        name = name.split('{', 1)[0]
+        if name.endswith('_timestamp'):
+            continue
+        totals[name] = totals.get(name, 0) + float(value)
+    return {name: round(value, 3) for name, value in sorted(totals.items())}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--actions', type=int, default=15, help='widget changes per session after the first load')
+    parser.add_argument('--think', type=float, default=0.5, help='mean seconds between a session\'s actions')
+    parser.add_argument('--ramp', type=float, default=5.0, help='seconds over which sessions connect')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds the mock adds to every request')
+    parser.add_argument('--player-index', help='season index for the app (AFL_PLAYER_INDEX); none by default')
+    parser.add_argument('--prerender-dir', help='pre-rendered artifacts for the app (AFL_PRERENDER_DIR)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        private_dir = os.path.join(work_dir, 'private')
+        players = build_private_repo(private_dir)
+        os.makedirs(os.path.join(work_dir, '.streamlit'))
+        mock = MockGitHub(REPO_DIR, 'hermclane/AFL', latency=args.latency)
+        mock.add_repo(private_dir, 'hermclane/AFLPlayerStatsRepo')
+        api_url = mock.start()
+        port, metrics_port = free_port(), free_port()
+        process = start_app(work_dir, api_url, port, metrics_port, args.player_index, args.prerender_dir)
+        try:
+            rss = [rss_mb(process.pid)]
+
+            async def sample():
+                while True:
+                    await asyncio.sleep(1)
+                    rss.append(rss_mb(process.pid))
+
+            clients, elapsed, failures = asyncio.run(drive(
+                f'ws://127.0.0.1:{port}/_stcore/stream', args.sessions, args.actions, args.think, args.ramp, sample))
+            rss.append(rss_mb(process.pid))
+            app_metrics = scrape_metrics(metrics_port)
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+            mock.stop()
+
+    first = [client.latencies[0] for client in clients if client.latencies]
+    later = [latency for client in clients for latency in client.latencies[1:]]
+    every = first + later
+    errors = [error for client in clients for error in client.errors]
+
+    def summary(values):
+        return {'count': len(values),
+                **{f'p{q}_ms': round(percentile(values, q / 100) * 1000, 1) if values else None
+                   for q in (50, 95, 99)}}
+
+    print(json.dumps({
+        'sessions': args.sessions,
+        'players': players,
+        'mock_latency_s': args.latency,
+        'elapsed_s': round(elapsed, 1),
+        'reruns_per_s': round(len(every) / elapsed, 2),
+        'rerun_latency': {'all': summary(every), 'first_load': summary(first), 'interactions': summary(later)},
+        'errors': len(errors) + len(failures),
+        'error_samples': (errors + failures)[:3],
+        'server_rss_mb': {'start': round(rss[0], 1), 'peak': round(max(rss), 1), 'end': round(rss[-1], 1),
+                          'growth': round(rss[-1] - rss[0], 1)},
+        'upstream_requests': {str(key): value for key, value in sorted(mock.counts.items(), key=str)},
+        'app_metrics': app_metrics,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+# Local stand-in for the slice of the GitHub REST API the app uses, served from
+# a directory over HTTP/1.1 keep-alive:
+#   GET /repos/<owner>/<repo>/contents/<path>   listing (JSON) or file (raw or base64 JSON)
+#   GET /repos/<owner>/<repo>/commits/HEAD      the current "commit" (a hash of the tree)
+#   GET /repos/<owner>/<repo>/git/trees/<sha>   recursive tree
+#   GET /repos/<owner>/<repo>/git/blobs/<sha>   blob (raw or base64 JSON)
+# Responses carry ETags and the X-RateLimit-* headers; If-None-Match gets a 304
+# that, as on GitHub, doesn't count against the limit. Failures (5xx, 429) can be
+# queued up, and every request, status and new connection is counted. More repos
+# can be served from the same server with add_repo, as the app reaches both of
+# its repos through one API root.
+import os
+import json
+import time
+import base64
+import hashlib
+import threading
+from collections import Counter
+from urllib.parse import urlsplit, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def blob_sha(data):
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+class MockGitHub:
+    def __init__(self, root, full_name='hermclane/AFL', rate_limit=5000, window=3600, latency=0):
+        self.root = os.path.abspath(root)
+        self.full_name = full_name
+        self.rate_limit = rate_limit
+        self.window = window
+        self.latency = latency
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._failures = []
+        self._blob_paths = {}
+        self._remaining = rate_limit
+        self._reset_at = time.time() + window
+        self._server = None
+        # full name -> MockGitHub for the repos added with add_repo
+        self._repos = {}
+
+    def start(self):
+        handler = type('Handler', (_Handler,), {'mock': self})
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+
+    def add_repo(self, root, full_name):
+        # Serve another repo under /repos/<full_name>/; requests share this server's counts and rate limit
+        self._repos[full_name] = MockGitHub(root, full_name)
+
+    def fail_next(self, count, status=502, retry_after=None):
+        # The next `count` requests get `status` instead of their response
+        with self._lock:
+            self._failures.extend([(status, retry_after)] * count)
+
+    def set_rate_limit(self, remaining, reset_in):
+        with self._lock:
+            self._remaining = remaining
+            self._reset_at = time.time() + reset_in
+
+    def _full_path(self, path):
+        return os.path.join(self.root, *path.split('/')) if path else self.root
+
+    def _children(self, path):
+        # (name, path, data) for every entry in a directory; data is None for subdirectories
+        for name in sorted(os.listdir(self._full_path(path))):
+            if name.startswith('.') or name == '__pycache__':
+                continue
+            child = f"{path}/{name}" if path else name
+            if os.path.isdir(self._full_path(child)):
+                yield name, child, None
+            else:
+                with open(self._full_path(child), 'rb') as f:
+                    yield name, child, f.read()
+
+    def _tree(self, path):
+        # (every element under path, the tree's SHA)
+        elements, children = [], []
+        for name, child, data in self._children(path):
+            if data is None:
+                sub_elements, sha = self._tree(child)
+                elements.append({'path': child, 'type': 'tree', 'sha': sha})
+                elements.extend(sub_elements)
+            else:
+                sha = blob_sha(data)
+                elements.append({'path': child, 'type': 'blob', 'sha': sha, 'size': len(data)})
+            children.append(f"{name}:{sha}")
+        return elements, hashlib.sha1('\n'.join(children).encode('utf-8')).hexdigest()
+
+    def _listing(self, path):
+        entries = []
+        for name, child, data in self._children(path):
+            if data is None:
+                entries.append({'name': name, 'path': child, 'type': 'dir', 'sha': self._tree(child)[1], 'size': 0})
+            else:
+                entries.append({'name': name, 'path': child, 'type': 'file', 'sha': blob_sha(data),
+                                'size': len(data)})
+        return entries
+
+    def _blob(self, sha):
+        if sha not in self._blob_paths:
+            # Index every blob in the tree as it is now
+            self._blob_paths.update((element['sha'], element['path']) for element in self._tree('')[0]
+                                    if element['type'] == 'blob')
+        path = self._blob_paths.get(sha)
+        if path is None or not os.path.isfile(self._full_path(path)):
+            return None
+        with open(self._full_path(path), 'rb') as f:
+            data = f.read()
+        return data if blob_sha(data) == sha else None
+
+    def respond(self, path, accept):
+        # (status, body, content type) for a GET, before conditional and rate-limit handling
+        for full_name, repo in self._repos.items():
+            if path.startswith(f"/repos/{full_name}/"):
+                return repo.respond(path, accept)
+        prefix = f"/repos/{self.full_name}/"
+        route = path[len(prefix):] if path.startswith(prefix) else ''
+        if route.startswith('contents'):
+            content_path = unquote(route[len('contents'):].strip('/'))
+            full_path = self._full_path(content_path)
+            if os.path.isdir(full_path):
+                return _json(self._listing(content_path))
+            if os.path.isfile(full_path):
+                with open(full_path, 'rb') as f:
+                    data = f.read()
+                return _file(data, accept, name=os.path.basename(content_path), path=content_path, type='file',
+                             sha=blob_sha(data), size=len(data))
+        elif route == 'commits/HEAD':
+            return 200, self._tree('')[1].encode('ascii'), 'text/plain'
+        elif route.startswith('git/trees/'):
+            elements, sha = self._tree('')
+            return _json({'sha': sha, 'tree': elements, 'truncated': False})
+        elif route.startswith('git/blobs/'):
+            data = self._blob(route[len('git/blobs/'):])
+            if data is not None:
+                return _file(data, accept)
+        return _json({'message': 'Not Found'}, 404)
+
+    def rate_limit_headers(self, counted):
+        with self._lock:
+            if time.time() >= self._reset_at:
+                self._remaining = self.rate_limit
+                self._reset_at = time.time() + self.window
+            exhausted = counted and self._remaining <= 0
+            if counted and not exhausted:
+                self._remaining -= 1
+            return exhausted, {'X-RateLimit-Limit': str(self.rate_limit),
+                               'X-RateLimit-Remaining': str(max(self._remaining, 0)),
+                               'X-RateLimit-Reset': str(int(self._reset_at + 0.999))}
+
+    def next_failure(self):
+        with self._lock:
+            return self._failures.pop(0) if self._failures else None
+
+
+def _json(value, status=200):
+    return status, json.dumps(value).encode('utf-8'), 'application/json'
+
+
+def _file(data, accept, **fields):
+    # Raw bytes for the raw media type, otherwise the base64 JSON form
+    if 'raw' in accept:
+        return 200, data, 'application/octet-stream'
+    return _json(dict(fields, encoding='base64', content=base64.b64encode(data).decode('ascii')))
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; without this, keep-alive responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+    mock = None
+
+    def setup(self):
+        super().setup()
+        with self.mock._lock:
+            self.mock.counts['connections'] += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=None, content_type='application/json'):
+        with self.mock._lock:
+            self.mock.counts['requests'] += 1
+            self.mock.counts[status] += 1
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if body:
+            self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_GET(self):
+        if self.mock.latency:
+            time.sleep(self.mock.latency)
+        failure = self.mock.next_failure()
+        if failure is not None:
+            status, retry_after = failure
+            self._send(status, b'{"message": "injected failure"}',
+                       {'Retry-After': str(retry_after)} if retry_after is not None else None)
+            return
+        url = urlsplit(self.path)
+        with self.mock._lock:
+            self.mock.counts['/'.join(url.path.split('/')[2:4])] += 1
+        status, body, content_type = self.mock.respond(url.path, self.headers.get('Accept', ''))
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        not_modified = status == 200 and self.headers.get('If-None-Match') == etag
+        exhausted, headers = self.mock.rate_limit_headers(counted=not not_modified)
+        if exhausted:
+            self._send(403, b'{"message": "API rate limit exceeded"}', headers)
+        elif not_modified:
+            self._send(304, headers=dict(headers, ETag=etag))
+        else:
+            self._send(status, body, dict(headers, ETag=etag) if status == 200 else headers, content_type)
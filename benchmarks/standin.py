@@ -0,0 +1,81 @@
+# Local stand-in for the two GitHub repos, so the page can be driven headlessly
+# and offline:
+#   - the public AFL repo is this checkout (AFL_DATA_SOURCE=local)
+#   - AFLPlayerStatsRepo is synthesised from the players listed in the Round_N
+#     average CSVs: one AFLPlayers2024.xlsx plus a "<team_url>/<name_url>.csv"
+#     season file per player, with the same columns as the real repo.
+import os
+import re
+import sys
+import glob
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_DIR, 'streamlit_app.py')
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+SEASON_COLUMNS = ['Player Name', 'Team', 'Round', 'Date', 'Opponent', 'Home/Away', 'Result', 'D', 'K', 'HB', 'M',
+                  'G', 'B', 'T', 'HO', 'GA', 'I50', 'CL', 'CG', 'R50', 'FF', 'FA', 'AF', 'SC']
+
+
+def slugify(name):
+    return re.sub('[^a-z0-9]+', '-', name.lower()).strip('-')
+
+
+def team_urls():
+    fixture_df = pd.read_excel(os.path.join(REPO_DIR, 'AFLFixtures2024.xlsx'))
+    urls = dict(zip(fixture_df['Home Team'], fixture_df['Home Team url']))
+    urls.update(zip(fixture_df['Away Team'], fixture_df['Away Team url']))
+    return urls
+
+
+def build_private_repo(out_dir, games=12, seed=0):
+    # Writes the synthetic AFLPlayerStatsRepo into out_dir; returns the player count
+    urls = team_urls()
+    squads = {}
+    for path in glob.glob(os.path.join(REPO_DIR, 'Round_*', '*', '* Season Average.csv')):
+        team = os.path.basename(path)[:-len(' Season Average.csv')]
+        for player in pd.read_csv(path)['Player']:
+            squads.setdefault(player, team)
+
+    rng = np.random.default_rng(seed)
+    opponents = sorted(urls)
+    dates = pd.date_range('2024-03-14', periods=games, freq='7D').strftime('%d/%m/%Y')
+    rows = []
+    for player, team in sorted(squads.items()):
+        name_url = slugify(player)
+        rows.append({'Player': player, 'Team': team, 'name_url': name_url})
+        team_dir = os.path.join(out_dir, urls[team])
+        os.makedirs(team_dir, exist_ok=True)
+        season_df = pd.DataFrame({
+            'Player Name': player, 'Team': team, 'Round': [str(n) for n in range(1, games + 1)], 'Date': dates,
+            'Opponent': rng.choice(opponents, games), 'Home/Away': rng.choice(['Home', 'Away'], games),
+            'Result': rng.choice(['Win 90-70', 'Loss 60-85', 'Draw 80-80'], games),
+            'D': rng.integers(4, 36, games), 'G': rng.integers(0, 5, games), 'B': rng.integers(0, 4, games),
+        })
+        for column in SEASON_COLUMNS:
+            if column not in season_df:
+                season_df[column] = rng.integers(0, 10, games)
+        season_df[SEASON_COLUMNS].to_csv(os.path.join(team_dir, f'{name_url}.csv'), index=False)
+    pd.DataFrame(rows).to_excel(os.path.join(out_dir, 'AFLPlayers2024.xlsx'), index=False)
+    return len(rows)
+
+
+def configure_environment(private_dir):
+    os.environ['AFL_DATA_SOURCE'] = 'local'
+    os.environ['AFL_PRIVATE_DATA_SOURCE'] = 'local'
+    os.environ['AFL_PRIVATE_DATA_DIR'] = private_dir
+
+
+def make_app_test(timeout=120):
+    from streamlit.testing.v1 import AppTest
+    app_test = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    # The GitHub clients are built from secrets at import, so they need placeholders
+    app_test.secrets['clientid'] = {'clientid': 'standin'}
+    app_test.secrets['clientsecret'] = {'clientsecret': 'standin'}
+    app_test.secrets['privaterepo'] = {'privaterepo': 'standin'}
+    return app_test
@@ -0,0 +1,172 @@
+import sys
+import hashlib
+import functools
+import threading
+from collections import Counter
+
+from cachetools import TLRUCache
+
+from schema import frame_nbytes
+
+# Process-wide cache for everything the loaders produce. Entries are keyed on
+# (loader, path, content version), where the version is the blob/tree SHA from
+# the data source listing (or an mtime stamp on disk), so:
+#   - every match/path gets its own entry (no globals leaking into the key)
+#   - re-uploaded data gets a new version and replaces only the entries it changed
+# Entries expire after a TTL, and the least recently used ones are evicted once
+# the memory budget is used up. Misses in the namespaces listed in
+# shared_namespaces go to a shared disk tier (shared_cache.py) before the loader,
+# so other processes on the same volume don't fetch the same data again.
+
+
+def size_of(value):
+    # Rough resident size in bytes, used to enforce the memory budget
+    if callable(getattr(value, 'nbytes', None)):
+        # The loaders' own objects (engines, indexes, registries) add up what they hold. An entry is only
+        # sized when it is stored, so they load everything up front, or bound what they build lazily and
+        # count the bound
+        return value.nbytes()
+    if hasattr(value, 'columns') and hasattr(value, 'memory_usage'):
+        # Shared category dictionaries belong to the process, not to any one entry
+        return frame_nbytes(value)
+    if hasattr(value, 'memory_usage'):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum() if hasattr(usage, 'sum') else usage)
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(getattr(value, 'nbytes', None), int):
+        # Arrow tables and numpy arrays
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(size_of(key) + size_of(item) for key, item in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(size_of(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def folder_version(entries):
+    # Content hash of a directory listing: changes when any entry's SHA changes
+    digest = hashlib.sha1()
+    for entry in sorted(entries, key=lambda entry: entry.path):
+        digest.update(f'{entry.path}\0{entry.sha}\n'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+def file_version(entries, name):
+    for entry in entries:
+        if entry.name == name:
+            return entry.sha
+    return None
+
+
+def path_version(list_dir, path):
+    # file_version for a file anywhere in the tree, from its folder's listing
+    folder, _, name = path.rpartition('/')
+    return file_version(list_dir(folder), name)
+
+
+class _BudgetCache(TLRUCache):
+    def __init__(self, owner, maxsize, ttu, getsizeof):
+        super().__init__(maxsize, ttu, getsizeof=getsizeof)
+        self.owner = owner
+
+    def popitem(self):
+        key, value = super().popitem()
+        self.owner.evictions += 1
+        return key, value
+
+
+class ContentCache:
+    def __init__(self, max_bytes=256 * 2 ** 20, ttl=3600, namespace_ttls=None, shared=None, shared_namespaces=()):
+        self.ttl = ttl
+        # e.g. {'listing': 60}: listings are what reveal new SHAs, so they expire sooner
+        self.namespace_ttls = dict(namespace_ttls or {})
+        self.hits = Counter()
+        self.misses = Counter()
+        self.evictions = 0
+        self.shared = shared
+        self.shared_namespaces = frozenset(shared_namespaces)
+        self._lock = threading.RLock()
+        # One lock per key being loaded, so concurrent misses (e.g. a prefetch and the page) load it once
+        self._key_locks = {}
+        self._cache = _BudgetCache(self, max_bytes, self._time_to_use, size_of)
+
+    def _time_to_use(self, key, value, now):
+        return now + self.namespace_ttls.get(key[0], self.ttl)
+
+    def _drop_stale(self, namespace, path, version):
+        stale = [key for key in list(self._cache.keys())
+                 if key[0] == namespace and key[1] == path and key[2] != version]
+        for key in stale:
+            self._cache.pop(key, None)
+
+    def _lookup(self, namespace, key):
+        try:
+            value = self._cache[key]
+        except KeyError:
+            return False, None
+        self.hits[namespace] += 1
+        return True, value
+
+    def get_or_load(self, namespace, path, version, loader):
+        key = (namespace, path, version)
+        with self._lock:
+            found, value = self._lookup(namespace, key)
+            if found:
+                return value
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        try:
+            with key_lock:
+                with self._lock:
+                    found, value = self._lookup(namespace, key)
+                    if found:
+                        return value
+                    self.misses[namespace] += 1
+                if self.shared is not None and namespace in self.shared_namespaces:
+                    value = self.shared.get_or_load(namespace, path, version, loader)
+                else:
+                    value = loader()
+                with self._lock:
+                    self._drop_stale(namespace, path, version)
+                    try:
+                        self._cache[key] = value
+                    except ValueError:
+                        # Bigger than the whole budget: serve it without caching
+                        pass
+                return value
+        finally:
+            with self._lock:
+                self._key_locks.pop(key, None)
+
+    def contains(self, namespace, path, version):
+        with self._lock:
+            return (namespace, path, version) in self._cache
+
+    def memoize(self, func):
+        # Wraps func(source, path) into wrapper(source, path, version)
+        @functools.wraps(func)
+        def wrapper(source, path, version):
+            return self.get_or_load(func.__name__, path, version, lambda: func(source, path))
+        return wrapper
+
+    def invalidate(self, namespace=None, path=None):
+        with self._lock:
+            for key in list(self._cache.keys()):
+                if (namespace is None or key[0] == namespace) and (path is None or key[1] == path):
+                    self._cache.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            self._cache.expire()
+            namespaces = sorted(set(self.hits) | set(self.misses))
+            stats = {
+                'entries': len(self._cache),
+                'bytes': self._cache.currsize,
+                'max_bytes': self._cache.maxsize,
+                'evictions': self.evictions,
+                'loaders': {namespace: {'hits': self.hits[namespace], 'misses': self.misses[namespace]}
+                            for namespace in namespaces},
+            }
+        if self.shared is not None:
+            stats['shared'] = self.shared.stats()
+        return stats
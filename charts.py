@@ -0,0 +1,271 @@
+from functools import lru_cache
+
+import pandas as pd
+
+# Chart spec factory. The season and previous-games charts have the same marks,
+# axes and colours for every player; only the games and the average rule change.
+# Each chart is built with Altair once, against two named datasets ('player' and
+# 'rule'), and serialized to a Vega-Lite dict once (to_dict() runs the schema
+# validation, which was most of the chart cost on every rerun). The rule's field
+# (e.g. 'Last 5 Average Disposals') is then filled into a copy of the rule layer,
+# and a player's spec is that template plus its datasets, for st.vega_lite_chart.
+# Altair is only imported when the first template is built.
+
+# Generate round names for 0 to 24
+round_names = [str(i) for i in range(0, 25)]
+# Append special rounds
+special_rounds = ['EF', 'QF', 'PF', 'SF', 'GF']
+round_names.extend(special_rounds)
+
+# Columns each chart reads from the player's games
+SEASON_FIELDS = ['DisplayRound', 'Round', 'D', 'G', 'B']
+PREVIOUS_FIELDS = ['Date', 'Year', 'Round', 'D', 'G', 'B']
+
+# Stand-in for the rule's field name while the template is built
+_RULE_FIELD = 'rule_value'
+
+
+def _average_rule(alt):
+    return alt.Chart(alt.NamedData(name='rule')).mark_rule(
+        color="#AEC6CF",
+        strokeWidth=2.5,
+        strokeDash=[5, 5]
+    ).encode(
+        y=f'{_RULE_FIELD}:Q'
+    )
+
+
+def _with_rule_field(template, field):
+    # The rule is always the last layer; only it is copied
+    rule_layer = dict(template['layer'][-1])
+    rule_layer['encoding'] = {'y': dict(rule_layer['encoding']['y'], field=field)}
+    return dict(template, layer=template['layer'][:-1] + [rule_layer])
+
+
+@lru_cache(maxsize=None)
+def _season_base():
+    import altair as alt
+    player_data = alt.NamedData(name='player')
+
+    # Custom axis configuration
+    custom_axis = alt.Axis(
+        title="Round",
+        titleFontSize=25,
+        labelFontSize=17,
+        labelAngle=0,
+    )
+
+    # Create the line chart with sorted 'DisplayRound'
+    line_chart = alt.Chart(player_data).mark_line(
+        color="#488f31",
+        strokeWidth=3
+    ).encode(
+        x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),
+        y=alt.Y("D:Q", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40, labelFontSize=17))
+    )
+
+    # Create the point chart with sorted 'DisplayRound'
+    point_chart = alt.Chart(player_data).mark_point(
+        size=300,
+        color="#488f31",
+        strokeWidth=4,
+        filled=True
+    ).encode(
+        x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),
+        y=alt.Y("D:Q", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40)),
+        tooltip=[
+            alt.Tooltip(field="Round", title="Round"),
+            alt.Tooltip(field="D", title="Disposals"),
+        ]
+    )
+
+    # Goals Line Chart
+    goals_line_chart = alt.Chart(player_data).mark_line(
+        color="#488f31",
+        strokeWidth=3
+    ).encode(
+        x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),
+        y=alt.Y("G:Q",
+                axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, titleFontSize=30, labelFontSize=17,
+                              format='d')))
+
+    # Goals Point Chart
+    goals_point_chart = alt.Chart(player_data).mark_point(
+        size=300,
+        color="#488f31",
+        strokeWidth=3,
+        filled=True
+    ).encode(
+        x=alt.X('DisplayRound:N', sort=round_names),
+        y=alt.Y("G:Q", scale=alt.Scale(nice=False)),
+        tooltip=[
+            alt.Tooltip("Round:N", title="Round"),
+            alt.Tooltip("G:Q", title="Goals"),
+        ]
+    )
+
+    # Behinds Point Chart
+    behinds_point_chart = alt.Chart(player_data).mark_point(
+        size=100,
+        color="#f54242",
+        filled=True
+    ).encode(
+        x=alt.X('DisplayRound:N', sort=round_names),
+        y=alt.Y("B:Q",
+                axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, titleFontSize=30, labelFontSize=17,
+                              format='d')),
+        tooltip=[
+            alt.Tooltip("Round:N", title="Round"),
+            alt.Tooltip("B:Q", title="Behinds"),
+        ]
+    )
+
+    disposal_chart = alt.layer(line_chart, point_chart, _average_rule(alt))
+    goals_chart = alt.layer(goals_line_chart, goals_point_chart, behinds_point_chart, _average_rule(alt))
+    return disposal_chart.to_dict(), goals_chart.to_dict()
+
+
+@lru_cache(maxsize=None)
+def _previous_base():
+    import altair as alt
+    player_data = alt.NamedData(name='player')
+
+    custom_axis = alt.Axis(
+        title='Year',
+        titleFontSize=25,
+        tickCount=5,
+        labelExpr="year(datum.value)",
+        labelFontSize=20
+    )
+
+    # Disposal Chart using Date for x-axis
+    disposal_chart = alt.Chart(player_data).mark_point(
+        size=300,
+        color="#488f31",
+        strokeWidth=4,
+        filled=True
+    ).encode(
+        x=alt.X('Date:T', axis=custom_axis,
+                scale=alt.Scale(nice=True)),
+        y=alt.Y("D:Q", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40)),
+        tooltip=[
+            alt.Tooltip(field="Year", title="Year"),
+            alt.Tooltip(field="Round", title="Round"),
+            alt.Tooltip(field="D", title="Disposals"),
+        ]
+    )
+
+    # Disposal Line Chart
+    disposal_line_chart = alt.Chart(player_data).mark_line(
+        color="#488f31",
+        strokeWidth=3
+    ).encode(
+        x=alt.X('Date:T', axis=custom_axis),
+        y=alt.Y("D:Q", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40))
+    )
+
+    # Goals Chart using Date for x-axis
+    goals_chart = alt.Chart(player_data).mark_point(
+        size=300,
+        color="#488f31",
+        strokeWidth=4,
+        filled=True
+    ).encode(
+        x=alt.X('Date:T', axis=custom_axis, scale=alt.Scale(nice=True)),
+        y=alt.Y("G:Q",
+                axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, format='d', tickCount=5, titleFontSize=30),
+                scale=alt.Scale(domainMin=0, nice=False)),
+        tooltip=[
+            alt.Tooltip(field="Year", title="Year"),
+            alt.Tooltip(field="Round", title="Round"),
+            alt.Tooltip(field="G", title="Goals")
+        ]
+    )
+
+    # Goals Line Chart
+    goals_line_chart = alt.Chart(player_data).mark_line(
+        color="#488f31",
+        strokeWidth=3
+    ).encode(
+        x=alt.X('Date:T', axis=custom_axis,
+                scale=alt.Scale(nice=True)),
+        y=alt.Y("G:Q", axis=alt.Axis(labelAngle=0, format='d', tickCount=5,
+                                     titleFontSize=30))
+    )
+
+    # Behinds Chart using Date for x-axis
+    behinds_chart = alt.Chart(player_data).mark_circle(size=100, color="#f54242").encode(
+        x=alt.X('Date:T', axis=custom_axis,
+                scale=alt.Scale(nice=False)),
+        y=alt.Y("B:Q", axis=alt.Axis(title="Goals 🟢 Behinds 🔴", format='d', tickCount=5, titleFontSize=30),
+                scale=alt.Scale(domainMin=0, nice=False)),
+        tooltip=[
+            alt.Tooltip(field="Year", title="Year"),
+            alt.Tooltip(field="Round", title="Round"),
+            alt.Tooltip(field="B", title="Behinds")
+        ]
+    )
+
+    # Combine disposal points, lines, average line, with bigger labels and titles
+    combined_disposal_chart = alt.layer(disposal_line_chart, disposal_chart, _average_rule(alt))
+    combined_disposal_chart = combined_disposal_chart.configure_axisY(labelFontSize=20, titleFontSize=20)
+
+    # Combine goal points, behinds points, goal lines, average line
+    combined_chart = alt.layer(goals_chart, behinds_chart, goals_line_chart, _average_rule(alt))
+    combined_chart = combined_chart.configure_axisY(labelFontSize=30, titleFontSize=20)
+    return combined_disposal_chart.to_dict(), combined_chart.to_dict()
+
+
+@lru_cache(maxsize=None)
+def season_templates(disposals_field, goals_field):
+    disposal_base, goals_base = _season_base()
+    return _with_rule_field(disposal_base, disposals_field), _with_rule_field(goals_base, goals_field)
+
+
+@lru_cache(maxsize=None)
+def previous_templates(disposals_field, goals_field):
+    disposal_base, goals_base = _previous_base()
+    return _with_rule_field(disposal_base, disposals_field), _with_rule_field(goals_base, goals_field)
+
+
+def _with_year_domain(template, dates):
+    # The Year axis spans the seasons the games are from, whatever seasons the archive holds (the layers
+    # share the x scale, so it is set wherever a layer has one)
+    dates = dates.dropna()
+    if dates.empty:
+        return template
+    domain = [{'year': int(dates.min().year)}, {'year': int(dates.max().year) + 1}]
+    layers = []
+    for layer in template['layer']:
+        x = layer.get('encoding', {}).get('x')
+        if x is not None and 'scale' in x:
+            layer = dict(layer, encoding=dict(layer['encoding'], x=dict(x, scale=dict(x['scale'], domain=domain))))
+        layers.append(layer)
+    return dict(template, layer=layers)
+
+
+def _with_data(template, games_df, field, value):
+    # Shallow copy: the template is shared, only 'datasets' is per player
+    spec = dict(template)
+    spec['datasets'] = {'player': games_df, 'rule': pd.DataFrame({field: [value]})}
+    return spec
+
+
+def season_specs(season_df, window, average_disposals, average_goals):
+    # (disposals spec, goals/behinds spec) for a player's season vs their window average
+    disposals_field, goals_field = f'{window} Disposals', f'{window} Goals'
+    disposal_template, goals_template = season_templates(disposals_field, goals_field)
+    games_df = season_df[SEASON_FIELDS]
+    return (_with_data(disposal_template, games_df, disposals_field, average_disposals),
+            _with_data(goals_template, games_df, goals_field, average_goals))
+
+
+def previous_specs(previous_df, opponent, average_disposals, average_goals):
+    # (disposals spec, goals/behinds spec) for a player's previous games vs an opponent
+    disposals_field, goals_field = f'Average Disposals vs {opponent}', f'Average Goals vs {opponent}'
+    disposal_template, goals_template = previous_templates(disposals_field, goals_field)
+    games_df = previous_df[PREVIOUS_FIELDS]
+    disposal_template = _with_year_domain(disposal_template, games_df['Date'])
+    goals_template = _with_year_domain(goals_template, games_df['Date'])
+    return (_with_data(disposal_template, games_df, disposals_field, average_disposals),
+            _with_data(goals_template, games_df, goals_field, average_goals))
@@ -0,0 +1,101 @@
+from collections import namedtuple
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import csv as pa_csv
+
+# Typed CSV ingest: every kind of CSV the app reads has a fixed layout, so it is
+# parsed with the pyarrow CSV reader against an explicit schema instead of
+# pd.read_csv inferring dtypes (and dayfirst dates, one value at a time) again
+# for every file. Columns the app never uses are skipped at read time.
+#
+# Dates in a format the schema doesn't list (another exporter, a hand-edited
+# file) fall back to pandas' tolerant dayfirst parsing for that file only.
+#
+#   read_csv(data, 'h2h_games')                        one file's bytes -> DataFrame
+#   read_csv(data, 'season', SEASON_LOG_COLUMNS)       a different column selection
+
+# columns: read by default, in this order; types: every column the kind can have;
+# date_formats: strptime formats tried for the timestamp columns
+FileSchema = namedtuple('FileSchema', ['columns', 'types', 'date_formats'])
+
+TIMESTAMP = pa.timestamp('ns')
+
+
+def _types(strings=(), integers=(), floats=(), timestamps=()):
+    types = {column: pa.string() for column in strings}
+    types.update((column, pa.int16()) for column in integers)
+    types.update((column, pa.float64()) for column in floats)
+    types.update((column, TIMESTAMP) for column in timestamps)
+    return types
+
+
+AVERAGE_COLUMNS = ['Player', 'Total Games Played', 'Highest Dis.', 'Lowest Dis.', 'Disposals', 'Goals', 'Behinds',
+                   'Frees For', '15 Dis. %', '20 Dis. %', '25 Dis. %', '1 Goal %', '2 Goals %']
+H2H_GAMES_COLUMNS = ['Year', 'Player Name', 'Round', 'Date', 'Opponent', 'Result', 'D', 'G', 'B']
+H2H_RESULTS_COLUMNS = ['Date', 'Home Team Outcome', 'Away Team Outcome', 'Home Team', 'Away Team']
+# The season columns the page shows (the others are in player_index.drop_columns_2024), and those the
+# rolling averages also need
+SEASON_COLUMNS = ['Player Name', 'Round', 'Date', 'Opponent', 'Result', 'D', 'G', 'B']
+SEASON_LOG_COLUMNS = SEASON_COLUMNS + ['FF']
+PLAYER_ALIASES_COLUMNS = ['Alias', 'Player', 'Team']
+
+SCHEMAS = {
+    'average': FileSchema(AVERAGE_COLUMNS, _types(
+        strings=['Player'],
+        integers=['Total Games Played', 'Highest Dis.', 'Lowest Dis.',
+                  '15 Dis. %', '20 Dis. %', '25 Dis. %', '1 Goal %', '2 Goals %'],
+        floats=['Disposals', 'Goals', 'Behinds', 'Frees For']), ()),
+    # Finals make Round a mix of numbers and names, so it is always text
+    'h2h_games': FileSchema(H2H_GAMES_COLUMNS, _types(
+        strings=['Player Name', 'Round', 'Opponent', 'Result'], integers=['Year', 'D', 'G', 'B'],
+        timestamps=['Date']), ('%d/%m/%Y',)),
+    'h2h_results': FileSchema(H2H_RESULTS_COLUMNS, _types(
+        strings=['Home Team Outcome', 'Away Team Outcome', 'Home Team', 'Away Team'],
+        timestamps=['Date']), ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d')),
+    'season': FileSchema(SEASON_COLUMNS, _types(
+        strings=['Player Name', 'Team', 'Round', 'Opponent', 'Home/Away', 'Result'],
+        integers=['D', 'K', 'HB', 'M', 'G', 'B', 'T', 'HO', 'GA', 'I50', 'CL', 'CG', 'R50', 'FF', 'FA', 'AF', 'SC'],
+        timestamps=['Date']), ('%d/%m/%Y',)),
+    'player_aliases': FileSchema(PLAYER_ALIASES_COLUMNS, _types(strings=PLAYER_ALIASES_COLUMNS), ()),
+}
+
+# Files are a few KB, too small for the reader's thread pool to pay off
+_READ_OPTIONS = pa_csv.ReadOptions(use_threads=False)
+
+
+def _read(data, schema, columns, types):
+    convert_options = pa_csv.ConvertOptions(
+        column_types=types,
+        include_columns=list(schema.columns if columns is None else columns),
+        timestamp_parsers=list(schema.date_formats),
+        # Empty fields are missing values, as with pd.read_csv
+        strings_can_be_null=True,
+    )
+    return pa_csv.read_csv(pa.BufferReader(data), read_options=_READ_OPTIONS, convert_options=convert_options)
+
+
+def read_table(data, kind, columns=None):
+    schema = SCHEMAS[kind]
+    try:
+        return _read(data, schema, columns, schema.types)
+    except pa.ArrowInvalid:
+        timestamps = [name for name, column_type in schema.types.items() if column_type == TIMESTAMP]
+        if not timestamps:
+            raise
+    # Dates in some other format: read them as text and parse them as the page used to, day first
+    # (anything still unparseable becomes NaT). A problem in another column raises again here.
+    table = _read(data, schema, columns, dict(schema.types, **{name: pa.string() for name in timestamps}))
+    for name in timestamps:
+        if name in table.column_names:
+            dates = pd.to_datetime(table.column(name).to_pandas(), dayfirst=True, errors='coerce')
+            table = table.set_column(table.column_names.index(name), name, pa.array(dates, type=TIMESTAMP))
+    return table
+
+
+def read_csv(data, kind, columns=None):
+    # A column the file doesn't have raises ArrowKeyError, a KeyError. Table.to_pandas() costs more than
+    # the parse for files this size, so the frame is built from the columns' arrays directly.
+    table = read_table(data, kind, columns)
+    return pd.DataFrame({name: column.to_numpy() for name, column in zip(table.column_names, table.columns)},
+                        copy=False)
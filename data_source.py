@@ -0,0 +1,290 @@
+import os
+import json
+import base64
+import tempfile
+import threading
+from types import SimpleNamespace
+from collections import namedtuple
+from urllib.parse import quote
+
+# Pluggable data sources for the Round_N tree and the player stats repo.
+# Every backend exposes the same two calls the app needs:
+#   list_dir(path)   -> list of Entry
+#   read_bytes(path) -> raw file bytes
+# so the loaders in streamlit_app.py don't care where the files live.
+
+# A single file or directory. `sha` identifies the content version: the git blob
+# SHA on GitHub, or an mtime/size stamp on disk.
+Entry = namedtuple('Entry', ['name', 'path', 'type', 'sha', 'size'])
+
+
+def join_path(*parts):
+    return '/'.join(part.strip('/') for part in parts if part)
+
+
+class DataSource:
+    def list_dir(self, path=''):
+        raise NotImplementedError
+
+    def read_bytes(self, path):
+        raise NotImplementedError
+
+    def read_text(self, path, encoding='utf-8'):
+        return self.read_bytes(path).decode(encoding)
+
+    def describe(self):
+        return type(self).__name__
+
+
+class LocalDataSource(DataSource):
+    # Reads straight from a checkout on disk (the app ships next to Round_N/)
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+
+    def _full_path(self, path):
+        return os.path.join(self.root, *path.split('/')) if path else self.root
+
+    def list_dir(self, path=''):
+        entries = []
+        with os.scandir(self._full_path(path)) as it:
+            for item in it:
+                if item.name.startswith('.'):
+                    continue
+                stat = item.stat()
+                entry_type = 'dir' if item.is_dir() else 'file'
+                entries.append(Entry(item.name, join_path(path, item.name), entry_type,
+                                     f"{stat.st_mtime_ns:x}-{stat.st_size:x}", stat.st_size))
+        entries.sort(key=lambda entry: entry.name)
+        return entries
+
+    def read_bytes(self, path):
+        with open(self._full_path(path), 'rb') as f:
+            return f.read()
+
+    def describe(self):
+        return f"local:{self.root}"
+
+
+# A repo at one commit from a single recursive git-tree request (see tree_sync.py).
+# `elements` have path, type ('blob' or 'tree'), sha and size.
+GitTree = namedtuple('GitTree', ['commit', 'elements', 'truncated'])
+
+
+class GitHubDataSource(DataSource):
+    # One contents API call per listing and per file, i.e. the original code path
+    def __init__(self, repo, ref=None):
+        self.repo = repo
+        self.ref = ref
+
+    def _get_contents(self, path):
+        try:
+            if self.ref:
+                return self.repo.get_contents(path, ref=self.ref)
+            return self.repo.get_contents(path)
+        except Exception as e:
+            if getattr(e, 'status', None) == 404:
+                raise FileNotFoundError(path) from e
+            raise
+
+    def list_dir(self, path=''):
+        contents = self._get_contents(path)
+        if not isinstance(contents, list):
+            contents = [contents]
+        return [Entry(content.name, content.path, content.type, content.sha, content.size)
+                for content in contents]
+
+    def read_bytes(self, path):
+        return self._get_contents(path).decoded_content
+
+    def head_commit(self):
+        return self.repo.get_branch(self.repo.default_branch).commit.sha
+
+    def git_tree(self, commit):
+        tree = self.repo.get_git_tree(commit, recursive=True)
+        return GitTree(commit, tree.tree, bool(tree.raw_data.get('truncated')))
+
+    def git_blob(self, sha):
+        blob = self.repo.get_git_blob(sha)
+        if blob.encoding == 'base64':
+            return base64.b64decode(blob.content)
+        return blob.content.encode('utf-8')
+
+    def describe(self):
+        return f"github:{self.repo.full_name}"
+
+
+class GitHubRestDataSource(GitHubDataSource):
+    # The same calls straight over the REST API through the shared FetchClient
+    # (http_client.py): pooled connections, ETag revalidation and rate-limit backoff
+    def __init__(self, client, full_name, ref=None):
+        self.client = client
+        self.full_name = full_name
+        self.ref = ref
+
+    def _params(self):
+        return {'ref': self.ref} if self.ref else None
+
+    def _contents_url(self, path):
+        return f"repos/{self.full_name}/contents/{quote(path)}"
+
+    def list_dir(self, path=''):
+        contents = self.client.get_json(self._contents_url(path), self._params())
+        if not isinstance(contents, list):
+            contents = [contents]
+        return [Entry(content['name'], content['path'], content['type'], content['sha'], content['size'])
+                for content in contents]
+
+    def read_bytes(self, path):
+        return self.client.get_bytes(self._contents_url(path), self._params())
+
+    def head_commit(self):
+        # HEAD resolves to the default branch; this media type returns just the SHA
+        response = self.client.get(f"repos/{self.full_name}/commits/HEAD", accept='application/vnd.github.sha')
+        return response.content.decode('ascii')
+
+    def git_tree(self, commit):
+        tree = self.client.get_json(f"repos/{self.full_name}/git/trees/{commit}", {'recursive': '1'})
+        elements = [SimpleNamespace(path=element['path'], type=element['type'], sha=element['sha'],
+                                    size=element.get('size')) for element in tree['tree']]
+        return GitTree(commit, elements, bool(tree.get('truncated')))
+
+    def git_blob(self, sha):
+        return self.client.get_bytes(f"repos/{self.full_name}/git/blobs/{sha}")
+
+    def describe(self):
+        return f"github:{self.full_name}"
+
+
+class MirrorDataSource(DataSource):
+    # Read-through mirror: serves from a local directory and only goes upstream for
+    # listings and blobs it hasn't seen (or whose SHA has changed) yet.
+    MANIFEST_NAME = '.mirror_manifest.json'
+
+    def __init__(self, upstream, root):
+        self.upstream = upstream
+        self.root = os.path.abspath(root)
+        self.local = LocalDataSource(self.root)
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self.manifest = self._load_manifest()
+        if self.manifest.get('commit'):
+            self._pin(self.manifest['commit'])
+
+    def _pin(self, commit):
+        # After a tree sync, upstream reads go to the synced commit so the mirror stays consistent with it
+        if hasattr(self.upstream, 'ref'):
+            self.upstream.ref = commit
+
+    def _manifest_path(self):
+        return os.path.join(self.root, self.MANIFEST_NAME)
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path()) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {}
+        manifest.setdefault('dirs', {})
+        manifest.setdefault('files', {})
+        return manifest
+
+    def save_manifest(self):
+        with self._lock:
+            payload = json.dumps(self.manifest, indent=1, sort_keys=True).encode('utf-8')
+        write_atomic(self._manifest_path(), payload)
+
+    def list_dir(self, path=''):
+        listing = self.manifest['dirs'].get(path)
+        if listing is None:
+            entries = self.upstream.list_dir(path)
+            with self._lock:
+                self.manifest['dirs'][path] = [list(entry) for entry in entries]
+            self.save_manifest()
+            return entries
+        return [Entry(*entry) for entry in listing]
+
+    def _expected_sha(self, path):
+        parent, _, name = path.rpartition('/')
+        for entry in self.manifest['dirs'].get(parent, []):
+            if entry[0] == name:
+                return entry[3]
+        return None
+
+    def read_bytes(self, path):
+        expected_sha = self._expected_sha(path)
+        mirrored_sha = self.manifest['files'].get(path)
+        if mirrored_sha is not None and (expected_sha is None or expected_sha == mirrored_sha):
+            try:
+                return self.local.read_bytes(path)
+            except OSError:
+                pass
+        data = self.upstream.read_bytes(path)
+        self.store(path, data, expected_sha or '')
+        return data
+
+    def store(self, path, data, sha, save=True):
+        write_atomic(self.local._full_path(path), data)
+        with self._lock:
+            self.manifest['files'][path] = sha
+        if save:
+            self.save_manifest()
+
+    def remove(self, path, save=True):
+        try:
+            os.remove(self.local._full_path(path))
+        except OSError:
+            pass
+        with self._lock:
+            self.manifest['files'].pop(path, None)
+        if save:
+            self.save_manifest()
+
+    def replace_listings(self, listings, commit=None):
+        # Swap in every directory listing at once, e.g. from one recursive git tree (see tree_sync.py)
+        with self._lock:
+            self.manifest['dirs'] = {path: [list(entry) for entry in entries] for path, entries in listings.items()}
+            self.manifest['commit'] = commit
+            self._pin(commit)
+        self.save_manifest()
+
+    def invalidate(self, path=None):
+        # Drop cached listings so the next list_dir goes upstream again (at the branch head, not a synced commit)
+        with self._lock:
+            if path is None:
+                self.manifest['dirs'] = {}
+            else:
+                self.manifest['dirs'].pop(path, None)
+            self.manifest.pop('commit', None)
+            self._pin(None)
+        self.save_manifest()
+
+    def describe(self):
+        return f"mirror:{self.root} <- {self.upstream.describe()}"
+
+
+def write_atomic(file_path, data):
+    # Write to a temp file in the same directory, then rename over the target
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def make_data_source(kind, root=None, repo=None, mirror_root=None, client=None, full_name=None):
+    # kind is one of 'local', 'github' or 'mirror'; GitHub goes through `client` (a FetchClient) when
+    # one is given, otherwise through a PyGithub `repo`
+    if kind == 'local':
+        return LocalDataSource(root)
+    upstream = GitHubRestDataSource(client, full_name) if client is not None else GitHubDataSource(repo)
+    if kind == 'github':
+        return upstream
+    if kind == 'mirror':
+        return MirrorDataSource(upstream, mirror_root)
+    raise ValueError(f"Unknown data source: {kind!r} (expected 'local', 'github' or 'mirror')")
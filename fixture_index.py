@@ -0,0 +1,144 @@
+import os
+import time
+import argparse
+from io import BytesIO
+from collections import namedtuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from data_source import LocalDataSource, write_atomic
+from cache import file_version, size_of
+
+# Compiled fixture: the season's fixture workbook parsed once into a small typed
+# Arrow file, so a new server process never needs openpyxl. Display strings for
+# the match header are computed at compile time, and FixtureIndex answers every
+# per-match lookup from a dict keyed on (round, match string).
+#
+#   python fixture_index.py AFLFixtures2024.xlsx
+
+FIXTURE_COLUMNS = {
+    'Match Number': 'match_number',
+    'Round Number': 'round',
+    'Date': 'date',
+    'Location': 'location',
+    'Home Team': 'home_team',
+    'Away Team': 'away_team',
+    'Home Team url': 'home_team_url',
+    'Away Team url': 'away_team_url',
+    'Folder url': 'folder_url',
+    'Match String': 'match_string',
+}
+# Repeated strings are stored once per file
+DICTIONARY_COLUMNS = ['location', 'home_team', 'away_team', 'home_team_url', 'away_team_url']
+# Schema metadata key for the workbook version the file was compiled from
+SOURCE_VERSION_KEY = b'source_version'
+# Bump when the compiled layout changes so old files get rebuilt
+INDEX_VERSION = 1
+
+Match = namedtuple('Match', list(FIXTURE_COLUMNS.values()) + ['day_time', 'header'])
+
+
+def default_fixture_path(root, workbook_name):
+    return os.path.join(root, '.fixture_index', f'{os.path.splitext(workbook_name)[0]}.arrow')
+
+
+def compile_fixture(data):
+    # Workbook bytes -> typed Arrow table with the header strings precomputed
+    fixture_df = pd.read_excel(BytesIO(data))
+    fixture_df = fixture_df[list(FIXTURE_COLUMNS)].rename(columns=FIXTURE_COLUMNS)
+    fixture_df['match_number'] = fixture_df['match_number'].astype('int16')
+    fixture_df['round'] = fixture_df['round'].astype('int16')
+    fixture_df['date'] = pd.to_datetime(fixture_df['date'])
+    fixture_df['day_time'] = fixture_df['date'].dt.strftime('%A, %I:%M %p')
+    fixture_df['header'] = (fixture_df['match_string'] + ' - ' + fixture_df['location'] + ' - ' +
+                            fixture_df['day_time'] + ' AEST')
+    table = pa.Table.from_pandas(fixture_df, preserve_index=False).replace_schema_metadata(None)
+    for column in DICTIONARY_COLUMNS:
+        index = table.schema.get_field_index(column)
+        table = table.set_column(index, column, pc.dictionary_encode(table.column(column)))
+    return table
+
+
+def write_fixture_index(table, out_path, source_version):
+    metadata = {SOURCE_VERSION_KEY: str(source_version).encode('utf-8'),
+                b'index_version': str(INDEX_VERSION).encode('utf-8')}
+    table = table.replace_schema_metadata(metadata)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    write_atomic(out_path, sink.getvalue().to_pybytes())
+
+
+def _read_table(path):
+    try:
+        with pa.OSFile(path, 'rb') as f:
+            return pa.ipc.open_file(f).read_all()
+    except (OSError, pa.ArrowInvalid):
+        return None
+
+
+def ensure_fixture_index(source, workbook_path, out_path, source_version):
+    # Recompile only when the workbook changed (or the file is missing or from an older layout)
+    table = _read_table(out_path)
+    metadata = (table.schema.metadata or {}) if table is not None else {}
+    if (metadata.get(SOURCE_VERSION_KEY) != str(source_version).encode('utf-8') or
+            metadata.get(b'index_version') != str(INDEX_VERSION).encode('utf-8')):
+        table = compile_fixture(source.read_bytes(workbook_path))
+        write_fixture_index(table, out_path, source_version)
+    return FixtureIndex(table)
+
+
+class FixtureIndex:
+    def __init__(self, table):
+        self.table = table
+        columns = [table.column(name).to_pylist() for name in Match._fields]
+        self._matches = {}
+        self._rounds = {}
+        for values in zip(*columns):
+            match = Match(*values)
+            self._matches[(match.round, match.match_string)] = match
+            self._rounds.setdefault(match.round, []).append(match)
+
+    @classmethod
+    def load(cls, path):
+        return cls(_read_table(path))
+
+    def __len__(self):
+        return len(self._matches)
+
+    def nbytes(self):
+        return size_of(self.table) + size_of(self._matches) + size_of(self._rounds)
+
+    def match(self, round_number, match_string):
+        # Match record for one game of a round, or None if it isn't in the fixture
+        return self._matches.get((round_number, match_string))
+
+    def round_matches(self, round_number):
+        # A round's matches in fixture order
+        return self._rounds.get(round_number, [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile the fixture workbook into an Arrow file')
+    parser.add_argument('workbook', nargs='?', default='AFLFixtures2024.xlsx')
+    parser.add_argument('--root', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='directory the workbook path is relative to')
+    parser.add_argument('--out', help='output path (default: .fixture_index/<workbook>.arrow next to the app)')
+    args = parser.parse_args()
+
+    source = LocalDataSource(args.root)
+    out_path = args.out or default_fixture_path(os.path.dirname(os.path.abspath(__file__)),
+                                                os.path.basename(args.workbook))
+    version = file_version(source.list_dir(os.path.dirname(args.workbook)), os.path.basename(args.workbook))
+
+    start = time.perf_counter()
+    table = compile_fixture(source.read_bytes(args.workbook))
+    write_fixture_index(table, out_path, version)
+    print(f'{out_path}: {table.num_rows} matches ({time.perf_counter() - start:.1f}s)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from dotenv import load_dotenv
+
+from cache import size_of
+from data_source import make_data_source, write_atomic
+from round_store import classify_csv
+from csv_schema import read_csv
+from archive import GAME_LOG_FILE, load_catalog, partition_path, write_catalog
+
+# Canonical game log behind the per-match "<Team> Previous H2H Games.csv" files.
+# Those files copy a player's games against the opponent again every time the two
+# teams meet, across rounds and seasons. Here every game is stored once, keyed by
+# (Player Name, Date) and sorted by (Player Name, Opponent, Date newest first), so
+# a player's games against an opponent are one contiguous slice. A match's H2H
+# tables are derived from the log: a file only adds which players it lists, in
+# what order, and the opponent. Those rosters are kept in the table's schema
+# metadata with the versions of the CSVs folded in, so the log is brought up to
+# date by reading only new or changed files. The file is zstd-compressed Arrow IPC.
+# There is one log per season (see archive.py): the files copy every earlier
+# season's games too, so a season's log is complete on its own.
+#
+#   python game_log.py                fold the current season's H2H files into its log
+#   python game_log.py --year 2023    another season's
+#   python game_log.py --rebuild      start again from scratch
+
+KEY_COLUMNS = ['Player Name', 'Date']
+# Repeated strings are stored once per log
+DICTIONARY_COLUMNS = ['Player Name', 'Round', 'Opponent', 'Result']
+METADATA_KEY = b'game_log'
+# Bump when the stored layout changes so old logs get rebuilt
+LOG_VERSION = 1
+
+
+def h2h_versions(source, round_paths):
+    # {path: version} for every "<Team> Previous H2H Games.csv" under the round folders
+    versions = {}
+    for round_path in round_paths:
+        for match_entry in source.list_dir(round_path):
+            if match_entry.type != 'dir':
+                continue
+            for file in source.list_dir(match_entry.path):
+                if (classify_csv(file.name) or (None,))[0] == 'h2h_games':
+                    versions[file.path] = file.sha
+    return versions
+
+
+def _read_games(source, path):
+    df = read_csv(source.read_bytes(path), 'h2h_games')
+    players = list(dict.fromkeys(df['Player Name']))
+    roster = {'opponent': df['Opponent'].iloc[0] if len(df) else None, 'players': players}
+    return df, roster
+
+
+def build_game_log(source, out_path, previous=None, workers=8, round_paths=None):
+    # Folds the H2H files of the rounds (the current season's by default) into the log at out_path,
+    # starting from `previous` (a GameLog) when given. Returns (files read, games in the log).
+    if round_paths is None:
+        catalog = load_catalog(source)
+        round_paths = catalog.round_paths(catalog.current_year)
+    versions = h2h_versions(source, round_paths)
+    if previous is not None and previous.log_version == LOG_VERSION:
+        frames, rosters = [previous.games_frame()], dict(previous.rosters)
+        changed = [path for path, version in versions.items() if previous.files.get(path) != version]
+    else:
+        frames, rosters, changed = [], {}, list(versions)
+    for path in list(rosters):
+        if path not in versions:
+            del rosters[path]
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for path, (df, roster) in zip(changed, pool.map(lambda path: _read_games(source, path), changed)):
+            frames.append(df)
+            rosters[path] = roster
+
+    # Later files win when a game was corrected
+    games_df = pd.concat(frames, ignore_index=True).drop_duplicates(KEY_COLUMNS, keep='last')
+    games_df = games_df.sort_values(['Player Name', 'Opponent', 'Date'], ascending=[True, True, False],
+                                    ignore_index=True)
+    # Rosters name each player once: as a position in one shared list
+    names = sorted({player for roster in rosters.values() for player in roster['players']})
+    positions = {name: position for position, name in enumerate(names)}
+    metadata = {'log_version': LOG_VERSION, 'built_at': time.time(), 'files': versions, 'names': names,
+                'rosters': {path: {'opponent': roster['opponent'],
+                                   'players': [positions[player] for player in roster['players']]}
+                            for path, roster in rosters.items()}}
+    table = pa.Table.from_pandas(games_df, preserve_index=False)
+    for column in DICTIONARY_COLUMNS:
+        index = table.schema.get_field_index(column)
+        table = table.set_column(index, column, pc.dictionary_encode(table.column(column)))
+    table = table.replace_schema_metadata({METADATA_KEY: json.dumps(metadata).encode('utf-8')})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema, options=pa.ipc.IpcWriteOptions(compression='zstd')) as writer:
+        writer.write_table(table)
+    write_atomic(out_path, sink.getvalue().to_pybytes())
+    return len(changed), len(games_df)
+
+
+class GameLog:
+    def __init__(self, table):
+        metadata = json.loads(table.schema.metadata[METADATA_KEY])
+        self.log_version = metadata['log_version']
+        self.files = metadata['files']
+        names = metadata['names']
+        self.rosters = {path: {'opponent': roster['opponent'],
+                               'players': [names[position] for position in roster['players']]}
+                        for path, roster in metadata['rosters'].items()}
+        self.table = table.replace_schema_metadata(None)
+        # (Player Name, Opponent) -> (first row, row count); rows are sorted by key
+        self._ranges = {}
+        keys = zip(self.table.column('Player Name').to_pylist(), self.table.column('Opponent').to_pylist())
+        for row, key in enumerate(keys):
+            start, length = self._ranges.get(key, (row, 0))
+            self._ranges[key] = (start, length + 1)
+        # (round path, match) -> [(team, roster)] in file order
+        self._matches = {}
+        for path in sorted(self.rosters):
+            round_path, match, file_name = path.rsplit('/', 2)
+            self._matches.setdefault((round_path, match), []).append((classify_csv(file_name)[1], self.rosters[path]))
+
+    @classmethod
+    def open(cls, path):
+        return cls(pa.ipc.open_file(pa.memory_map(path, 'r')).read_all())
+
+    @classmethod
+    def from_bytes(cls, data):
+        return cls(pa.ipc.open_file(pa.BufferReader(data)).read_all())
+
+    def __len__(self):
+        return len(self.table)
+
+    def nbytes(self):
+        return (size_of(self.table) + size_of(self._ranges) + size_of(self.rosters) + size_of(self._matches) +
+                size_of(self.files))
+
+    def games_frame(self):
+        # Every game, with the string columns decoded
+        table = self.table
+        for column in DICTIONARY_COLUMNS:
+            index = table.schema.get_field_index(column)
+            table = table.set_column(index, column, table.column(column).cast(pa.string()))
+        return table.to_pandas()
+
+    def _rows(self, players, opponent):
+        rows = [np.arange(start, start + length) for start, length in
+                (self._ranges.get((player, opponent), (0, 0)) for player in players)]
+        return np.concatenate(rows) if rows else np.array([], dtype=int)
+
+    def games(self, player, opponent):
+        # Every game of the player against the opponent, newest first
+        start, length = self._ranges.get((player, opponent), (0, 0))
+        return self.table.slice(start, length).to_pandas()
+
+    def has_round(self, round_path):
+        return any(key[0] == round_path for key in self._matches)
+
+    def match_games(self, round_path, match):
+        # Same shape as load_player_H2H_data: {"<Team> Previous": DataFrame}, or None if the match isn't in the log
+        teams = self._matches.get((round_path, match))
+        if teams is None:
+            return None
+        return {f'{team} Previous': self.table.take(self._rows(roster['players'], roster['opponent'])).to_pandas()
+                for team, roster in teams}
+
+    def round_games(self, round_path):
+        # Every listed player's previous games for the round's matches, with the team that lists them
+        frames = [df.assign(team=team_key.replace(' Previous', ''))
+                  for (key_round, match), _ in self._matches.items() if key_round == round_path
+                  for team_key, df in self.match_games(key_round, match).items()]
+        if not frames:
+            return None
+        return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fold a season's H2H games files into one canonical game log")
+    parser.add_argument('--source', choices=['local', 'github'], default='local')
+    parser.add_argument('--root', default=os.path.dirname(os.path.abspath(__file__)),
+                        help='local checkout of the AFL repo (with --source local)')
+    parser.add_argument('--year', type=int, help='season (default: the current one)')
+    parser.add_argument('--out', help=f"log path (default: the season's {GAME_LOG_FILE} under <root>)")
+    parser.add_argument('--rebuild', action='store_true', help='ignore the existing log and read every file')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    repo = None
+    if args.source == 'github':
+        load_dotenv()
+        from github import Github
+        repo = Github(os.getenv('GITHUB_TOKEN')).get_repo('hermclane/AFL')
+    source = make_data_source(args.source, root=args.root, repo=repo)
+    catalog = load_catalog(source)
+    year = args.year or catalog.current_year
+    season = catalog.season(year)
+    log_path = season.game_log or (GAME_LOG_FILE if catalog.flat else f'{partition_path(year)}/{GAME_LOG_FILE}')
+    out_path = args.out or os.path.join(args.root, *log_path.split('/'))
+    previous = GameLog.open(out_path) if os.path.exists(out_path) and not args.rebuild else None
+
+    start = time.perf_counter()
+    files, games = build_game_log(source, out_path, previous, workers=args.workers,
+                                  round_paths=catalog.round_paths(year))
+    print(f'{out_path}: read {files} files, {games} games ({time.perf_counter() - start:.1f}s)')
+    if season.game_log is None and not catalog.flat and args.source == 'local' and not args.out:
+        # A new partitioned season's log goes into the catalog
+        catalog.seasons[year] = season._replace(game_log=log_path)
+        write_catalog(args.root, catalog)
+
+
+if __name__ == '__main__':
+    main()
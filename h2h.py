@@ -0,0 +1,121 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from cache import size_of
+
+# Head-to-head form over every round. Each Round_N/H2H Results.csv lists the
+# last few meetings of that round's pairings, always oriented to that round's
+# home team, so the same game shows up in several rounds' files (and flipped
+# when the venue swaps). H2HEngine merges them into one history with one row per
+# game, computes form, record and current streak for every pairing and both
+# perspectives in a single vectorised pass, and then answers lookups from a dict.
+
+OUTCOME_SYMBOLS = {"Win": "✔️", "Draw": "➖", "Lose": "❌"}
+RESULTS_FILE = 'H2H Results.csv'
+
+# Outcome codes, from the first team's point of view
+_CODES = {"Win": 1, "Draw": 0, "Lose": -1}
+_LETTERS = np.array(['L', 'D', 'W'])
+_SYMBOLS = np.array([OUTCOME_SYMBOLS['Lose'], OUTCOME_SYMBOLS['Draw'], OUTCOME_SYMBOLS['Win']], dtype=object)
+
+H2HForm = namedtuple('H2HForm', ['team', 'opponent', 'games', 'wins', 'draws', 'losses', 'win_rate',
+                                 'form', 'streak', 'last_played'])
+
+
+def build_history(frames):
+    # One row per game: team_a < team_b alphabetically, outcome coded for team_a
+    results_df = pd.concat(frames, ignore_index=True)
+    home = results_df['Home Team'].to_numpy(dtype=object)
+    away = results_df['Away Team'].to_numpy(dtype=object)
+    home_first = home <= away
+    outcome = results_df['Home Team Outcome'].map(_CODES).to_numpy()
+    history_df = pd.DataFrame({
+        'Date': pd.to_datetime(results_df['Date']),
+        'team_a': np.where(home_first, home, away),
+        'team_b': np.where(home_first, away, home),
+        'outcome': np.where(home_first, outcome, -outcome).astype('int8'),
+    })
+    history_df = history_df.drop_duplicates(['Date', 'team_a', 'team_b'])
+    return history_df.sort_values(['team_a', 'team_b', 'Date'], kind='stable', ignore_index=True)
+
+
+class H2HEngine:
+    def __init__(self, history_df, form_length=5):
+        self.history = history_df
+        self.form_length = form_length
+        self._forms = {}
+        if len(history_df):
+            self._compute()
+
+    def _compute(self):
+        # Both perspectives of every game, grouped by (team, opponent) in date order
+        history_df = self.history
+        both_df = pd.DataFrame({
+            'team': np.concatenate([history_df['team_a'].to_numpy(), history_df['team_b'].to_numpy()]),
+            'opponent': np.concatenate([history_df['team_b'].to_numpy(), history_df['team_a'].to_numpy()]),
+            'Date': np.concatenate([history_df['Date'].to_numpy()] * 2),
+            'outcome': np.concatenate([history_df['outcome'].to_numpy(), -history_df['outcome'].to_numpy()]),
+        }).sort_values(['team', 'opponent', 'Date'], kind='stable', ignore_index=True)
+
+        keys = ['team', 'opponent']
+        grouped = both_df.groupby(keys, sort=False)
+        outcome = both_df['outcome'].to_numpy()
+        both_df['win'] = outcome == 1
+        both_df['draw'] = outcome == 0
+        both_df['symbol'] = _SYMBOLS[outcome + 1]
+        both_df['from_end'] = grouped.cumcount(ascending=False)
+
+        # Streak: length of the last run of identical outcomes in each group
+        new_group = (both_df[keys] != both_df[keys].shift()).any(axis=1).to_numpy()
+        new_run = new_group | (outcome != np.roll(outcome, 1))
+        both_df['run'] = np.cumsum(new_run)
+        last_run = grouped['run'].transform('last').to_numpy()
+        both_df['in_last_run'] = both_df['run'].to_numpy() == last_run
+
+        summary = grouped.agg(games=('outcome', 'size'), wins=('win', 'sum'), draws=('draw', 'sum'),
+                              last_outcome=('outcome', 'last'), last_played=('Date', 'last'),
+                              streak=('in_last_run', 'sum'))
+        recent = both_df[both_df['from_end'].to_numpy() < self.form_length]
+        summary['form'] = recent.groupby(keys, sort=False)['symbol'].agg(''.join)
+        summary['losses'] = summary['games'] - summary['wins'] - summary['draws']
+        summary['win_rate'] = summary['wins'] / summary['games']
+        summary['streak'] = (pd.Series(_LETTERS[summary['last_outcome'].to_numpy() + 1], index=summary.index) +
+                             summary['streak'].astype(str))
+
+        columns = ['games', 'wins', 'draws', 'losses', 'win_rate', 'form', 'streak', 'last_played']
+        for (team, opponent), row in zip(summary.index, summary[columns].itertuples(index=False)):
+            self._forms[(team, opponent)] = H2HForm(team, opponent, *row)
+
+    def __len__(self):
+        return len(self._forms) // 2
+
+    def nbytes(self):
+        return size_of(self.history) + size_of(self._forms)
+
+    def get(self, team, opponent):
+        # H2HForm for team against opponent, or None if they haven't met in the history
+        return self._forms.get((team, opponent))
+
+    def form(self, team, opponent):
+        # The last form_length results as symbols, oldest first ('' if they haven't met)
+        h2h_form = self._forms.get((team, opponent))
+        return h2h_form.form if h2h_form else ''
+
+    def overview(self, fixtures):
+        # One row per (home, away) pair, e.g. for a round's nine matches
+        rows = []
+        for home_team, away_team in fixtures:
+            home_form = self.get(home_team, away_team)
+            rows.append({
+                'Home Team': home_team,
+                'Away Team': away_team,
+                'Games': home_form.games if home_form else 0,
+                'Home Form': home_form.form if home_form else '',
+                'Away Form': self.form(away_team, home_team),
+                'Home Win %': round(home_form.win_rate * 100) if home_form else None,
+                'Home Streak': home_form.streak if home_form else '',
+                'Last Met': home_form.last_played.strftime('%d-%m-%Y') if home_form else '',
+            })
+        return pd.DataFrame(rows)
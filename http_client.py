@@ -0,0 +1,236 @@
+import json
+import time
+import random
+import threading
+from collections import OrderedDict, Counter, namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import Retrying, stop_after_attempt, stop_after_delay, retry_if_exception_type
+
+# One shared HTTP client for the GitHub REST API:
+#   - a pooled keep-alive Session, so requests reuse connections
+#   - ETag / Last-Modified revalidation: a repeat GET sends If-None-Match, and an
+#     unchanged file comes back as a 304 (which GitHub doesn't count against the
+#     rate limit) and is served from the validator cache
+#   - retries with tenacity for connection errors, 5xx and rate-limit responses,
+#     bounded by attempts and total time and honouring Retry-After
+#   - a scheduler that reads X-RateLimit-Remaining/Reset and holds requests back
+#     until the window resets once the budget is nearly spent, instead of failing
+#   - once the retries run out, RateLimited for a spent rate limit and
+#     UpstreamError (its base class) for anything else; other error statuses
+#     raise UpstreamError straight away
+
+GITHUB_API = 'https://api.github.com'
+
+Response = namedtuple('Response', ['status', 'content', 'headers', 'revalidated'])
+
+
+class UpstreamError(Exception):
+    # GitHub kept failing (5xx, connection errors, timeouts) until the retries ran out
+    pass
+
+
+class RateLimited(UpstreamError):
+    # The rate limit is spent and resets later than we're willing to wait
+    def __init__(self, reset_at):
+        super().__init__(f"GitHub rate limit exhausted until {time.strftime('%H:%M:%S', time.localtime(reset_at))}")
+        self.reset_at = reset_at
+
+
+class NotFound(FileNotFoundError):
+    pass
+
+
+class _Retryable(Exception):
+    # Never leaves FetchClient.get: once the retries run out it becomes RateLimited or UpstreamError
+    def __init__(self, reason, retry_after=None, rate_limited=False):
+        super().__init__(reason)
+        self.retry_after = retry_after
+        self.rate_limited = rate_limited
+
+
+class RateLimiter:
+    def __init__(self, reserve=20, max_wait=60, max_concurrency=16):
+        # Requests left in the window below which we wait for the reset, and the longest we'll wait
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self.remaining = None
+        self.reset_at = 0
+        self.waits = 0
+        self.waited = 0.0
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
+    def acquire(self):
+        self._slots.acquire()
+        with self._lock:
+            spent = self.remaining is not None and self.remaining <= self.reserve
+            delay = self.reset_at - time.time() if spent else 0
+        if delay > self.max_wait:
+            self._slots.release()
+            raise RateLimited(self.reset_at)
+        if delay > 0:
+            with self._lock:
+                self.waits += 1
+                self.waited += delay
+            time.sleep(delay)
+
+    def release(self, headers=None):
+        try:
+            if headers is not None and 'X-RateLimit-Remaining' in headers:
+                with self._lock:
+                    reset_at = float(headers.get('X-RateLimit-Reset', 0))
+                    remaining = int(headers['X-RateLimit-Remaining'])
+                    # Responses can arrive out of order; only a newer window or a lower count moves the state
+                    if reset_at > self.reset_at or self.remaining is None or remaining < self.remaining:
+                        self.remaining, self.reset_at = remaining, max(reset_at, self.reset_at)
+        finally:
+            self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {'remaining': self.remaining, 'reset_at': self.reset_at, 'waits': self.waits,
+                    'waited_s': round(self.waited, 3)}
+
+
+class FetchClient:
+    def __init__(self, base_url=GITHUB_API, token=None, auth=None, pool_size=16, timeout=20, max_attempts=5,
+                 max_retry_seconds=60, cache_max_bytes=64 * 2 ** 20, rate_limiter=None):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.max_retry_seconds = max_retry_seconds
+        self.cache_max_bytes = cache_max_bytes
+        self.rate_limiter = rate_limiter or RateLimiter(max_concurrency=pool_size)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['X-GitHub-Api-Version'] = '2022-11-28'
+        if token:
+            self.session.headers['Authorization'] = f'Bearer {token}'
+        self.session.auth = auth
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        # (url, params, accept) -> (ETag, Last-Modified, content); least recently used first
+        self._validators = OrderedDict()
+        self._cached_bytes = 0
+
+    def _url(self, path):
+        return path if path.startswith(('http://', 'https://')) else f"{self.base_url}/{path.lstrip('/')}"
+
+    def _remember(self, key, response):
+        etag, last_modified = response.headers.get('ETag'), response.headers.get('Last-Modified')
+        if not (etag or last_modified) or len(response.content) > self.cache_max_bytes:
+            return
+        with self._lock:
+            previous = self._validators.pop(key, None)
+            if previous is not None:
+                self._cached_bytes -= len(previous[2])
+            self._validators[key] = (etag, last_modified, response.content)
+            self._cached_bytes += len(response.content)
+            while self._cached_bytes > self.cache_max_bytes:
+                _, (_, _, content) = self._validators.popitem(last=False)
+                self._cached_bytes -= len(content)
+
+    def _send(self, url, params, headers, key):
+        self.rate_limiter.acquire()
+        response = None
+        try:
+            with self._lock:
+                self.counts['requests'] += 1
+            response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        finally:
+            self.rate_limiter.release(response.headers if response is not None else None)
+
+        if response.status_code == 304:
+            with self._lock:
+                self.counts['not_modified'] += 1
+                cached = self._validators.get(key)
+                if cached is not None:
+                    self._validators.move_to_end(key)
+            if cached is not None:
+                return Response(304, cached[2], response.headers, True)
+            # Validators were evicted in between: fetch it unconditionally
+            raise _Retryable('304 without a cached body', retry_after=0)
+        # 403s are rate limits when the primary window is spent, or when they carry a Retry-After (GitHub's
+        # secondary rate limit, which leaves X-RateLimit-Remaining above zero)
+        if response.status_code == 429 or (response.status_code == 403 and
+                                           (response.headers.get('X-RateLimit-Remaining') == '0' or
+                                            'Retry-After' in response.headers)):
+            retry_after = response.headers.get('Retry-After')
+            if retry_after is None and 'X-RateLimit-Reset' in response.headers:
+                retry_after = float(response.headers['X-RateLimit-Reset']) - time.time()
+            raise _Retryable(f'rate limited ({response.status_code})',
+                             retry_after=max(float(retry_after or 1), 0), rate_limited=True)
+        if response.status_code >= 500:
+            raise _Retryable(f'server error ({response.status_code})', retry_after=response.headers.get('Retry-After'))
+        if response.status_code == 404:
+            raise NotFound(url)
+        if not 200 <= response.status_code < 300:
+            # Anything else (401, 403, 422, ...) isn't worth retrying, but callers handle it like an outage
+            raise UpstreamError(f'{url}: HTTP {response.status_code}')
+        self._remember(key, response)
+        with self._lock:
+            self.counts['bytes'] += len(response.content)
+        return Response(response.status_code, response.content, response.headers, False)
+
+    def _wait(self, retry_state):
+        error = retry_state.outcome.exception()
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            delay = float(retry_after)
+        else:
+            # Exponential backoff with full jitter
+            delay = random.uniform(0, min(30, 0.5 * 2 ** (retry_state.attempt_number - 1)))
+        if delay > self.rate_limiter.max_wait:
+            raise RateLimited(time.time() + delay)
+        return delay
+
+    def _before_retry(self, retry_state):
+        with self._lock:
+            self.counts['retries'] += 1
+
+    def get(self, path, params=None, accept=None):
+        url = self._url(path)
+        key = (url, tuple(sorted((params or {}).items())), accept)
+        retrying = Retrying(
+            stop=stop_after_attempt(self.max_attempts) | stop_after_delay(self.max_retry_seconds),
+            wait=self._wait,
+            retry=retry_if_exception_type((_Retryable, requests.ConnectionError, requests.Timeout)),
+            before_sleep=self._before_retry,
+            reraise=True,
+        )
+        try:
+            for attempt in retrying:
+                with attempt:
+                    headers = {'Accept': accept} if accept else {}
+                    with self._lock:
+                        cached = self._validators.get(key)
+                    # Conditional only on the first try, so a 304 after an eviction can fall back to a full GET
+                    if cached is not None and attempt.retry_state.attempt_number == 1:
+                        if cached[0]:
+                            headers['If-None-Match'] = cached[0]
+                        if cached[1]:
+                            headers['If-Modified-Since'] = cached[1]
+                    return self._send(url, params, headers, key)
+        except _Retryable as error:
+            if error.rate_limited:
+                raise RateLimited(time.time() + (error.retry_after or 0)) from error
+            raise UpstreamError(f"{url}: {error} after {retrying.statistics['attempt_number']} attempts") from error
+        except (requests.ConnectionError, requests.Timeout) as error:
+            raise UpstreamError(f'{url}: {error}') from error
+
+    def get_json(self, path, params=None):
+        return json.loads(self.get(path, params, 'application/vnd.github+json').content)
+
+    def get_bytes(self, path, params=None):
+        return self.get(path, params, 'application/vnd.github.raw').content
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self.counts)
+            stats.update(cached_entries=len(self._validators), cached_bytes=self._cached_bytes)
+        stats['rate_limit'] = self.rate_limiter.stats()
+        return stats
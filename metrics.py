@@ -0,0 +1,341 @@
+import time
+import bisect
+import threading
+import functools
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from data_source import DataSource
+
+# Process-wide metrics for the page: counters and latency histograms recorded on
+# the hot path (one lock and a bisect per observation), plus collectors that read
+# the components' own stats() (content cache, disk tier, GitHub clients, category
+# dictionaries) only when the metrics are read. Rendered as Prometheus text for
+# a scraper (start_http_server, AFL_METRICS_PORT) and for the hidden diagnostics
+# view of the app (?diagnostics).
+#
+#   with metrics.span('afl_stage_seconds', stage='styler build'):
+#       ...
+#   metrics.inc('afl_source_bytes_total', len(data), source='AFL')
+#   print(metrics.render_prometheus())
+
+# Seconds, from a dictionary lookup to a cold GitHub fetch
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value is None:
+        return 'NaN'
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(list(self.buckets) + [float('inf')], self.counts):
+            total += count
+            yield bound, total
+
+    def quantile(self, q):
+        # Upper bound of the bucket the quantile falls in (what histogram_quantile would interpolate within)
+        if not self.count:
+            return None
+        rank = q * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> (type, help, buckets)
+        self._families = {}
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = {}
+        self.started_at = time.time()
+
+    def describe(self, name, kind, help_text, buckets=SECONDS_BUCKETS):
+        with self._lock:
+            self._families[name] = (kind, help_text, tuple(buckets))
+
+    def _family(self, name, kind):
+        family = self._families.get(name)
+        if family is None:
+            family = self._families[name] = (kind, '', SECONDS_BUCKETS)
+        return family
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._family(name, 'counter')
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(self._family(name, 'histogram')[2])
+            histogram.observe(value)
+
+    @contextmanager
+    def span(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def timed(self, name, **labels):
+        # Decorator: every call is a span labelled with the function's name
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name, function=func.__name__, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def counter_total(self, name, **labels):
+        # Sum of a counter over every label set that includes `labels`
+        wanted = set(labels.items())
+        with self._lock:
+            return sum(value for (family, key), value in self._counters.items()
+                       if family == name and wanted <= set(key))
+
+    def add_collector(self, key, collect):
+        # collect() -> [(name, type, help, labels dict, value)], called on every read; a second
+        # collector under the same key replaces the first (the app registers them on every rerun)
+        with self._lock:
+            self._collectors[key] = collect
+
+    def samples(self):
+        # [(name, type, help, labels dict, value)] for counters, collected gauges/counters and histogram totals
+        with self._lock:
+            families = dict(self._families)
+            counters = list(self._counters.items())
+            histograms = [(key, histogram.count, histogram.sum) for key, histogram in self._histograms.items()]
+            collectors = list(self._collectors.values())
+        samples = [(name, 'counter', families[name][1], dict(labels), value) for (name, labels), value in counters]
+        for (name, labels), count, total in histograms:
+            samples.append((f'{name}_count', 'counter', families[name][1], dict(labels), count))
+            samples.append((f'{name}_sum', 'counter', families[name][1], dict(labels), total))
+        for collect in collectors:
+            samples.extend(collect())
+        return samples
+
+    def histogram_summary(self, name):
+        # {labels tuple: {'count', 'sum', 'p50', 'p95', 'p99'}} for one histogram
+        with self._lock:
+            return {labels: {'count': histogram.count, 'sum': histogram.sum, 'p50': histogram.quantile(0.5),
+                             'p95': histogram.quantile(0.95), 'p99': histogram.quantile(0.99)}
+                    for (family, labels), histogram in self._histograms.items() if family == name}
+
+    def render_prometheus(self):
+        # Text exposition format 0.0.4
+        with self._lock:
+            families = dict(self._families)
+            counters = sorted(self._counters.items())
+            histograms = sorted(((key, list(histogram.cumulative()), histogram.sum, histogram.count)
+                                 for key, histogram in self._histograms.items()), key=lambda item: item[0])
+            collectors = list(self._collectors.values())
+        collected = {}
+        for collect in collectors:
+            for name, kind, help_text, labels, value in collect():
+                collected.setdefault(name, (kind, help_text, []))[2].append((_label_key(labels), value))
+
+        lines = []
+
+        def header(name, kind, help_text):
+            if help_text:
+                lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        seen = set()
+        for (name, labels), value in counters:
+            if name not in seen:
+                seen.add(name)
+                header(name, 'counter', families[name][1])
+            lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        for (name, labels), cumulative, total, count in histograms:
+            if name not in seen:
+                seen.add(name)
+                header(name, 'histogram', families[name][1])
+            for bound, bucket_count in cumulative:
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", _format_value(float(bound)))])} '
+                             f'{bucket_count}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(float(total))}')
+            lines.append(f'{name}_count{_format_labels(labels)} {count}')
+        for name, (kind, help_text, values) in sorted(collected.items()):
+            header(name, kind, help_text)
+            for labels, value in sorted(values, key=lambda item: item[0]):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+# The process's metrics; module-level, like schema.registry
+metrics = Metrics()
+
+metrics.describe('afl_stage_seconds', 'histogram', 'Time spent in each page stage (see profiling.py)')
+metrics.describe('afl_loader_seconds', 'histogram', 'Time spent in a loader on a cache miss')
+metrics.describe('afl_rerun_seconds', 'histogram', 'Script run time per rerun')
+metrics.describe('afl_rerun_upstream_requests', 'histogram', 'Data source calls (listings and reads) per rerun',
+                 buckets=COUNT_BUCKETS)
+metrics.describe('afl_source_calls_total', 'counter', 'Data source calls by source and operation')
+metrics.describe('afl_source_bytes_total', 'counter', 'Bytes read from each data source')
+metrics.describe('afl_source_seconds', 'histogram', 'Data source call latency by source and operation')
+metrics.describe('afl_prefetch_seconds', 'histogram', 'Time to prefetch a whole match')
+metrics.describe('afl_prefetch_runs_total', 'counter', 'Match prefetches run')
+metrics.describe('afl_prefetch_files_total', 'counter', 'Files read by match prefetches')
+metrics.describe('afl_prefetch_bytes_total', 'counter', 'Bytes read by match prefetches')
+metrics.describe('afl_prefetch_failed_tasks_total', 'counter', 'Match prefetch tasks that raised')
+
+
+class MeteredSource(DataSource):
+    # Counts and times every call that goes through a source (thread-safe). The app wraps its sources
+    # again on every rerun, so calls() is what this view alone made: one rerun's, not the process's.
+    def __init__(self, inner, name, registry=metrics):
+        self.inner = inner
+        self.name = name
+        self.registry = registry
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def _count(self, op):
+        self.registry.inc('afl_source_calls_total', source=self.name, op=op)
+        with self._lock:
+            self._calls += 1
+
+    def list_dir(self, path=''):
+        with self.registry.span('afl_source_seconds', source=self.name, op='list'):
+            entries = self.inner.list_dir(path)
+        self._count('list')
+        return entries
+
+    def read_bytes(self, path):
+        with self.registry.span('afl_source_seconds', source=self.name, op='read'):
+            data = self.inner.read_bytes(path)
+        self._count('read')
+        self.registry.inc('afl_source_bytes_total', len(data), source=self.name)
+        return data
+
+    def describe(self):
+        return self.inner.describe()
+
+    def calls(self):
+        # Listings and reads made through this view
+        return self._calls
+
+    def detached(self):
+        # A view of the same source whose calls still go to the registry but not to this view's calls(),
+        # for background work (prefetch) that outlives the rerun
+        return MeteredSource(self.inner, self.name, self.registry)
+
+
+# Collectors for the components' own counters
+
+def content_cache_samples(cache):
+    stats = cache.stats()
+    samples = [
+        ('afl_cache_entries', 'gauge', 'Entries in the in-process content cache', {}, stats['entries']),
+        ('afl_cache_bytes', 'gauge', 'Estimated bytes held by the content cache', {}, stats['bytes']),
+        ('afl_cache_max_bytes', 'gauge', 'Content cache memory budget', {}, stats['max_bytes']),
+        ('afl_cache_evictions_total', 'counter', 'Entries evicted to stay within the budget', {}, stats['evictions']),
+    ]
+    for namespace, counts in stats['loaders'].items():
+        samples.append(('afl_cache_hits_total', 'counter', 'Content cache hits by loader', {'loader': namespace},
+                        counts['hits']))
+        samples.append(('afl_cache_misses_total', 'counter', 'Content cache misses by loader', {'loader': namespace},
+                        counts['misses']))
+    shared = stats.get('shared')
+    if shared is not None:
+        for namespace, counts in shared['loaders'].items():
+            for field in ('hits', 'misses', 'writes'):
+                samples.append((f'afl_shared_cache_{field}_total', 'counter', f'Shared disk cache {field} by loader',
+                                {'loader': namespace}, counts.get(field, 0)))
+        for field in ('entries', 'bytes'):
+            if field in shared:
+                samples.append((f'afl_shared_cache_{field}', 'gauge', f'Shared disk cache {field}', {}, shared[field]))
+    return samples
+
+
+def fetch_client_samples(client, repo):
+    stats = client.stats()
+    labels = {'repo': repo}
+    rate_limit = stats['rate_limit']
+    return [
+        ('afl_github_requests_total', 'counter', 'GitHub API requests sent', labels, stats.get('requests', 0)),
+        ('afl_github_not_modified_total', 'counter', 'Requests answered 304 from the revalidation cache', labels,
+         stats.get('not_modified', 0)),
+        ('afl_github_retries_total', 'counter', 'Requests retried', labels, stats.get('retries', 0)),
+        ('afl_github_bytes_total', 'counter', 'Response bytes downloaded', labels, stats.get('bytes', 0)),
+        ('afl_github_rate_limit_remaining', 'gauge', 'Requests left in the rate limit window (last response)', labels,
+         rate_limit['remaining']),
+        ('afl_github_rate_limit_reset_timestamp', 'gauge', 'When the rate limit window resets (unix time)', labels,
+         rate_limit['reset_at']),
+        ('afl_github_rate_limit_waits_total', 'counter', 'Times a request waited for the window to reset', labels,
+         rate_limit['waits']),
+    ]
+
+
+def category_samples(categories):
+    return [('afl_category_values', 'gauge', 'Values in each shared category dictionary', {'domain': domain}, size)
+            for domain, size in categories.stats().items()]
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = metrics
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port, host='0.0.0.0', registry=metrics):
+    # Serves GET /metrics on a daemon thread; Streamlit has no route of its own for it
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
@@ -0,0 +1,162 @@
+import os
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow as pa
+from cachetools import LRUCache
+from dotenv import load_dotenv
+
+from cache import size_of
+from data_source import make_data_source, write_atomic
+from schema import compact
+from csv_schema import SEASON_LOG_COLUMNS, read_csv
+
+# Season index for the AFLPlayerStatsRepo: every "<team_url>/<name_url>.csv" is
+# parsed and prepared once by the ingest job below and written to a single Arrow
+# table, sorted by (team_url, name_url). The app then gets a player's season
+# with a dictionary lookup and a zero-copy slice instead of an API call + parse.
+#
+#   python player_index.py --year 2024
+
+drop_columns_2024 = ["Team", "Home/Away", "M", "T", "K", "HB", "HO", "GA", "I50", "CL", "CG", "R50", "FF", "FA", "AF", "SC"]
+
+finals_round_mapping = {
+    'Elimination Final': 'EF',
+    "Preliminary Final": "PF",
+    "Preliminary Finals": "PF",
+    "Grand Final": "GF",
+    "Qualifying Final": "QF",
+    "Semi Finals": "SF",
+    "Semi Final": "SF"
+}
+
+KEY_COLUMNS = ['team_url', 'name_url']
+# Prepared season frames kept per index, least recently used dropped first
+FRAME_BUDGET = 16 * 2 ** 20
+# Kept in the index for the rolling averages (rolling.py) but not part of the season table
+LOG_ONLY_COLUMNS = ['FF']
+GAME_LOG_COLUMNS = KEY_COLUMNS + ['Player Name', 'Date', 'D', 'G', 'B', 'FF']
+
+
+def prepare_season_df(df):
+    # The processing the page used to repeat on every rerun. Frames from csv_schema.read_csv already have
+    # their dates parsed and the unused columns skipped.
+    df['Date'] = pd.to_datetime(df['Date'], dayfirst=True)
+    df = df.drop(columns=[column for column in drop_columns_2024 if column in df.columns])
+    df['DisplayRound'] = df['Round'].apply(lambda x: finals_round_mapping.get(x, x))
+    df = df.sort_values(by="Date")
+    return df
+
+
+def default_index_path(root, year):
+    return os.path.join(root, '.player_index', f'season_{year}.arrow')
+
+
+def _load_player(source, team_url, entry):
+    raw_df = read_csv(source.read_bytes(entry.path), 'season', SEASON_LOG_COLUMNS)
+    df = prepare_season_df(raw_df.drop(columns=['FF']))
+    df['FF'] = raw_df['FF']
+    df.insert(0, 'name_url', entry.name[:-len('.csv')])
+    df.insert(0, 'team_url', team_url)
+    return df
+
+
+def build_player_index(source, out_path, workers=8):
+    jobs = []
+    for folder in source.list_dir(''):
+        if folder.type != 'dir':
+            continue
+        for entry in source.list_dir(folder.path):
+            if entry.type == 'file' and entry.name.endswith('.csv'):
+                jobs.append((folder.name, entry))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = list(pool.map(lambda job: _load_player(source, *job), jobs))
+
+    season_df = pd.concat(frames, ignore_index=True).sort_values(KEY_COLUMNS + ['Date'], kind='stable')
+    table = pa.Table.from_pandas(season_df, preserve_index=False).replace_schema_metadata(None)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    write_atomic(out_path, sink.getvalue().to_pybytes())
+    return len(jobs), len(season_df)
+
+
+class PlayerIndex:
+    def __init__(self, path):
+        self.path = path
+        self.version = os.stat(path).st_mtime_ns
+        self.table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        self._columns = [name for name in self.table.column_names if name not in KEY_COLUMNS + LOG_ONLY_COLUMNS]
+        # (team_url, name_url) -> (first row, row count); rows are sorted by key
+        self._ranges = {}
+        keys = zip(self.table.column('team_url').to_pylist(), self.table.column('name_url').to_pylist())
+        for row, key in enumerate(keys):
+            start, length = self._ranges.get(key, (row, 0))
+            self._ranges[key] = (start, length + 1)
+        self._frames = LRUCache(FRAME_BUDGET, getsizeof=size_of)
+        self._frames_lock = threading.Lock()
+
+    def __contains__(self, key):
+        return key in self._ranges
+
+    def __len__(self):
+        return len(self._ranges)
+
+    def nbytes(self):
+        return size_of(self.table) + size_of(self._ranges) + self._frames.maxsize
+
+    def players(self, team_url=None):
+        return [key for key in self._ranges if team_url is None or key[0] == team_url]
+
+    def get(self, team_url, name_url):
+        # A player's prepared season frame, or None if they have no games in the index
+        key = (team_url, name_url)
+        if key not in self._ranges:
+            return None
+        with self._frames_lock:
+            frame = self._frames.get(key)
+        if frame is None:
+            start, length = self._ranges[key]
+            frame = compact(self.table.slice(start, length).select(self._columns).to_pandas())
+            with self._frames_lock:
+                try:
+                    self._frames[key] = frame
+                except ValueError:
+                    # Bigger than the whole budget: serve it without keeping it
+                    pass
+        return frame.copy()
+
+    def game_logs(self):
+        # Every game of every player, sorted by player then date (FF is missing from indexes built before it was kept)
+        logs_df = self.table.select([name for name in GAME_LOG_COLUMNS if name in self.table.column_names]).to_pandas()
+        return logs_df.reindex(columns=GAME_LOG_COLUMNS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the player season index from AFLPlayerStatsRepo')
+    parser.add_argument('--year', type=int, default=2024)
+    parser.add_argument('--source', choices=['github', 'local'], default='github')
+    parser.add_argument('--root', help='local checkout of AFLPlayerStatsRepo (with --source local)')
+    parser.add_argument('--out', help='index path (default: .player_index/season_<year>.arrow next to the app)')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    repo = None
+    if args.source == 'github':
+        load_dotenv()
+        from github import Github
+        repo = Github(os.getenv('GITHUB_TOKEN2')).get_repo('hermclane/AFLPlayerStatsRepo')
+    source = make_data_source(args.source, root=args.root, repo=repo)
+    out_path = args.out or default_index_path(os.path.dirname(os.path.abspath(__file__)), args.year)
+
+    start = time.perf_counter()
+    players, rows = build_player_index(source, out_path, workers=args.workers)
+    print(f'{out_path}: {players} players, {rows} games ({time.perf_counter() - start:.1f}s)')
+
+
+if __name__ == '__main__':
+    main()
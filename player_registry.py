@@ -0,0 +1,95 @@
+import re
+import unicodedata
+
+import pandas as pd
+
+from cache import file_version, size_of
+from csv_schema import read_csv
+
+# Player registry: the players workbook (AFLPlayers2024.xlsx) turned once into
+# dicts, so finding a player's name_url (the "<team_url>/<name_url>.csv" season
+# file) is a hash lookup instead of a scan of the whole workbook. Players are
+# keyed on (team, name), so the same name at two clubs resolves to two players,
+# and names are compared loosely (case, spacing, apostrophes, full stops, Jnr/Jr).
+# Names the round CSVs spell differently from the workbook can be mapped in an
+# optional player_aliases.csv at the root of the AFL repo:
+#
+#   Alias,Player,Team
+#   Cam Zurhaar,Cameron Zurhaar,North Melbourne
+#   Lachie Whitfield,Lachlan Whitfield,               (blank Team: any team)
+#
+#   registry.resolve(team, player)          name_url, or None when not listed
+#   registry.resolve_squad(team, players)   {player: name_url or None} for a whole squad
+
+ALIASES_FILE = 'player_aliases.csv'
+
+_PUNCTUATION = str.maketrans({'‘': "'", '’': "'", '`': "'", '.': ''})
+_SUFFIXES = {'jnr': 'jr', 'snr': 'sr'}
+
+
+def name_key(name):
+    # Loose form of a player's name for lookups
+    key = unicodedata.normalize('NFKC', str(name)).translate(_PUNCTUATION).casefold()
+    words = re.sub(r'\s+', ' ', key).strip().split(' ')
+    return ' '.join(_SUFFIXES.get(word, word) for word in words)
+
+
+def registry_version(root_contents, private_contents, players_file):
+    # What the registry is built from: the workbook and the aliases file (None when there isn't one)
+    return [file_version(private_contents, players_file), file_version(root_contents, ALIASES_FILE)]
+
+
+def read_aliases(data):
+    return read_csv(data, 'player_aliases')
+
+
+class PlayerRegistry:
+    def __init__(self, players_df, aliases_df=None):
+        # (team, name key) -> name_url, and name key -> {name_url} across teams for players the workbook
+        # lists under another club (a trade after it was made)
+        self._by_team = {}
+        self._by_name = {}
+        # A name listed twice for the same team keeps its first row, as the old .iloc[0] lookup did
+        self.duplicates = 0
+        teams = players_df['Team'] if 'Team' in players_df else [None] * len(players_df)
+        for player, team, name_url in zip(players_df['Player'], teams, players_df['name_url']):
+            if pd.isna(player) or pd.isna(name_url):
+                continue
+            key = name_key(player)
+            team = None if pd.isna(team) else str(team)
+            if (team, key) in self._by_team:
+                self.duplicates += 1
+                continue
+            self._by_team[team, key] = str(name_url)
+            self._by_name.setdefault(key, set()).add(str(name_url))
+
+        # (team or None, alias key) -> the workbook's name key
+        self._aliases = {}
+        if aliases_df is not None:
+            for alias, player, team in zip(aliases_df['Alias'], aliases_df['Player'], aliases_df['Team']):
+                if pd.isna(alias) or pd.isna(player):
+                    continue
+                self._aliases[None if pd.isna(team) else str(team), name_key(alias)] = name_key(player)
+
+    def __len__(self):
+        return len(self._by_team)
+
+    def nbytes(self):
+        return size_of(self._by_team) + size_of(self._by_name) + size_of(self._aliases)
+
+    def resolve(self, team, player):
+        key = name_key(player)
+        key = self._aliases.get((team, key), self._aliases.get((None, key), key))
+        name_url = self._by_team.get((team, key))
+        if name_url is None:
+            # Listed under another team (or the workbook has no Team column); only if the name is unambiguous
+            name_urls = self._by_name.get(key)
+            if name_urls is not None and len(name_urls) == 1:
+                name_url = next(iter(name_urls))
+        return name_url
+
+    def resolve_squad(self, team, players):
+        return {player: self.resolve(team, player) for player in players}
+
+    def stats(self):
+        return {'players': len(self._by_team), 'aliases': len(self._aliases), 'duplicates': self.duplicates}
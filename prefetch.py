@@ -0,0 +1,137 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from data_source import DataSource
+from metrics import metrics
+
+# Match prefetch: as soon as a match is selected, every file the match page can
+# need (averages, H2H games and the season file of every player in both squads)
+# is loaded into the content cache on a thread pool, so clicking through players
+# or tabs afterwards never waits on I/O. Each run's time, files and bytes go to
+# the afl_prefetch_* metrics (see metrics.py and the app's diagnostics view).
+
+logger = logging.getLogger(__name__)
+
+
+class CountingSource(DataSource):
+    # Counts the listings and files that go through a source (thread-safe)
+    def __init__(self, inner, report):
+        self.inner = inner
+        self.report = report
+
+    def list_dir(self, path=''):
+        entries = self.inner.list_dir(path)
+        self.report.add(listings=1)
+        return entries
+
+    def read_bytes(self, path):
+        data = self.inner.read_bytes(path)
+        self.report.add(files=1, bytes=len(data))
+        return data
+
+    def describe(self):
+        return self.inner.describe()
+
+
+class PrefetchReport:
+    def __init__(self, key):
+        self.key = key
+        self.tasks = 0
+        self.failed = 0
+        self.listings = 0
+        self.files = 0
+        self.bytes = 0
+        self.seconds = None
+        # What stopped the run before it had its tasks (e.g. the match's files couldn't be read)
+        self.error = None
+        self._lock = threading.Lock()
+
+    def add(self, **counts):
+        with self._lock:
+            for name, count in counts.items():
+                setattr(self, name, getattr(self, name) + count)
+
+    def as_dict(self):
+        return {'key': self.key, 'tasks': self.tasks, 'failed': self.failed, 'listings': self.listings,
+                'files': self.files, 'bytes': self.bytes, 'seconds': self.seconds, 'error': self.error}
+
+    def __repr__(self):
+        if self.error is not None:
+            return f"Prefetch of {self.key} failed after {self.seconds:.2f}s: {self.error}"
+        return (f"Prefetched {self.key}: {self.files} files ({self.bytes / 1024:.0f} KiB) "
+                f"from {self.tasks} tasks in {self.seconds:.2f}s")
+
+
+class Prefetcher:
+    def __init__(self, max_workers=8, max_runs=64, registry=metrics):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch')
+        # Runs each prefetch's bookkeeping so waiting never takes a worker slot
+        self._coordinator = ThreadPoolExecutor(max_workers=2, thread_name_prefix='prefetch-run')
+        # Separate pool for read_many, which prefetch tasks themselves call
+        self._io_pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='prefetch-io')
+        self.registry = registry
+        # The last max_runs keys, least recently started first
+        self.max_runs = max_runs
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, key, make_tasks):
+        # make_tasks(wrap) returns zero-argument callables; wrap(source) gives a
+        # counting view of a source for the report. Each of the last max_runs keys
+        # is prefetched once.
+        with self._lock:
+            if key in self._runs:
+                self._runs.move_to_end(key)
+            else:
+                self._runs[key] = self._coordinator.submit(self._run, key, make_tasks)
+                while len(self._runs) > self.max_runs:
+                    self._runs.popitem(last=False)
+            return self._runs[key]
+
+    def report(self, key):
+        with self._lock:
+            future = self._runs.get(key)
+        if future is None or not future.done() or future.exception() is not None:
+            return None
+        return future.result()
+
+    def reports(self):
+        # Finished runs still remembered, most recent first
+        with self._lock:
+            futures = list(self._runs.values())
+        return [future.result() for future in reversed(futures) if future.done() and future.exception() is None]
+
+    def _run(self, key, make_tasks):
+        report = PrefetchReport(key)
+        start = time.perf_counter()
+        try:
+            tasks = make_tasks(lambda source: CountingSource(source, report))
+        except Exception as error:
+            # Counted as one failed task; forgetting the key lets the next selection of the match try again
+            report.error = repr(error)
+            report.add(failed=1)
+            tasks = []
+            with self._lock:
+                self._runs.pop(key, None)
+        report.tasks = len(tasks)
+        futures = [self.pool.submit(task) for task in tasks]
+        wait(futures)
+        for future in futures:
+            if future.exception() is not None:
+                report.add(failed=1)
+                logger.debug("Prefetch task failed for %s: %r", key, future.exception())
+        report.seconds = time.perf_counter() - start
+        self.registry.observe('afl_prefetch_seconds', report.seconds)
+        self.registry.inc('afl_prefetch_runs_total')
+        self.registry.inc('afl_prefetch_files_total', report.files)
+        self.registry.inc('afl_prefetch_bytes_total', report.bytes)
+        self.registry.inc('afl_prefetch_failed_tasks_total', report.failed)
+        logger.info("%r", report)
+        return report
+
+    def read_many(self, source, paths):
+        # Fetch several files in parallel: {path: bytes}
+        return dict(zip(paths, self._io_pool.map(source.read_bytes, paths)))
@@ -0,0 +1,460 @@
+import os
+import json
+import time
+import pickle
+import shutil
+import hashlib
+import argparse
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from data_source import make_data_source, write_atomic
+from http_client import GITHUB_API, FetchClient
+from cache import folder_version, file_version, path_version
+from fixture_index import FixtureIndex, ensure_fixture_index, default_fixture_path
+from player_index import PlayerIndex, prepare_season_df, default_index_path
+from player_registry import ALIASES_FILE, PlayerRegistry, read_aliases, registry_version
+from game_log import GameLog
+from archive import load_catalog
+from schema import compact, compact_dict, for_display
+from csv_schema import read_csv
+from styling import LinearColormap, gradient_css
+from charts import season_specs, previous_specs
+from h2h import RESULTS_FILE, build_history, H2HEngine
+from rolling import RollingAverages
+
+# Offline pre-render of a round's match pages. Everything a match page shows is
+# fixed by the round's data: the averages tables and their CSS, each team's H2H
+# form, every listed player's season frame, and the table CSS and chart specs for
+# each player and window. The job below builds all of it for every match of the
+# round, one match per worker process, with the same helpers and cache keys the
+# page uses, and writes it to a versioned directory:
+#
+#   <out>/<round>/<version>/<match>.pkl       {(namespace, key): pickled value} for one match
+#   <out>/<round>/<version>/manifest.json     the data versions each match was built from
+#   <out>/<round>/CURRENT                     the version the app reads
+#
+# where <round> is the round's folder in the AFL repo (Round_N, or year=YYYY/round=N
+# in the partitioned archive, see archive.py).
+#
+# The app serves a match from its artifact when the manifest matches the data it
+# sees, and computes the page live otherwise (custom windows, new data, no job).
+# Each value is pickled on its own, so a rerun only decodes the few items it shows.
+#
+#   python prerender.py --workers 4
+#   python prerender.py --year 2023 --round 24
+
+# Bump when the artifact layout or anything rendered into it changes
+PRERENDER_VERSION = 2
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+# Versions kept besides the current one, for sessions still reading them
+KEEP_VERSIONS = 2
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# The averages windows every match page offers
+WINDOWS = ["Season Average", "Last 10 Average", "Last 5 Average", "Last 3 Average"]
+
+styled_columns = ["Player", "Total Games Played", "Highest Dis.", "Lowest Dis.", "Disposals", "Goals", "Behinds",
+                  "Frees For", "15 Dis. %", "20 Dis. %", "25 Dis. %", "1 Goal %", "2 Goals %"]
+
+# Exclude for colour map
+exclude_columns_cmap = ['Round', 'Opponent', 'Result', 'Player Name', "Date", "DisplayRound"]
+
+# Columns that are required but need to be excluded from final display
+exclude_columns = ['DisplayRound', 'Date']
+
+dummy_columns = ["Player Name", "Round", "Opponent", "Result", "D", "G", "B", "DisplayRound", "Date"]
+
+# Define Colourmap
+cmap = LinearColormap([(0, 0, 0, 0), "#488f31"])
+
+
+# Cache keys, shared by the page and the job
+def season_key(team_url, player_url):
+    return f"season:{team_url}/{player_url}"
+
+
+def season_chart_key(team_url, player_url, window):
+    return f"season:{team_url}/{player_url}:{window}"
+
+
+def previous_key(csv_name, player):
+    return f"h2h:{csv_name}/{player}"
+
+
+def averages_key(rolling, window_names):
+    # The averages tables differ by window only when they come from the rolling engine
+    return tuple(window_names) if rolling else None
+
+
+def averages_css(csv_dict):
+    # Gradient CSS for every averages table of a match in one vectorised pass
+    tables = {csv_name: csv_df.sort_values(by=['Disposals'], ascending=False)[styled_columns]
+              for csv_name, csv_df in csv_dict.items()}
+    return dict(zip(tables, gradient_css(list(tables.values()), cmap)))
+
+
+def table_css(table_df, subset=None):
+    return gradient_css([table_df], cmap, None if subset is None else [subset])[0]
+
+
+def season_table(season_df):
+    # (displayed columns, columns coloured by the gradient)
+    return (season_df[[col for col in season_df.columns if col not in exclude_columns]],
+            [col for col in season_df.columns if col not in exclude_columns_cmap])
+
+
+def previous_games(h2h_df, player):
+    # The player's rows of a "<Team> Previous" table, with Year as text in the second column
+    previous_df = h2h_df[h2h_df["Player Name"] == player]
+    previous_df = previous_df.assign(Year=previous_df["Year"].astype(str))
+    columns_except_year = [col for col in previous_df.columns if col != 'Year']
+    columns_except_year.insert(1, 'Year')
+    return previous_df[columns_except_year]
+
+
+def previous_table(previous_df):
+    return previous_df[[col for col in previous_df.columns if col not in exclude_columns]]
+
+
+def results_versions(source, round_paths, list_dir=None):
+    # {"<round>/H2H Results.csv": version} for every round of the season that has one
+    list_dir = list_dir or source.list_dir
+    versions = {}
+    for round_path in round_paths:
+        version = file_version(list_dir(round_path), RESULTS_FILE)
+        if version is not None:
+            versions[f"{round_path}/{RESULTS_FILE}"] = version
+    return versions
+
+
+def season_index_paths(season, current_year, fixture_index=None, player_index=None):
+    # (fixture index, player index) paths for a season (see archive.Season); the overrides given
+    # (AFL_FIXTURE_INDEX, AFL_PLAYER_INDEX) are the current season's
+    if season.year != current_year:
+        fixture_index = player_index = None
+    return (fixture_index or default_fixture_path(APP_DIR, os.path.basename(season.fixture)),
+            player_index or default_index_path(APP_DIR, season.year))
+
+
+def page_inputs(folder, season, players, results, game_log, rolling):
+    # Everything a match page depends on besides the match folder itself; an artifact is only used when
+    # the app computes the same dict
+    digest = hashlib.sha1(json.dumps(sorted(results.items())).encode('utf-8')).hexdigest()
+    return {'prerender_version': PRERENDER_VERSION, 'folder': folder, 'season': str(season), 'players': players,
+            'results': digest, 'game_log': game_log, 'averages': 'rolling' if rolling else 'csv'}
+
+
+# ---------------------------------------------------------------- reading (the app)
+
+def current_version(out_dir, round_path):
+    try:
+        with open(os.path.join(out_dir, round_path, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _artifact_name(match):
+    return f"{match}.pkl"
+
+
+# Namespaces holding frames that are moved onto the reading process's shared dictionaries
+FRAME_NAMESPACES = {'averages': compact_dict, 'h2h_games': compact_dict, 'season': compact}
+
+
+def encode_artifacts(artifacts):
+    # Frames drop the category values they don't use, or every one would carry whole dictionaries
+    encoded = {}
+    for key, value in artifacts.items():
+        if key[0] == 'season':
+            value = for_display(value)
+        elif key[0] in FRAME_NAMESPACES:
+            value = {name: for_display(df) for name, df in value.items()}
+        encoded[key] = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+    return encoded
+
+
+def decode_artifact(namespace, data):
+    value = pickle.loads(data)
+    if namespace in FRAME_NAMESPACES:
+        value = FRAME_NAMESPACES[namespace](value)
+    return value
+
+
+def load_match(out_dir, round_path, version, match, inputs):
+    # The match's {(namespace, key): pickled value} (see decode_artifact), or {} when the version doesn't
+    # have the match or was built from other data
+    version_dir = os.path.join(out_dir, round_path, version)
+    try:
+        with open(os.path.join(version_dir, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        if manifest['matches'].get(match) != inputs:
+            return {}
+        with open(os.path.join(version_dir, _artifact_name(match)), 'rb') as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        # Pruned under us; the next CURRENT has it
+        return {}
+
+
+# ---------------------------------------------------------------- building (the job)
+
+def open_sources(config):
+    # Same sources as the app, from the same settings
+    client = private_client = None
+    if config['source'] != 'local':
+        client = FetchClient(config['api_url'], token=os.getenv('GITHUB_TOKEN'))
+    if config['private_source'] != 'local':
+        private_client = FetchClient(config['api_url'], token=os.getenv('GITHUB_TOKEN2'))
+    source = make_data_source(config['source'], root=config['root'], client=client, full_name='hermclane/AFL',
+                              mirror_root=os.path.join(config['mirror_dir'], 'AFL'))
+    private_source = make_data_source(config['private_source'], root=config['private_root'], client=private_client,
+                                      full_name='hermclane/AFLPlayerStatsRepo',
+                                      mirror_root=os.path.join(config['mirror_dir'], 'AFLPlayerStatsRepo'))
+    return source, private_source
+
+
+class RoundInputs:
+    # What rendering any match of the round needs, loaded once per worker process
+    def __init__(self, config):
+        self.round_path = config['round_path']
+        self.round_number = config['round_number']
+        self.source, self.private_source = open_sources(config)
+        root_contents = self.source.list_dir('')
+        self.fixture_index = FixtureIndex.load(config['fixture_index'])
+        if file_version(self.private_source.list_dir(''), config['players']) is None:
+            # As on the page: no workbook for this season, so no player resolves
+            players_df = pd.DataFrame(columns=['Player', 'Team', 'name_url'])
+        else:
+            players_df = compact(pd.read_excel(BytesIO(self.private_source.read_bytes(config['players'])),
+                                               engine='openpyxl'))
+        aliases_df = None
+        if file_version(root_contents, ALIASES_FILE) is not None:
+            aliases_df = read_aliases(self.source.read_bytes(ALIASES_FILE))
+        self.player_registry = PlayerRegistry(players_df, aliases_df)
+        results = results_versions(self.source, config['round_paths'])
+        self.h2h_engine = H2HEngine(build_history([read_csv(self.source.read_bytes(path), 'h2h_results')
+                                                   for path in results]))
+        self.game_log = None
+        if config['game_log'] and path_version(self.source.list_dir, config['game_log']) is not None:
+            self.game_log = GameLog.from_bytes(self.source.read_bytes(config['game_log']))
+        self.player_index = PlayerIndex(config['player_index']) if config['player_index'] else None
+        self.rolling_averages = None
+        if config['rolling'] and self.player_index is not None:
+            self.rolling_averages = RollingAverages()
+            self.rolling_averages.sync(self.player_index)
+
+    def _read_match_csvs(self, match_path, suffix, kind, strip):
+        # {file name without `strip`: frame} for the match's files ending in suffix
+        return {entry.name.replace(strip, ''): read_csv(self.source.read_bytes(entry.path), kind)
+                for entry in self.source.list_dir(match_path) if entry.name.endswith(suffix)}
+
+    def season_df(self, team_url, player_url):
+        if self.player_index is not None:
+            season_df = self.player_index.get(team_url, player_url)
+            if season_df is None:
+                raise KeyError(f"{team_url}/{player_url} is not in the player index")
+            return season_df
+        data = self.private_source.read_bytes(f"{team_url}/{player_url}.csv")
+        return compact(prepare_season_df(read_csv(data, 'season')))
+
+    def render_match(self, match_name):
+        match = self.fixture_index.match(self.round_number, match_name)
+        match_path = f"{self.round_path}/{match_name}"
+        teams = [(match.home_team, match.home_team_url, match.away_team),
+                 (match.away_team, match.away_team_url, match.home_team)]
+
+        rolling = self.rolling_averages is not None
+        if rolling:
+            csv_dict = {}
+            for team, team_url, _ in teams:
+                csv_dict.update(self.rolling_averages.averages(team, team_url, WINDOWS))
+        else:
+            csv_dict = self._read_match_csvs(match_path, 'Average.csv', 'average', '.csv')
+        csv_dict = compact_dict(csv_dict)
+        csv_dict_H2H = self.game_log.match_games(self.round_path, match_name) if self.game_log is not None else None
+        if csv_dict_H2H is None:
+            csv_dict_H2H = self._read_match_csvs(match_path, ' H2H Games.csv', 'h2h_games', ' H2H Games.csv')
+        csv_dict_H2H = compact_dict(csv_dict_H2H)
+
+        key = averages_key(rolling, WINDOWS)
+        artifacts = {('averages', key): csv_dict, ('h2h_games', None): csv_dict_H2H,
+                     ('averages_css', key): averages_css(csv_dict)}
+        seasons = {}
+        for team, team_url, opponent in teams:
+            artifacts[('form', (team, opponent))] = self.h2h_engine.form(team, opponent)
+            for window in WINDOWS:
+                for csv_name, csv_df in csv_dict.items():
+                    if window in csv_name and team in csv_name:
+                        self._render_players(artifacts, seasons, team, team_url, opponent, window, csv_df,
+                                            csv_dict_H2H)
+        return artifacts
+
+    def _render_players(self, artifacts, seasons, team, team_url, opponent, window, csv_df, csv_dict_H2H):
+        df = csv_df.sort_values(by=['Disposals'], ascending=False)
+        player_urls = self.player_registry.resolve_squad(team, sorted(df['Player'].unique()))
+        for player, player_url in player_urls.items():
+            player_df = df[df["Player"] == player]
+
+            # A player the workbook doesn't have has no season key of their own, so the page builds their
+            # (empty) season live
+            if player_url is not None:
+                if (team_url, player_url) not in seasons:
+                    try:
+                        season_df = self.season_df(team_url, player_url)
+                        artifacts[('season', (team_url, player_url))] = season_df
+                        season_table_df, subset = season_table(season_df)
+                        artifacts[('table_css', season_key(team_url, player_url))] = table_css(season_table_df,
+                                                                                               subset)
+                    except (KeyError, FileNotFoundError):
+                        # No season file for this player (yet)
+                        season_df = pd.DataFrame(columns=dummy_columns)
+                    seasons[team_url, player_url] = for_display(season_df)
+                artifacts[('chart_spec', season_chart_key(team_url, player_url, window))] = season_specs(
+                    seasons[team_url, player_url], window, player_df["Disposals"].iloc[0],
+                    player_df["Goals"].iloc[0])
+
+            for csv_name, h2h_df in csv_dict_H2H.items():
+                if team not in csv_name or ('chart_spec', previous_key(csv_name, player)) in artifacts:
+                    continue
+                previous_df = previous_games(h2h_df, player)
+                if not previous_df.empty:
+                    artifacts[('table_css', previous_key(csv_name, player))] = table_css(previous_table(previous_df))
+                artifacts[('chart_spec', previous_key(csv_name, player))] = previous_specs(
+                    for_display(previous_df), opponent, previous_df["D"].mean(), previous_df["G"].mean())
+
+
+_round_inputs = None
+
+
+def _init_worker(config):
+    global _round_inputs
+    _round_inputs = RoundInputs(config)
+
+
+def _render_to_file(job):
+    match_name, path = job
+    start = time.perf_counter()
+    artifacts = _round_inputs.render_match(match_name)
+    data = pickle.dumps(encode_artifacts(artifacts), protocol=pickle.HIGHEST_PROTOCOL)
+    write_atomic(path, data)
+    return len(artifacts), len(data), time.perf_counter() - start
+
+
+def round_page_inputs(config, source, private_source):
+    # {match folder: page_inputs} for every match of the round that has a folder, in fixture order
+    root_contents = source.list_dir('')
+    round_contents = source.list_dir(config['round_path'])
+    private_contents = private_source.list_dir('')
+    fixture_index = ensure_fixture_index(source, config['fixture'], config['fixture_index'],
+                                         path_version(source.list_dir, config['fixture']))
+    folders = [entry.name for entry in round_contents if entry.type == 'dir']
+    match_folders = [folder for match in fixture_index.round_matches(config['round_number'])
+                     for folder in folders if match.match_string in folder]
+    if config['player_index']:
+        # PlayerIndex.version, without loading the table
+        season = os.stat(config['player_index']).st_mtime_ns
+    else:
+        season = folder_version(private_contents)
+    rolling = config['rolling'] and bool(config['player_index'])
+    results = results_versions(source, config['round_paths'])
+    game_log = path_version(source.list_dir, config['game_log']) if config['game_log'] else None
+    return {folder: page_inputs(folder_version(source.list_dir(f"{config['round_path']}/{folder}")), season,
+                                registry_version(root_contents, private_contents, config['players']), results,
+                                game_log, rolling)
+            for folder in match_folders}
+
+
+def prune_versions(round_dir, keep=KEEP_VERSIONS):
+    # Drops all but the current version and the `keep` newest others
+    current = current_version(os.path.dirname(round_dir), os.path.basename(round_dir))
+    versions = [name for name in os.listdir(round_dir)
+                if name != current and os.path.isdir(os.path.join(round_dir, name))]
+    versions.sort(key=lambda name: os.path.getmtime(os.path.join(round_dir, name)), reverse=True)
+    for name in versions[keep:]:
+        shutil.rmtree(os.path.join(round_dir, name), ignore_errors=True)
+    return versions[keep:]
+
+
+def prerender_round(config, out_dir, workers=4):
+    # Renders every match of the round into a new version directory, then points CURRENT at it.
+    # Returns (version, {match: (artifacts, bytes, seconds)}).
+    source, private_source = open_sources(config)
+    inputs = round_page_inputs(config, source, private_source)
+    version = hashlib.sha1(json.dumps(inputs, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+    round_dir = os.path.join(out_dir, config['round_path'])
+    version_dir = os.path.join(round_dir, version)
+
+    jobs = [(match, os.path.join(version_dir, _artifact_name(match))) for match in inputs]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,)) as pool:
+        results = dict(zip(inputs, pool.map(_render_to_file, jobs)))
+
+    manifest = {'prerender_version': PRERENDER_VERSION, 'round': config['round_path'], 'built_at': time.time(),
+                'matches': inputs}
+    write_atomic(os.path.join(version_dir, MANIFEST_FILE), json.dumps(manifest, indent=2).encode('utf-8'))
+    write_atomic(os.path.join(round_dir, CURRENT_FILE), version.encode('utf-8'))
+    prune_versions(round_dir)
+    return version, results
+
+
+def config_from_env(round_number=None, year=None):
+    # The app's settings (see streamlit_app.py), so the job renders what the app would. The season and round
+    # default to the catalog's current ones (an older season's to its last round).
+    load_dotenv()
+    config = {
+        'source': os.getenv('AFL_DATA_SOURCE', 'local'),
+        'root': APP_DIR,
+        'mirror_dir': os.getenv('AFL_MIRROR_DIR', os.path.join(APP_DIR, '.mirror')),
+        'private_source': os.getenv('AFL_PRIVATE_DATA_SOURCE', 'github'),
+        'private_root': os.getenv('AFL_PRIVATE_DATA_DIR'),
+        'api_url': os.getenv('AFL_GITHUB_API', GITHUB_API),
+        'rolling': os.getenv('AFL_ROLLING_AVERAGES', '1') == '1',
+    }
+    source, _ = open_sources(config)
+    catalog = load_catalog(source)
+    season = catalog.season(year or catalog.current_year)
+    if round_number is None:
+        round_number = catalog.current_round if season.year == catalog.current_year else max(season.rounds)
+    fixture_index, player_index = season_index_paths(season, catalog.current_year, os.getenv('AFL_FIXTURE_INDEX'),
+                                                     os.getenv('AFL_PLAYER_INDEX'))
+    config.update({
+        'year': season.year,
+        'fixture': season.fixture,
+        'players': season.players,
+        'game_log': season.game_log,
+        'round_paths': catalog.round_paths(season.year),
+        'fixture_index': fixture_index,
+        'player_index': player_index if os.path.exists(player_index) else None,
+        'round_number': round_number,
+        'round_path': catalog.round_path(season.year, round_number),
+    })
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-render every match page of a round for the app to serve")
+    parser.add_argument('--year', type=int, help="season (default: the catalog's current one)")
+    parser.add_argument('--round', type=int, help="round number (default: the season's current or last round)")
+    parser.add_argument('--out', help='artifact directory (default: AFL_PRERENDER_DIR or .prerender next to the app)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    config = config_from_env(args.round, args.year)
+    out_dir = args.out or os.getenv('AFL_PRERENDER_DIR', os.path.join(APP_DIR, '.prerender'))
+
+    start = time.perf_counter()
+    version, results = prerender_round(config, out_dir, workers=args.workers)
+    artifacts = sum(count for count, _, _ in results.values())
+    size = sum(size for _, size, _ in results.values())
+    print(f"{os.path.join(out_dir, config['round_path'], version)}: {len(results)} matches, {artifacts} artifacts, "
+          f"{size / 2 ** 20:.1f} MB ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()
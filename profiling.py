@@ -0,0 +1,53 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from metrics import metrics
+
+# Stage timer for the page. The app wraps each expensive step in
+#   with stage('csv parse'):
+#       ...
+# and benchmarks/bench_render.py drains the recorded (stage, seconds) pairs after
+# every headless rerun. Records go into a bounded buffer, so leaving the timers
+# on in production costs a perf_counter() call per stage and nothing else. Each
+# stage is also a sample of the afl_stage_seconds histogram (see metrics.py).
+
+STAGES = ('fixture load', 'folder listing', 'csv parse', 'styler build', 'chart spec build', 'threshold query')
+
+_records = deque(maxlen=10000)
+_lock = threading.Lock()
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        with _lock:
+            _records.append((name, elapsed))
+        metrics.observe('afl_stage_seconds', elapsed, stage=name)
+
+
+def drain():
+    # Returns and clears everything recorded since the last drain
+    with _lock:
+        records = list(_records)
+        _records.clear()
+    return records
+
+
+def summarize(records):
+    # {stage: {'count', 'total_ms', 'max_ms'}}
+    summary = {}
+    for name, seconds in records:
+        entry = summary.setdefault(name, {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+        entry['count'] += 1
+        entry['total_ms'] += seconds * 1000
+        entry['max_ms'] = max(entry['max_ms'], seconds * 1000)
+    for entry in summary.values():
+        entry['total_ms'] = round(entry['total_ms'], 3)
+        entry['max_ms'] = round(entry['max_ms'], 3)
+    return summary
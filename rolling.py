@@ -0,0 +1,199 @@
+import re
+import math
+import threading
+from itertools import compress
+
+import numpy as np
+import pandas as pd
+
+# Rolling averages from per-player game logs, in place of the four Average CSVs
+# (Season, Last 10, Last 5, Last 3) that are regenerated for every match and team
+# each round. Each player keeps a ring buffer of their latest games plus running
+# sums and threshold counts for the season and for every standing window, so a new
+# round's games are folded in with O(1) work per game and window. Any other
+# window (e.g. Last 7) is served on demand from the ring buffer.
+
+# Per-game stats kept in the ring buffer, in this order
+STATS = ('D', 'G', 'B', 'FF')
+# (column, stat position, minimum) for the "hit rate" columns
+THRESHOLDS = (('15 Dis. %', 0, 15), ('20 Dis. %', 0, 20), ('25 Dis. %', 0, 25), ('1 Goal %', 1, 1),
+              ('2 Goals %', 1, 2))
+AVERAGE_COLUMNS = ['Player', 'Total Games Played', 'Highest Dis.', 'Lowest Dis.', 'Disposals', 'Goals', 'Behinds',
+                   'Frees For'] + [column for column, _, _ in THRESHOLDS]
+DEFAULT_WINDOWS = (10, 5, 3)
+# A full home-and-away season plus finals fits in the buffer
+DEFAULT_CAPACITY = 30
+
+# Row hashes are uint64; checksums wrap around like them
+_MASK = 2 ** 64 - 1
+
+_WINDOW_NAME = re.compile(r'^Last (\d+) Average$')
+
+
+def window_size(window_name):
+    # 'Season Average' -> None, 'Last 7 Average' -> 7
+    if window_name == 'Season Average':
+        return None
+    match = _WINDOW_NAME.match(window_name)
+    if match is None:
+        raise ValueError(f"Unknown averages window: {window_name!r}")
+    return int(match.group(1))
+
+
+def _hits(values):
+    return [1 if values[stat] >= minimum else 0 for _, stat, minimum in THRESHOLDS]
+
+
+def _add(totals, values, sign=1):
+    for position, value in enumerate(values):
+        totals[position] += sign * value
+
+
+class _Window:
+    __slots__ = ('size', 'sums', 'hits')
+
+    def __init__(self, size):
+        self.size = size
+        self.sums = [0.0] * len(STATS)
+        self.hits = [0] * len(THRESHOLDS)
+
+
+class PlayerLog:
+    def __init__(self, name, capacity=DEFAULT_CAPACITY, windows=DEFAULT_WINDOWS):
+        self.name = name
+        self.capacity = capacity
+        self.count = 0
+        self.last_date = None
+        self._games = [None] * capacity
+        self._head = 0
+        self._season = _Window(None)
+        self._high = -math.inf
+        self._low = math.inf
+        self._windows = {size: _Window(size) for size in windows if size <= capacity}
+
+    def add(self, date, values):
+        values = tuple(float(value) for value in values)
+        hits = _hits(values)
+        for window in self._windows.values():
+            if self.count >= window.size:
+                # The game falling out of this window
+                evicted = self._games[(self._head - window.size) % self.capacity]
+                _add(window.sums, evicted, -1)
+                _add(window.hits, _hits(evicted), -1)
+            _add(window.sums, values)
+            _add(window.hits, hits)
+        _add(self._season.sums, values)
+        _add(self._season.hits, hits)
+        self._high = max(self._high, values[0])
+        self._low = min(self._low, values[0])
+        self._games[self._head] = values
+        self._head = (self._head + 1) % self.capacity
+        self.count += 1
+        self.last_date = date
+
+    def recent(self, size):
+        # The last `size` games, oldest first (at most the buffer's capacity)
+        size = min(size, self.count, self.capacity)
+        return [self._games[(self._head - offset) % self.capacity] for offset in range(size, 0, -1)]
+
+    def averages(self, size=None):
+        # One row of an Average CSV for the season (size=None) or the last `size` games
+        if size is None:
+            games, sums, hits = self.count, self._season.sums, self._season.hits
+            high, low = self._high, self._low
+        else:
+            recent = self.recent(size)
+            games = len(recent)
+            if size in self._windows:
+                sums, hits = self._windows[size].sums, self._windows[size].hits
+            else:
+                sums, hits = [0.0] * len(STATS), [0] * len(THRESHOLDS)
+                for values in recent:
+                    _add(sums, values)
+                    _add(hits, _hits(values))
+            disposals = [values[0] for values in recent]
+            high, low = max(disposals), min(disposals)
+        row = {'Player': self.name, 'Total Games Played': self.count, 'Highest Dis.': int(high),
+               'Lowest Dis.': int(low), 'Disposals': round(sums[0] / games, 2), 'Goals': round(sums[1] / games, 2),
+               'Behinds': round(sums[2] / games, 2), 'Frees For': round(sums[3] / games, 2)}
+        for (column, _, _), count in zip(THRESHOLDS, hits):
+            row[column] = round(100 * count / games)
+        return row
+
+
+class RollingAverages:
+    def __init__(self, capacity=DEFAULT_CAPACITY, windows=DEFAULT_WINDOWS):
+        self.capacity = capacity
+        self.windows = windows
+        self.games = 0
+        self.synced_version = None
+        self._players = {}
+        # (team_url, name_url) -> checksum of the games folded into that player
+        self._checksums = {}
+        self._teams = {}
+        self._lock = threading.Lock()
+
+    def add_games(self, logs_df):
+        # Fold in game logs (team_url, name_url, Player Name, Date and STATS columns); games a
+        # player already has (by date) are skipped, so a whole season can be passed every round.
+        # A player whose earlier games differ from what was folded in (a corrected stat, a game
+        # added or dropped before their latest) is rebuilt from the logs. A missing stat counts
+        # as 0, so one blank cell can't turn a window's running sums into NaN for good.
+        with self._lock:
+            logs_df = logs_df.sort_values(['team_url', 'name_url', 'Date'], kind='stable')
+            logs_df = logs_df.assign(**{stat: logs_df[stat].astype(float).fillna(0) for stat in STATS})
+            # Order-free checksum of each player's games: the sum of their rows' hashes
+            row_hashes = pd.util.hash_pandas_object(logs_df[['Date', *STATS]], index=False).to_numpy()
+            keys = list(zip(logs_df['team_url'], logs_df['name_url']))
+            if self._players:
+                last_dates = pd.to_datetime([getattr(self._players.get(key), 'last_date', None) for key in keys])
+                is_new = np.asarray(last_dates.isna() | (logs_df['Date'].to_numpy() > last_dates))
+                seen = {}
+                for key, row_hash in zip(compress(keys, ~is_new), row_hashes[~is_new]):
+                    count, checksum = seen.get(key, (0, 0))
+                    seen[key] = (count + 1, (checksum + int(row_hash)) & _MASK)
+                stale = {key for key, player in self._players.items()
+                         if seen.get(key, (0, 0)) != (player.count, self._checksums[key])}
+                for key in stale:
+                    player = self._players.pop(key)
+                    del self._checksums[key]
+                    self._teams[key[0]].remove(player)
+                    self.games -= player.count
+                if stale:
+                    is_new |= np.array([key in stale for key in keys], dtype=bool)
+                logs_df = logs_df[is_new]
+                row_hashes = row_hashes[is_new]
+                keys = list(compress(keys, is_new))
+
+            player, player_key = None, None
+            columns = [logs_df['Player Name'], logs_df['Date']] + [logs_df[stat] for stat in STATS]
+            for key, row_hash, name, date, *values in zip(keys, row_hashes, *columns):
+                if key != player_key:
+                    player, player_key = self._players.get(key), key
+                    if player is None:
+                        player = PlayerLog(name, self.capacity, self.windows)
+                        self._players[key] = player
+                        self._checksums[key] = 0
+                        self._teams.setdefault(key[0], []).append(player)
+                player.add(date, values)
+                self._checksums[key] = (self._checksums[key] + int(row_hash)) & _MASK
+            self.games += len(keys)
+        return len(keys)
+
+    def sync(self, player_index):
+        # Add whatever games a rebuilt player index has that we haven't seen, and redo the players
+        # whose earlier games it corrected
+        if self.synced_version == (player_index.path, player_index.version):
+            return 0
+        added = self.add_games(player_index.game_logs())
+        self.synced_version = (player_index.path, player_index.version)
+        return added
+
+    def window_frame(self, team_url, size=None):
+        with self._lock:
+            rows = [player.averages(size) for player in self._teams.get(team_url, []) if player.count]
+        return pd.DataFrame(rows, columns=AVERAGE_COLUMNS).sort_values('Player', ignore_index=True)
+
+    def averages(self, team, team_url, window_names):
+        # {"<Team> <Window>": frame}, keyed like the Average CSVs
+        return {f"{team} {name}": self.window_frame(team_url, window_size(name)) for name in window_names}
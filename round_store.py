@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import argparse
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from cache import size_of
+from data_source import LocalDataSource, write_atomic
+from csv_schema import read_csv
+from archive import load_catalog
+
+# Columnar round store: compiles the ~90 CSVs of a Round_N folder into one Arrow
+# IPC file per kind, which the app memory-maps and filters instead of parsing
+# each CSV separately.
+#
+#   <store>/Round_N/average.arrow      every "<Team> <Window> Average.csv"
+#   <store>/Round_N/h2h_games.arrow    every "<Team> Previous H2H Games.csv"
+#   <store>/Round_N/h2h_results.arrow  the round's "H2H Results.csv"
+#   <store>/Round_N/_manifest.json     source file versions the store was built from
+#
+# A partitioned round (year=YYYY/round=N, see archive.py) is stored under the same
+# relative path.
+#
+# Every table carries `match`, `team`, `window` and `kind` columns.
+
+KINDS = ('average', 'h2h_games', 'h2h_results')
+WINDOWS = ('Season', 'Last 10', 'Last 5', 'Last 3')
+KEY_COLUMNS = ['match', 'team', 'window', 'kind']
+MANIFEST_NAME = '_manifest.json'
+# Bump when the stored layout changes so old stores get rebuilt
+STORE_VERSION = 2
+
+def classify_csv(file_name):
+    # Returns (kind, team, window) for a round CSV, or None if it isn't one we store
+    if file_name == 'H2H Results.csv':
+        return 'h2h_results', None, None
+    if file_name.endswith(' Previous H2H Games.csv'):
+        return 'h2h_games', file_name[:-len(' Previous H2H Games.csv')], None
+    if file_name.endswith(' Average.csv'):
+        stem = file_name[:-len(' Average.csv')]
+        for window in WINDOWS:
+            if stem.endswith(f' {window}'):
+                return 'average', stem[:-len(window) - 1], window
+    return None
+
+
+def _with_keys(kind, df, match, team, window):
+    df.insert(0, 'kind', kind)
+    df.insert(0, 'window', window)
+    df.insert(0, 'team', team)
+    df.insert(0, 'match', match)
+    return df
+
+
+def _to_table(frames):
+    table = pa.Table.from_pandas(pd.concat(frames, ignore_index=True), preserve_index=False)
+    # The pandas metadata only slows down to_pandas() on every slice
+    table = table.replace_schema_metadata(None)
+    # Repeated key strings are stored once per table
+    for column in KEY_COLUMNS:
+        index = table.schema.get_field_index(column)
+        table = table.set_column(index, column, pc.dictionary_encode(table.column(column).cast(pa.string())))
+    return table
+
+
+def store_round_dir(store_dir, round_path):
+    return os.path.join(store_dir, *round_path.split('/'))
+
+
+def source_versions(source, round_path):
+    # {relative path: version} for every CSV that goes into the store
+    versions = {}
+    for entry in source.list_dir(round_path):
+        if entry.type == 'dir':
+            for file in source.list_dir(entry.path):
+                if classify_csv(file.name):
+                    versions[file.path] = file.sha
+        elif classify_csv(entry.name):
+            versions[entry.path] = entry.sha
+    return versions
+
+
+def compile_round(source, round_path, store_dir, versions=None):
+    if versions is None:
+        versions = source_versions(source, round_path)
+    frames = {kind: [] for kind in KINDS}
+    for path in sorted(versions):
+        parts = path[len(round_path) + 1:].split('/')
+        kind, team, window = classify_csv(parts[-1])
+        match = parts[0] if len(parts) > 1 else None
+        df = read_csv(source.read_bytes(path), kind)
+        frames[kind].append(_with_keys(kind, df, match, team, window))
+
+    round_dir = store_round_dir(store_dir, round_path)
+    os.makedirs(round_dir, exist_ok=True)
+    for kind, kind_frames in frames.items():
+        if not kind_frames:
+            continue
+        sink = pa.BufferOutputStream()
+        table = _to_table(kind_frames)
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        write_atomic(os.path.join(round_dir, f'{kind}.arrow'), sink.getvalue().to_pybytes())
+
+    manifest = {'store_version': STORE_VERSION, 'built_at': time.time(), 'files': versions}
+    write_atomic(os.path.join(round_dir, MANIFEST_NAME), json.dumps(manifest, indent=1).encode('utf-8'))
+    return round_dir
+
+
+def ensure_round_store(source, round_path, store_dir):
+    # Rebuild the store only when a source file was added, removed or changed
+    round_dir = store_round_dir(store_dir, round_path)
+    versions = source_versions(source, round_path)
+    try:
+        with open(os.path.join(round_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    if manifest.get('store_version') != STORE_VERSION or manifest.get('files') != versions:
+        compile_round(source, round_path, store_dir, versions)
+    return RoundStore(round_dir)
+
+
+class RoundStore:
+    def __init__(self, round_dir):
+        self.round_dir = round_dir
+        # Memory-mapped, so only the pages a filter touches are read from disk
+        self._tables = {}
+        for kind in KINDS:
+            path = os.path.join(self.round_dir, f'{kind}.arrow')
+            if os.path.exists(path):
+                self._tables[kind] = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        # Rows are written grouped by file, so each (match, team, window) is one
+        # contiguous run and can be served as a zero-copy slice
+        self._ranges = {}
+        for kind, table in self._tables.items():
+            ranges = {}
+            keys = zip(*(table.column(column).to_pylist() for column in ('match', 'team', 'window')))
+            for row, key in enumerate(keys):
+                start, length = ranges.get(key, (row, 0))
+                ranges[key] = (start, length + 1)
+            self._ranges[kind] = ranges
+
+    def nbytes(self):
+        return size_of(self._tables) + size_of(self._ranges)
+
+    def table(self, kind):
+        return self._tables.get(kind)
+
+    def query(self, kind, **predicates):
+        # e.g. query('average', match='Carlton vs Port Adelaide', window='Season')
+        table = self.table(kind)
+        if table is None:
+            return None
+        expression = None
+        for column, value in predicates.items():
+            condition = pc.field(column) == value
+            expression = condition if expression is None else expression & condition
+        if expression is not None:
+            table = table.filter(expression)
+        return table
+
+    def ranges(self, kind):
+        return self._ranges.get(kind, {})
+
+    def _frame(self, table):
+        # Columns belonging to another file's schema come back all-null
+        columns = [name for name in table.column_names if name not in KEY_COLUMNS and
+                   (not len(table) or table.column(name).null_count < len(table))]
+        return table.select(columns).to_pandas()
+
+    def load_averages(self, match):
+        # Same shape as load_csv_data: {"<Team> <Window> Average": DataFrame}
+        csv_dict = {}
+        for (key_match, team, window), (start, length) in self.ranges('average').items():
+            if key_match == match:
+                csv_dict[f'{team} {window} Average'] = self._frame(self.table('average').slice(start, length))
+        return csv_dict
+
+    def load_h2h_games(self, match):
+        # Same shape as load_player_H2H_data: {"<Team> Previous": DataFrame}
+        csv_dict_H2H = {}
+        for (key_match, team, _), (start, length) in self.ranges('h2h_games').items():
+            if key_match == match:
+                csv_dict_H2H[f'{team} Previous'] = self._frame(self.table('h2h_games').slice(start, length))
+        return csv_dict_H2H
+
+    def load_h2h_results(self):
+        table = self.table('h2h_results')
+        return None if table is None else self._frame(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile round folders into Arrow round stores')
+    parser.add_argument('rounds', nargs='*', type=int, help='round numbers (default: every round of the season)')
+    parser.add_argument('--year', type=int, help='season (default: the current one)')
+    parser.add_argument('--root', default=os.path.dirname(os.path.abspath(__file__)))
+    parser.add_argument('--out', default=None, help='store directory (default: <root>/.round_store)')
+    args = parser.parse_args()
+
+    source = LocalDataSource(args.root)
+    store_dir = args.out or os.path.join(args.root, '.round_store')
+    catalog = load_catalog(source)
+    year = args.year or catalog.current_year
+    round_paths = [catalog.round_path(year, n) for n in args.rounds] or catalog.round_paths(year)
+    for round_path in round_paths:
+        start = time.perf_counter()
+        round_dir = compile_round(source, round_path, store_dir)
+        print(f'{round_path}: {round_dir} ({time.perf_counter() - start:.2f}s)')
+
+
+if __name__ == '__main__':
+    main()
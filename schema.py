@@ -0,0 +1,155 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+# Compact in-memory types for the frames the page keeps in its caches: the
+# averages tables, the previous H2H games, the players workbook and every
+# player's season. Repeated strings (player names, rounds, opponents, results)
+# become categoricals whose categories come from one shared dictionary per
+# domain, so a name is stored once per process however many frames hold it,
+# and whole-number columns are stored in the narrowest integer type that fits.
+#
+#   compact(df)          typed copy of a loaded frame
+#   for_display(df)      drops the shared categories a small frame doesn't use
+#                        before it is sent to the browser
+#   frames_nbytes(...)   memory of a set of frames, counting shared dictionaries once
+
+# Columns that share one dictionary, by domain
+CATEGORY_DOMAINS = {
+    'Player': 'player',
+    'Player Name': 'player',
+    'Team': 'team',
+    'Opponent': 'opponent',
+    'Round': 'round',
+    'DisplayRound': 'round',
+    'Result': 'result',
+    'name_url': 'name_url',
+}
+
+_INTEGER_TYPES = (np.int8, np.int16, np.int32)
+
+
+class CategoryRegistry:
+    # One CategoricalDtype per domain. New values extend the domain's categories (existing codes stay
+    # valid), and frames typed after that pick up the extended dtype.
+    def __init__(self):
+        self._dtypes = {}
+        self._lock = threading.Lock()
+
+    def dtype(self, domain, values):
+        with self._lock:
+            dtype = self._dtypes.get(domain)
+            known = dtype.categories if dtype is not None else pd.Index([], dtype=object)
+            new_values = pd.Index(pd.unique(values)).dropna().difference(known, sort=False)
+            if dtype is None or len(new_values):
+                try:
+                    new_values = new_values.sort_values()
+                except TypeError:
+                    pass
+                dtype = pd.CategoricalDtype(known.append(new_values))
+                self._dtypes[domain] = dtype
+            return dtype
+
+    def encode(self, domain, values):
+        # values as a Categorical of the domain's dtype. Lookups go through the categories' own hash
+        # table, which pandas builds once per Index rather than once per conversion.
+        dtype = self._dtypes.get(domain)
+        if dtype is not None:
+            codes = dtype.categories.get_indexer(values)
+            if not ((codes == -1) & pd.notna(values)).any():
+                return pd.Categorical.from_codes(codes, dtype=dtype)
+        dtype = self.dtype(domain, values)
+        return pd.Categorical.from_codes(dtype.categories.get_indexer(values), dtype=dtype)
+
+    def stats(self):
+        with self._lock:
+            return {domain: len(dtype.categories) for domain, dtype in self._dtypes.items()}
+
+
+registry = CategoryRegistry()
+
+
+def _narrow_int_type(values):
+    # The narrowest integer type that holds values, or None to leave them as they are
+    if values.dtype.kind not in 'iu' or not len(values):
+        return None
+    low, high = values.min(), values.max()
+    for integer_type in _INTEGER_TYPES:
+        info = np.iinfo(integer_type)
+        if info.min <= low and high <= info.max:
+            return integer_type if values.dtype != integer_type else None
+    return None
+
+
+def compact(df, categories=registry):
+    # Same values, smaller types; columns the schema doesn't know are left alone
+    columns = {}
+    for column, dtype in df.dtypes.items():
+        values = df[column].to_numpy()
+        domain = CATEGORY_DOMAINS.get(column)
+        if domain is not None and isinstance(dtype, pd.CategoricalDtype):
+            # Already categorical (e.g. from an Arrow dictionary), but with a dictionary of its own
+            columns[column] = categories.encode(domain, np.asarray(values, dtype=object))
+        elif domain is not None and dtype == object:
+            columns[column] = categories.encode(domain, values)
+        else:
+            integer_type = _narrow_int_type(values)
+            columns[column] = df[column].to_numpy(copy=True) if integer_type is None else values.astype(integer_type)
+    return pd.DataFrame(columns, index=df.index.copy(), columns=df.columns)
+
+
+def compact_dict(frames, categories=registry):
+    return {name: compact(df, categories) for name, df in frames.items()}
+
+
+def for_display(df):
+    # Arrow serialises a categorical's whole dictionary, so a 25-row table would ship every player's name
+    categorical = [column for column in df.columns if isinstance(df[column].dtype, pd.CategoricalDtype)]
+    if not categorical:
+        return df
+    df = df.copy()
+    for column in categorical:
+        df[column] = df[column].cat.remove_unused_categories()
+    return df
+
+
+def _frames(value):
+    if isinstance(value, pd.DataFrame):
+        yield value
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _frames(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _frames(item)
+
+
+def frame_nbytes(df, seen_categories=None):
+    # DataFrame.memory_usage(deep=True) charges every frame for the whole of a shared dictionary.
+    # Here a categorical column costs its codes, plus its categories the first time they are seen
+    # when seen_categories is given (and never otherwise: they belong to the process, not the frame).
+    total = df.index.memory_usage(deep=True)
+    for column in df.columns:
+        series = df[column]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            total += series.cat.codes.nbytes
+            categories = series.cat.categories
+            if seen_categories is not None and id(categories) not in seen_categories:
+                seen_categories.add(id(categories))
+                total += categories.memory_usage(deep=True)
+        else:
+            total += series.memory_usage(index=False, deep=True)
+    return int(total)
+
+
+def frames_nbytes(*values):
+    # Bytes held by every DataFrame in values (frames, dicts or lists of frames), each frame and each
+    # shared dictionary counted once
+    seen_frames, seen_categories = set(), set()
+    total = 0
+    for df in (df for value in values for df in _frames(value)):
+        if id(df) not in seen_frames:
+            seen_frames.add(id(df))
+            total += frame_nbytes(df, seen_categories)
+    return total
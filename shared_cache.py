@@ -0,0 +1,233 @@
+import os
+import glob
+import time
+import pickle
+import hashlib
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:
+    # No flock on Windows: replicas may then load the same entry twice, which is only wasted work
+    fcntl = None
+
+from data_source import write_atomic
+
+# Disk tier shared by every server process that points at the same directory
+# (several replicas on one volume, or one replica across restarts), sitting under
+# the in-process ContentCache. Entries are pickled loader results keyed like the
+# ContentCache, on (namespace, path, content version), so a new round's files
+# get new entries and replace the old versions of the same path. Writes are
+# atomic renames, and a per-entry flock makes concurrent misses across processes
+# load once. Least recently used entries are evicted past the size budget, and
+# entries expire after a TTL. Every process adds its writes to a shared size
+# ledger, so a write only scans the directory once the budget is used up (or
+# every RESCAN_PUTS writes, to correct drift from crashed writers).
+#
+#   <root>/v2/<namespace>/<hash(path)>/<hash(version)>.pkl   the entry
+#   <root>/v2/<namespace>/<hash(path)>/<hash(version)>.lock  its load lock
+#   <root>/v2/ledger                                        bytes of entries on disk
+#   <root>/v2/ledger.lock                                   its lock, also held while evicting
+#
+# Only point it at a directory this app's processes own: entries are unpickled.
+
+# Bump when the entry layout changes; old entries are then ignored and aged out
+CACHE_FORMAT = 2
+RESCAN_PUTS = 1000
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode('utf-8')).hexdigest()[:20]
+
+
+class DiskCache:
+    def __init__(self, root, max_bytes=2 * 2 ** 30, ttl=24 * 3600, namespace_ttls=None):
+        self.root = os.path.join(os.path.abspath(root), f'v{CACHE_FORMAT}')
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.namespace_ttls = dict(namespace_ttls or {})
+        self.hits = Counter()
+        self.misses = Counter()
+        self.writes = Counter()
+        self.evictions = 0
+        self.errors = 0
+        self._puts = 0
+        self._lock = threading.Lock()
+        self._ledger_path = os.path.join(self.root, 'ledger')
+        os.makedirs(self.root, exist_ok=True)
+
+    def _entry_path(self, namespace, path, version):
+        # One folder per path, so superseding old versions lists only that path's entries
+        return os.path.join(self.root, namespace, _digest(path), f'{_digest(version)}.pkl')
+
+    def _read(self, namespace, path, version):
+        entry_path = self._entry_path(namespace, path, version)
+        try:
+            written = os.stat(entry_path).st_mtime
+            if time.time() - written > self.namespace_ttls.get(namespace, self.ttl):
+                return False, None
+            with open(entry_path, 'rb') as f:
+                key, value = pickle.load(f)
+        except FileNotFoundError:
+            return False, None
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ImportError, ValueError):
+            # Half-written by a crashed process or from an older code version: treat as a miss
+            with self._lock:
+                self.errors += 1
+            return False, None
+        if key != (namespace, path, version):
+            return False, None
+        try:
+            # atime marks the last use for eviction; mtime stays the write time for the TTL
+            os.utime(entry_path, (time.time(), written))
+        except OSError:
+            pass
+        return True, value
+
+    @contextmanager
+    def _load_lock(self, namespace, path, version):
+        lock_path = self._entry_path(namespace, path, version)[:-len('.pkl')] + '.lock'
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with open(lock_path, 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @contextmanager
+    def _ledger_lock(self):
+        # flock is per open file, so this excludes other threads as well as other processes
+        with open(self._ledger_path + '.lock', 'a') as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write_ledger(self, total):
+        write_atomic(self._ledger_path, str(max(total, 0)).encode('ascii'))
+
+    def _adjust(self, delta):
+        # Adds delta to the ledger and returns the new total; a missing or unreadable ledger is rebuilt by a scan
+        with self._ledger_lock():
+            try:
+                with open(self._ledger_path) as f:
+                    total = int(f.read()) + delta
+            except (OSError, ValueError):
+                total = sum(size for _, size, _ in self._entries())
+            self._write_ledger(total)
+        return total
+
+    def get(self, namespace, path, version):
+        found, value = self._read(namespace, path, version)
+        with self._lock:
+            (self.hits if found else self.misses)[namespace] += 1
+        return found, value
+
+    def put(self, namespace, path, version, value):
+        entry_path = self._entry_path(namespace, path, version)
+        try:
+            payload = pickle.dumps(((namespace, path, version), value), protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            with self._lock:
+                self.errors += 1
+            return False
+        # Older versions of the same path are superseded, and so is this version's previous write
+        stale_paths = glob.glob(os.path.join(os.path.dirname(entry_path), '*.pkl'))
+        removed = sum(self._remove(stale_path) for stale_path in stale_paths if stale_path != entry_path)
+        try:
+            removed += os.stat(entry_path).st_size
+        except OSError:
+            pass
+        write_atomic(entry_path, payload)
+        with self._lock:
+            self.writes[namespace] += 1
+            self._puts += 1
+            rescan = self._puts % RESCAN_PUTS == 0
+        if self._adjust(len(payload) - removed) > self.max_bytes or rescan:
+            self.evict()
+        return True
+
+    def get_or_load(self, namespace, path, version, loader):
+        found, value = self._read(namespace, path, version)
+        if not found:
+            with self._load_lock(namespace, path, version):
+                # Another process may have loaded it while we waited for the lock
+                found, value = self._read(namespace, path, version)
+                if not found:
+                    value = loader()
+                    self.put(namespace, path, version, value)
+        with self._lock:
+            (self.hits if found else self.misses)[namespace] += 1
+        return value
+
+    def _entries(self):
+        entries = []
+        for entry_path in glob.glob(os.path.join(self.root, '*', '*', '*.pkl')):
+            try:
+                stat = os.stat(entry_path)
+            except OSError:
+                continue
+            entries.append((stat.st_atime, stat.st_size, entry_path))
+        return entries
+
+    def _remove(self, entry_path):
+        # Bytes of the entry removed (0 if another process got there first)
+        try:
+            size = os.stat(entry_path).st_size
+        except OSError:
+            size = 0
+        for file_path in (entry_path, entry_path[:-len('.pkl')] + '.lock'):
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+        return size
+
+    def evict(self):
+        # Drops least recently used entries until the tier is back under 90% of its budget. Scans the
+        # whole directory, so the ledger is reset to what is really on disk.
+        with self._ledger_lock():
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            evicted = 0
+            if total > self.max_bytes:
+                for _, size, entry_path in sorted(entries):
+                    if total <= self.max_bytes * 0.9:
+                        break
+                    self._remove(entry_path)
+                    total -= size
+                    evicted += 1
+            self._write_ledger(total)
+        with self._lock:
+            self.evictions += evicted
+        return evicted
+
+    def clear(self, namespace=None):
+        with self._ledger_lock():
+            for entry_path in glob.glob(os.path.join(self.root, namespace or '*', '*', '*.pkl')):
+                self._remove(entry_path)
+            self._write_ledger(sum(size for _, size, _ in self._entries()))
+
+    def stats(self):
+        # This process's hits/misses/writes, plus what is on disk for every process
+        entries = self._entries()
+        with self._lock:
+            namespaces = sorted(set(self.hits) | set(self.misses) | set(self.writes))
+            return {
+                'root': self.root,
+                'entries': len(entries),
+                'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'errors': self.errors,
+                'loaders': {namespace: {'hits': self.hits[namespace], 'misses': self.misses[namespace],
+                                        'writes': self.writes[namespace]} for namespace in namespaces},
+            }
@@ -1,923 +1,834 @@
 import streamlit as st
 import pandas as pd
-from PIL import Image
-from datetime import datetime
-import matplotlib as plt
-from github import Github
-import io
 from io import BytesIO
-import requests
 import os
 from dotenv import load_dotenv
-import altair as alt
-import base64
 import json
-
-CURRENT_YEAR = 2024
+import time
+from functools import partial
+from data_source import make_data_source
+from http_client import GITHUB_API, FetchClient, RateLimited, UpstreamError
+from round_store import ensure_round_store
+from cache import ContentCache, folder_version, file_version, path_version
+from shared_cache import DiskCache
+from player_index import PlayerIndex, prepare_season_df
+from player_registry import ALIASES_FILE, PlayerRegistry, read_aliases, registry_version
+from fixture_index import ensure_fixture_index
+from game_log import GameLog
+from archive import CATALOG_FILE, CURRENT_ROUND_FILE, Catalog
+from schema import compact, compact_dict, for_display, registry
+from csv_schema import read_csv
+from prefetch import Prefetcher
+from tree_sync import TreeSync
+from profiling import stage
+from metrics import (metrics, MeteredSource, content_cache_samples, fetch_client_samples, category_samples,
+                     start_http_server)
+from styling import content_hash, apply_css
+from charts import season_specs, previous_specs
+from h2h import build_history, H2HEngine
+from prerender import (WINDOWS, styled_columns, dummy_columns, averages_css, table_css,
+                       season_table, previous_games, previous_table, results_versions, season_index_paths,
+                       page_inputs, averages_key, season_key, season_chart_key, previous_key, current_version,
+                       load_match, decode_artifact)
+from rolling import RollingAverages, window_size
+from thresholds import GameMatrix, parse_thresholds
+
+CUSTOM_WINDOW = "Last N Average"
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
 
 # HIDE ACCESS KEY
 load_dotenv()
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
-g = Github(st.secrets.clientid.clientid, st.secrets.clientsecret.clientsecret)
-# g = Github(GITHUB_TOKEN)
-
 GITHUB_TOKEN2 = os.getenv('GITHUB_TOKEN2')
-g2 = Github(st.secrets.privaterepo.privaterepo)
-# g2 = Github(GITHUB_TOKEN2)
+
+# Where round data is read from: 'local' (this checkout), 'github' or 'mirror'
+DATA_SOURCE = os.getenv('AFL_DATA_SOURCE', 'local')
+# The player stats repo isn't checked out next to the app, so it defaults to GitHub
+PRIVATE_DATA_SOURCE = os.getenv('AFL_PRIVATE_DATA_SOURCE', 'github')
+# REST API root for the GitHub sources (overridable to point at a stand-in server)
+GITHUB_API_URL = os.getenv('AFL_GITHUB_API', GITHUB_API)
+MIRROR_DIR = os.getenv('AFL_MIRROR_DIR', os.path.join(APP_DIR, '.mirror'))
+# With the mirror source, how often to re-sync it from one recursive git tree (see tree_sync.py); 0 turns it off
+MIRROR_SYNC_TTL = int(os.getenv('AFL_MIRROR_SYNC_TTL', '900'))
+# Compiled Arrow copy of each round (see round_store.py); set AFL_USE_ROUND_STORE=0 to parse the CSVs directly
+USE_ROUND_STORE = os.getenv('AFL_USE_ROUND_STORE', '1') == '1'
+ROUND_STORE_DIR = os.getenv('AFL_ROUND_STORE_DIR', os.path.join(APP_DIR, '.round_store'))
+# Shared loader cache: memory budget, entry TTL and how long a folder listing is trusted
+CACHE_MAX_MB = int(os.getenv('AFL_CACHE_MAX_MB', '512'))
+CACHE_TTL = int(os.getenv('AFL_CACHE_TTL', '3600'))
+LISTING_TTL = int(os.getenv('AFL_LISTING_TTL', '60'))
+# Disk tier shared by every replica/restart that mounts the same directory (see shared_cache.py); off when unset
+SHARED_CACHE_DIR = os.getenv('AFL_SHARED_CACHE_DIR')
+SHARED_CACHE_MAX_MB = int(os.getenv('AFL_SHARED_CACHE_MAX_MB', '2048'))
+# Loader results that are worth sharing: everything that costs GitHub requests to rebuild
+SHARED_NAMESPACES = ('listing', 'get_players_df', 'load_csv_data', 'load_player_H2H_data', 'load_player_season',
+                     'h2h_engine', 'load_game_log')
+# Season table built by `python player_index.py`; without it each player's CSV is fetched on demand. Set, it is
+# the current season's; every season defaults to .player_index/season_<year>.arrow next to the app.
+PLAYER_INDEX_PATH = os.getenv('AFL_PLAYER_INDEX')
+# Compiled copy of the fixture workbook, rebuilt whenever the workbook changes; as with AFL_PLAYER_INDEX, set it is
+# the current season's
+FIXTURE_INDEX_PATH = os.getenv('AFL_FIXTURE_INDEX')
+PREFETCH_WORKERS = int(os.getenv('AFL_PREFETCH_WORKERS', '8'))
+# Serve the averages tables from the player index's game logs (see rolling.py) instead of the Average CSVs
+ROLLING_AVERAGES = os.getenv('AFL_ROLLING_AVERAGES', '1') == '1'
+# Match pages built ahead of time by `python prerender.py`; matches without a current artifact are computed live
+PRERENDER_DIR = os.getenv('AFL_PRERENDER_DIR', os.path.join(APP_DIR, '.prerender'))
+# Serve the metrics in Prometheus text format on this port at /metrics (see metrics.py); off when 0
+METRICS_PORT = int(os.getenv('AFL_METRICS_PORT', '0'))
 
 
 st.set_page_config(page_title="Unseen Stats",
                    page_icon="🔮",
                    layout='wide')
 
+# Paint the page shell straight away, before any data source is opened. The logo ships with the app,
+# and st.image decodes it in the browser.
+st.header("New version out! Head to: https://unseenstats.io")
+st.sidebar.image(os.path.join(APP_DIR, 'Logo.png'), use_column_width=True)
+
+
+# One pooled, revalidating HTTP client per repo (see http_client.py), only built when a data source needs GitHub
+@st.cache_resource
+def open_github_client():
+    # return FetchClient(GITHUB_API_URL, token=GITHUB_TOKEN)
+    return FetchClient(GITHUB_API_URL, auth=(st.secrets.clientid.clientid, st.secrets.clientsecret.clientsecret))
+
+@st.cache_resource
+def open_private_github_client():
+    # return FetchClient(GITHUB_API_URL, token=GITHUB_TOKEN2)
+    return FetchClient(GITHUB_API_URL, token=st.secrets.privaterepo.privaterepo)
+
 
 @st.cache_resource
-def open_repo():
-    repo = g.get_repo('hermclane/AFL')
-    return repo
+def open_data_source():
+    client = open_github_client() if DATA_SOURCE != 'local' else None
+    return make_data_source(DATA_SOURCE, root=APP_DIR, client=client, full_name='hermclane/AFL',
+                            mirror_root=os.path.join(MIRROR_DIR, 'AFL'))
 
 @st.cache_resource
-def open_private_repo():
-    private_repo = g2.get_repo('hermclane/AFLPlayerStatsRepo')
-    return private_repo
+def open_private_data_source():
+    client = open_private_github_client() if PRIVATE_DATA_SOURCE != 'local' else None
+    return make_data_source(PRIVATE_DATA_SOURCE, root=os.getenv('AFL_PRIVATE_DATA_DIR'), client=client,
+                            full_name='hermclane/AFLPlayerStatsRepo',
+                            mirror_root=os.path.join(MIRROR_DIR, 'AFLPlayerStatsRepo'))
+
+
+@st.cache_resource
+def open_content_cache():
+    namespace_ttls = {'listing': LISTING_TTL}
+    shared = None
+    if SHARED_CACHE_DIR:
+        shared = DiskCache(SHARED_CACHE_DIR, max_bytes=SHARED_CACHE_MAX_MB * 2 ** 20, ttl=CACHE_TTL,
+                           namespace_ttls=namespace_ttls)
+    return ContentCache(max_bytes=CACHE_MAX_MB * 2 ** 20, ttl=CACHE_TTL, namespace_ttls=namespace_ttls,
+                        shared=shared, shared_namespaces=SHARED_NAMESPACES)
+
 
+@st.cache_resource
+def open_prefetcher():
+    return Prefetcher(max_workers=PREFETCH_WORKERS)
+
+
+# One per season, built the first time the season is viewed
+@st.cache_resource
+def open_rolling_averages(year):
+    return RollingAverages()
 
-repo = open_repo()
-private_repo = open_private_repo()
 
-@st.cache_data
-def get_current_round_from_github():
-    response = requests.get(r"https://raw.githubusercontent.com/hermclane/AFL/main/current_round.json")
-    response.raise_for_status()
-    data = response.json()
+@st.cache_resource
+def open_metrics_server(port):
+    return start_http_server(port)
+
+
+# Brings the mirror up to the branch head: root files and the current round, fetching only changed blobs
+@st.cache_resource(ttl=MIRROR_SYNC_TTL or None)
+def sync_mirror(_source):
+    return TreeSync(_source).sync_current_round()
+
+
+rerun_started = time.perf_counter()
+source = open_data_source()
+if DATA_SOURCE == 'mirror' and MIRROR_SYNC_TTL > 0:
+    with stage('folder listing'):
+        sync_mirror(source)
+# Every listing and file read is counted and timed from here on (see metrics.py); these views are new on
+# every rerun, so their calls() are this rerun's alone
+source = MeteredSource(source, 'AFL')
+private_source = MeteredSource(open_private_data_source(), 'AFLPlayerStatsRepo')
+content_cache = open_content_cache()
+prefetcher = open_prefetcher()
+
+# The components keep their own counters; they are read whenever the metrics are
+metrics.add_collector('content_cache', partial(content_cache_samples, content_cache))
+metrics.add_collector('categories', partial(category_samples, registry))
+if DATA_SOURCE != 'local':
+    metrics.add_collector('github:AFL', partial(fetch_client_samples, open_github_client(), 'hermclane/AFL'))
+if PRIVATE_DATA_SOURCE != 'local':
+    metrics.add_collector('github:AFLPlayerStatsRepo', partial(fetch_client_samples, open_private_github_client(),
+                                                               'hermclane/AFLPlayerStatsRepo'))
+if METRICS_PORT:
+    open_metrics_server(METRICS_PORT)
+
+
+def summary_frame(name, label, scale=1000, unit='ms'):
+    # One row per label value of a histogram: count, total, mean and the bucket bounds of p50/p95/p99
+    rows = []
+    for labels, summary in sorted(metrics.histogram_summary(name).items()):
+        row = {label: ', '.join(str(value) for _, value in labels), 'count': summary['count'],
+               'total': round(summary['sum'], 3), f'mean {unit}': round(scale * summary['sum'] / summary['count'], 1)}
+        row.update((f'{quantile} ≤ {unit}', scale * summary[quantile]) for quantile in ('p50', 'p95', 'p99'))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def render_diagnostics():
+    st.title("Diagnostics")
+    st.caption(f"Process up {(time.time() - metrics.started_at) / 60:.0f} min")
+
+    st.subheader("Page stages")
+    st.dataframe(pd.concat([summary_frame('afl_rerun_seconds', 'stage').assign(stage='whole rerun'),
+                            summary_frame('afl_stage_seconds', 'stage')]), hide_index=True, use_container_width=True)
+
+    st.subheader("Loaders")
+    loaders_df = pd.DataFrame([{'loader': namespace, 'hits': counts['hits'], 'misses': counts['misses']}
+                               for namespace, counts in content_cache.stats()['loaders'].items()],
+                              columns=['loader', 'hits', 'misses'])
+    loaders_df['hit ratio'] = (loaders_df['hits'] / (loaders_df['hits'] + loaders_df['misses'])).round(3)
+    loader_times_df = summary_frame('afl_loader_seconds', 'loader')
+    if not loader_times_df.empty:
+        loaders_df = loaders_df.merge(loader_times_df.drop(columns=['count']), on='loader', how='left')
+    st.dataframe(loaders_df, hide_index=True, use_container_width=True)
+
+    st.subheader("Upstream")
+    st.dataframe(summary_frame('afl_rerun_upstream_requests', 'source calls per rerun', scale=1, unit='calls'),
+                 hide_index=True, use_container_width=True)
+    st.dataframe(pd.DataFrame([dict(labels, metric=name, value=value) for name, _, _, labels, value in metrics.samples()
+                               if name.startswith(('afl_source_', 'afl_github_'))]),
+                 hide_index=True, use_container_width=True)
+
+    st.subheader("Prefetch")
+    st.dataframe(summary_frame('afl_prefetch_seconds', 'prefetch').assign(prefetch='whole match'), hide_index=True,
+                 use_container_width=True)
+    # Prefetches are keyed on (match folder, folder version)
+    st.dataframe(pd.DataFrame([dict(report.as_dict(), key=report.key[0]) for report in prefetcher.reports()],
+                              columns=['key', 'tasks', 'failed', 'listings', 'files', 'bytes', 'seconds', 'error']),
+                 hide_index=True, use_container_width=True)
+
+    st.subheader("Prometheus")
+    prometheus_text = metrics.render_prometheus()
+    st.download_button("Download metrics", prometheus_text, file_name='metrics.prom', mime='text/plain')
+    st.code(prometheus_text, language=None)
+
+
+# Hidden diagnostics view: open the app with ?diagnostics
+if 'diagnostics' in st.query_params:
+    render_diagnostics()
+    st.stop()
+
+
+def list_folder(_source, path):
+    # Listings carry the SHAs every other cache key is built from, so they are only trusted for LISTING_TTL
+    return content_cache.get_or_load('listing', f"{_source.describe()}:{path}", None, lambda: _source.list_dir(path))
+
+
+with stage('folder listing'):
+    root_contents = list_folder(source, "")
+
+@content_cache.memoize
+def get_current_round_from_github(_source, path):
+    data = json.loads(_source.read_bytes(path))
     return data.get('CURRENT_ROUND')
 
 
-CURRENT_ROUND = get_current_round_from_github()
+@content_cache.memoize
+def load_catalog_file(_source, path):
+    return Catalog.from_bytes(_source.read_bytes(path))
+
+
+# Which seasons and rounds exist and where their files are (see archive.py); a checkout without a catalog is
+# the flat layout, one season of Round_N folders
+def get_catalog(_source):
+    catalog_version = file_version(root_contents, CATALOG_FILE)
+    if catalog_version is not None:
+        return load_catalog_file(_source, CATALOG_FILE, catalog_version)
+    current_round = get_current_round_from_github(_source, CURRENT_ROUND_FILE,
+                                                  file_version(root_contents, CURRENT_ROUND_FILE))
+    return content_cache.get_or_load('catalog', _source.describe(), (folder_version(root_contents), current_round),
+                                     lambda: Catalog.from_flat(root_contents, current_round))
+
+
+with stage('fixture load'):
+    catalog = get_catalog(source)
 
-@st.cache_data
-def read_fixture():
-    # load fixture data once
-    fixture_df = pd.read_excel(r"https://raw.githubusercontent.com/hermclane/AFL/main/AFLFixtures2024.xlsx")
-    return fixture_df
+# The current season unless another is picked; nothing of an older season is listed or read until then
+season_years = catalog.years()
+selected_year = catalog.current_year
+if len(season_years) > 1:
+    selected_year = st.sidebar.selectbox("Season", season_years, index=season_years.index(catalog.current_year))
+season = catalog.season(selected_year)
+if selected_year == catalog.current_year:
+    CURRENT_ROUND = catalog.current_round
+else:
+    round_numbers = list(season.rounds)
+    CURRENT_ROUND = st.sidebar.selectbox("Round", round_numbers, index=len(round_numbers) - 1)
+FIXTURE_INDEX, SEASON_INDEX = season_index_paths(season, catalog.current_year, FIXTURE_INDEX_PATH, PLAYER_INDEX_PATH)
+
+
+def get_fixture_index(_source, path):
+    # Compiled once per version of the workbook (see fixture_index.py); later processes just load the Arrow file
+    version = path_version(lambda folder: list_folder(_source, folder), path)
+    return content_cache.get_or_load('fixture_index', f"{_source.describe()}:{path}", version,
+                                     lambda: ensure_fixture_index(_source, path, FIXTURE_INDEX, version))
 
 # Make Dataframes
-fixture_df = read_fixture()
-current_round_fixture_df = fixture_df[fixture_df["Round Number"] == CURRENT_ROUND]
+with stage('fixture load'):
+    fixture_index = get_fixture_index(source, season.fixture)
+    current_round_matches = fixture_index.round_matches(CURRENT_ROUND)
 
-# Get the list of match strings from the "Match String" column of the current_round_fixture_df DataFrame
-match_list = current_round_fixture_df["Match String"].tolist()
+    # Get the list of match strings for the current round
+    match_list = [match.match_string for match in current_round_matches]
 
-parent_folder_path = f"Round_{CURRENT_ROUND}"
+parent_folder_path = catalog.round_path(season.year, CURRENT_ROUND)
 
 #Load Current Round Folder Contents
-@st.cache_data
-def get_parent_folder_contents():
-    # load parent folder contents once
-    parent_folder_contents = repo.get_contents(parent_folder_path)
+def get_parent_folder_contents(parent_folder_path):
+    parent_folder_contents = list_folder(source, parent_folder_path)
     return parent_folder_contents
 
-parent_folder_contents = get_parent_folder_contents()
+with stage('folder listing'):
+    parent_folder_contents = get_parent_folder_contents(parent_folder_path)
 
 folder_list = [content.name for content in parent_folder_contents if content.type == 'dir']
 
 sorted_folder_list = [folder_name for match_str in match_list for folder_name in folder_list if match_str in folder_name]
 
-@st.cache_data
 def get_private_repo_contents():
-    private_repo_contents = private_repo.get_contents("")
+    private_repo_contents = list_folder(private_source, "")
     return private_repo_contents
 
-private_repo_contents = get_private_repo_contents()
+with stage('folder listing'):
+    private_repo_contents = get_private_repo_contents()
 
 private_folder_list = [content.name for content in private_repo_contents if content.type == 'dir']
 
-@st.cache_data
-def get_players_df():
-    for file in private_repo.get_contents(""):
-        if file.name == 'AFLPlayers2024.xlsx':
-            excel_data = BytesIO(base64.b64decode(file.content))
-            players_df = pd.read_excel(excel_data, engine='openpyxl')
-            return players_df
-
-players_df = get_players_df()
-
-@st.cache_data
-def get_previous_H2H_games(_repo, parent_folder_path):
-    previous_H2H_csv = None
-    for file in repo.get_contents(parent_folder_path):
-        if file.name.endswith('H2H Results.csv'):
-            file_content = file.decoded_content
-            previous_H2H_csv = pd.read_csv(BytesIO(file_content))
-            break
-    return previous_H2H_csv
-
-previous_H2H_csv = get_previous_H2H_games(repo, parent_folder_path)
-
-# Parse and format Last H2H Encounter results
-def parse_team_H2H_data(team, previous_H2H_csv, is_home_team):
-    mapping_dic = {"Win": "✔️", "Draw": "➖", "Lose": "❌"}
-    if is_home_team:
-        current_team_H2H = previous_H2H_csv[previous_H2H_csv["Home Team"] == team]
-        current_team_H2H_results_list = current_team_H2H["Home Team Outcome"].to_list()
-        current_team_H2H_results_list = [mapping_dic[result] for result in current_team_H2H_results_list]
-    if not is_home_team:
-        current_team_H2H = previous_H2H_csv[previous_H2H_csv["Away Team"] == team]
-        current_team_H2H_results_list = current_team_H2H["Away Team Outcome"].to_list()
-        current_team_H2H_results_list = [mapping_dic[result] for result in current_team_H2H_results_list]
-
-    current_team_H2H_results_string =''.join(current_team_H2H_results_list)
-
-    return current_team_H2H_results_string
-
-
-# Load Logo
-@st.cache_data
-def get_logo():
-    image_url = 'https://raw.githubusercontent.com/hermclane/AFL/main/Logo.png'
-    response = requests.get(image_url)
-    image = Image.open(BytesIO(response.content))
-    return image
-
-
-# Set Logo
-image = get_logo()
-st.sidebar.image(image, use_column_width=True)
+@content_cache.memoize
+@metrics.timed('afl_loader_seconds')
+def get_players_df(_source, path):
+    excel_data = BytesIO(_source.read_bytes(path))
+    players_df = pd.read_excel(excel_data, engine='openpyxl')
+    return compact(players_df)
 
-# Set the title of the sidebar
-st.sidebar.title(f'Current Round: {CURRENT_ROUND}')
+# Player name -> season file lookups (see player_registry.py), rebuilt when the workbook or the aliases change
+def get_player_registry():
+    players_version, aliases_version = registry_version(root_contents, private_repo_contents, season.players)
 
-# Create an empty dictionary to store the folder names and corresponding team string
-folder_team_dict = {}
+    def build():
+        if players_version is None:
+            # No workbook for this season in the player stats repo: nobody resolves, so no season file is read
+            players_df = pd.DataFrame(columns=['Player', 'Team', 'name_url'])
+        else:
+            players_df = get_players_df(private_source, season.players, players_version)
+        aliases_df = read_aliases(source.read_bytes(ALIASES_FILE)) if aliases_version is not None else None
+        return PlayerRegistry(players_df, aliases_df)
+    return content_cache.get_or_load('player_registry', season.players, (players_version, aliases_version), build)
 
-selected_folder_name = st.sidebar.radio('Select a game (Home Team vs Away Team):', sorted_folder_list)
-selected_folder_path = f"{parent_folder_path}/{selected_folder_name}"
+with stage('csv parse'):
+    player_registry = get_player_registry()
 
+# Every round's H2H Results.csv for the season, merged into one head-to-head history (see h2h.py)
+def get_h2h_results_versions(_source):
+    return results_versions(_source, catalog.round_paths(season.year), lambda path: list_folder(_source, path))
 
-@st.cache_data
-def get_selected_folder_contents():
-    # load chosen game contents once
-    selected_folder_contents = repo.get_contents(selected_folder_path)
-    return selected_folder_contents
 
+def get_h2h_engine(_source):
+    versions = get_h2h_results_versions(_source)
 
-selected_folder_contents = get_selected_folder_contents()
+    def build():
+        file_contents = prefetcher.read_many(_source, list(versions))
+        return H2HEngine(build_history([read_csv(data, 'h2h_results') for data in file_contents.values()]))
+    return content_cache.get_or_load('h2h_engine', f"{_source.describe()}:{season.year}", tuple(versions.items()),
+                                     build)
 
-csv_list = [file.name for file in selected_folder_contents if file.name.endswith('.csv')]
+with stage('csv parse'):
+    h2h_engine = get_h2h_engine(source)
 
-# Check if the folder name matches the "Folder url" column of the "current_round_fixture_df"
-matching_row = current_round_fixture_df[current_round_fixture_df["Match String"] == selected_folder_name]
-home_team = matching_row["Home Team"].iloc[0]
-away_team = matching_row["Away Team"].iloc[0]
-home_team_url = matching_row["Home Team url"].iloc[0]
-away_team_url = matching_row["Away Team url"].iloc[0]
 
-# Format and Set page Header
-# Create Date and time for header display
-game_datetime_np = current_round_fixture_df.loc[current_round_fixture_df['Match String'] == selected_folder_name, 'Date'].values[0]
-game_datetime_str = game_datetime_np.astype(str)
-game_datetime_obj = datetime.strptime(game_datetime_str[:-3], '%Y-%m-%dT%H:%M:%S.%f')
-game_day_time_str = game_datetime_obj.strftime('%A, %I:%M %p')
-# Get venue for header display
-location = current_round_fixture_df.loc[current_round_fixture_df['Match String'] == selected_folder_name, 'Location'].values[0]
-# Configure Game Header
-header_display = f'{selected_folder_name} - {location} - {game_day_time_str} AEST'
+# Every previous game once, when the repo publishes a game log (see game_log.py); the H2H tables are derived from it
+@content_cache.memoize
+def load_game_log(_source, path):
+    return GameLog.from_bytes(_source.read_bytes(path))
 
 
-# Define Colourmap
-colors = [(0, 0, 0, 0), "#488f31"]
-# Create the colourmap
-cmap = plt.colors.LinearSegmentedColormap.from_list("custom_cmap", colors)
+game_log_version = None
+if season.game_log is not None:
+    game_log_version = path_version(lambda folder: list_folder(source, folder), season.game_log)
+with stage('csv parse'):
+    game_log = load_game_log(source, season.game_log, game_log_version) if game_log_version is not None else None
 
 
-# Load Game Averages CSV Data
-@st.cache_data
-def load_csv_data(_repo, selected_folder_path):
-    csv_dict = {}
-    for file in repo.get_contents(selected_folder_path):
-        if file.name.endswith('Average.csv'):
-            df = pd.read_csv(io.StringIO(file.decoded_content.decode('utf-8')))
-            csv_dict[file.name.replace('.csv', '')] = df
-    return csv_dict
-
-# Load CSV data into a dictionary
-csv_dict = load_csv_data(repo, selected_folder_path)
+# Set the title of the sidebar
+if selected_year == catalog.current_year:
+    st.sidebar.title(f'Current Round: {CURRENT_ROUND}')
+else:
+    st.sidebar.title(f'{selected_year} Round {CURRENT_ROUND}')
 
+# Create an empty dictionary to store the folder names and corresponding team string
+folder_team_dict = {}
 
-# Read all H2H Games CSV Data
-@st.cache_data
-def load_player_H2H_data(_repo, selected_folder_path):
-    csv_dict_H2H = {}  # Dictionary to store each DataFrame
+selected_folder_name = st.sidebar.radio('Select a game (Home Team vs Away Team):', sorted_folder_list)
+selected_folder_path = f"{parent_folder_path}/{selected_folder_name}"
 
-    for file in repo.get_contents(selected_folder_path):
-        if file.name.endswith('H2H Games.csv'):
-            file_content = file.decoded_content
-            df = pd.read_csv(BytesIO(file_content), parse_dates=['Date'], dayfirst=True)
 
-            # Remove '.csv' from filename for the dictionary key
-            dict_key = file.name.replace(' H2H Games.csv', '')  # Adjusted to use file.name
-            csv_dict_H2H[dict_key] = df
+def get_selected_folder_contents(selected_folder_path):
+    # keyed on the chosen game's path, so each game gets its own listing
+    selected_folder_contents = list_folder(source, selected_folder_path)
+    return selected_folder_contents
 
-    return csv_dict_H2H
 
+with stage('folder listing'):
+    selected_folder_contents = get_selected_folder_contents(selected_folder_path)
+    selected_folder_version = folder_version(selected_folder_contents)
+    # The H2H tables are derived from the game log when there is one, so they change with it too
+    h2h_games_version = (selected_folder_version, game_log_version)
 
-csv_dict_H2H = load_player_H2H_data(repo, selected_folder_path)
+csv_list = [file.name for file in selected_folder_contents if file.name.endswith('.csv')]
 
-styled_columns = ["Player","Total Games Played", "Highest Dis.", "Lowest Dis.", "Disposals", "Goals", "Behinds",
-                  "Frees For", "15 Dis. %", "20 Dis. %", "25 Dis. %", "1 Goal %", "2 Goals %"]
+# Everything the match header needs was worked out when the fixture was compiled
+selected_match = fixture_index.match(CURRENT_ROUND, selected_folder_name)
+home_team = selected_match.home_team
+away_team = selected_match.away_team
+home_team_url = selected_match.home_team_url
+away_team_url = selected_match.away_team_url
 
-drop_columns_2024 = ["Team", "Home/Away", "M", "T", "K", "HB", "HO", "GA", "I50", "CL", "CG", "R50", "FF", "FA", "AF", "SC"]
+# Format and Set page Header
+game_day_time_str = selected_match.day_time
+# Get venue for header display
+location = selected_match.location
+# Configure Game Header
+header_display = selected_match.header
 
-# Exclude for colour map
-exclude_columns_cmap = ['Round', 'Opponent', 'Result', 'Player Name', "Date", "DisplayRound"]
 
-# Columns that are required but need to be excluded from final display
-exclude_columns = ['DisplayRound', 'Date']
+@content_cache.memoize
+def open_round_store(_source, parent_folder_path):
+    # Compiles the round on first use, then every match is a filter over the memory-mapped store
+    return ensure_round_store(_source, parent_folder_path, ROUND_STORE_DIR)
 
-dummy_columns = ["Player Name", "Round", "Opponent", "Result", "D", "G", "B", "DisplayRound", "Date"]
 
-finals_round_mapping = {
-    'Elimination Final': 'EF',
-    "Preliminary Final": "PF",
-    "Preliminary Finals": "PF",
-    "Grand Final": "GF",
-    "Qualifying Final": "QF",
-    "Semi Finals": "SF",
-    "Semi Final": "SF"
-}
+def get_round_version(_source, parent_folder_path):
+    # Versioned on every match folder listing, so a change to any file in the round rebuilds the store
+    round_contents = list_folder(_source, parent_folder_path)
+    for entry in list(round_contents):
+        if entry.type == 'dir':
+            round_contents = round_contents + list_folder(_source, entry.path)
+    return folder_version(round_contents)
 
-# Generate round names for 0 to 24
-round_names = [str(i) for i in range(0, 25)]
-# Append special rounds
-special_rounds = ['EF', 'QF', 'PF', 'SF', 'GF']
-round_names.extend(special_rounds)
 
-# Display Header
-st.header("New version out! Head to: https://unseenstats.io")
+def get_round_store(_source, parent_folder_path):
+    return open_round_store(_source, parent_folder_path, get_round_version(_source, parent_folder_path))
 
-# Selectbox to choose Averages to display
-chosen_type = st.selectbox("Game Averages", ("Season Average", "Last 10 Average", "Last 5 Average", "Last 3 Average"))
 
-home_team_tab, away_team_tab = st.tabs([f'Home: {home_team}', f'Away: {away_team}'])
+# Load Game Averages CSV Data
+@content_cache.memoize
+@metrics.timed('afl_loader_seconds')
+def load_csv_data(_source, selected_folder_path):
+    if USE_ROUND_STORE:
+        round_path, match = selected_folder_path.rsplit('/', 1)
+        return compact_dict(get_round_store(_source, round_path).load_averages(match))
+    csv_dict = {}
+    paths = [file.path for file in list_folder(_source, selected_folder_path) if file.name.endswith('Average.csv')]
+    for path, file_content in prefetcher.read_many(_source, paths).items():
+        df = read_csv(file_content, 'average')
+        csv_dict[path.rsplit('/', 1)[-1].replace('.csv', '')] = df
+    return compact_dict(csv_dict)
 
-# Display each CSV file as a table
-for csv_name, csv_df in csv_dict.items():
-    if chosen_type in csv_name:
-        with home_team_tab:
-            if home_team in csv_name:
-                #Load Headers and H2H Data
-                parsed_H2H_Team_data_string = parse_team_H2H_data(home_team, previous_H2H_csv, True)
-                st.subheader(f"Previous H2H vs {away_team}: {parsed_H2H_Team_data_string}")
-                st.subheader(csv_name)
-                # Load Home Team DF
-                df = csv_df.sort_values(by=['Disposals'], ascending=False)
-
-                # Create columns for layout
-                col1, col2 = st.columns([1, 6])
-
-                # Sort player names alphabetically and create st.radio in the first column for player select
-                with col1:
-                    sorted_players_home = sorted(df['Player'].unique())
-                    selected_player_home = st.radio("Select a Player", sorted_players_home)
-                    selected_player_home_url = players_df.loc[players_df['Player'] == selected_player_home, 'name_url'].iloc[0]
 
-                current_player_home_chosen_average_df = df[df["Player"] == selected_player_home]
-                current_player_home_chosen_average_disposals = current_player_home_chosen_average_df["Disposals"].iloc[0]
-                current_player_home_chosen_average_goals = current_player_home_chosen_average_df["Goals"].iloc[0]
+# Read all H2H Games CSV Data
+@content_cache.memoize
+@metrics.timed('afl_loader_seconds')
+def load_player_H2H_data(_source, selected_folder_path):
+    round_path, match = selected_folder_path.rsplit('/', 1)
+    if game_log is not None:
+        csv_dict_H2H = game_log.match_games(round_path, match)
+        if csv_dict_H2H is not None:
+            return compact_dict(csv_dict_H2H)
+    if USE_ROUND_STORE:
+        return compact_dict(get_round_store(_source, round_path).load_h2h_games(match))
+    csv_dict_H2H = {}  # Dictionary to store each DataFrame
 
-                # Display the DataFrame in the second column
-                with col2:
-                    st.dataframe(df[styled_columns].style.format({"Disposals": "{:.2f}", "Goals": "{:.2f}",
-                                                                  "Behinds": "{:.2f}", "Frees For": "{:.2f}"})
-                                 .background_gradient(axis=0, cmap=cmap),use_container_width=True, height=900,
-                                 hide_index=True)
-
-                # -------------------- CURRENT SEASON DATA
-                st.title(f"{selected_player_home} Season {CURRENT_YEAR}")
-                current_player_home_file_path = f"{home_team_url}/{selected_player_home_url}.csv"
-
-                try:
-                    file_content = private_repo.get_contents(current_player_home_file_path)
-                    content_decoded = base64.b64decode(file_content.content)
-                    csv_data = BytesIO(content_decoded)
-                    current_player_home_2024_df = pd.read_csv(csv_data)
-                    # Your processing steps
-                    current_player_home_2024_df['Date'] = pd.to_datetime(current_player_home_2024_df['Date'],
-                                                                         dayfirst=True)
-                    current_player_home_2024_df = current_player_home_2024_df.drop(columns=drop_columns_2024)
-                    current_player_home_2024_df['DisplayRound'] = current_player_home_2024_df['Round'].apply(
-                        lambda x: finals_round_mapping.get(x, x))
-                    columns_to_display = [col for col in current_player_home_2024_df.columns if
-                                          col not in exclude_columns]
-                    current_player_home_2024_df = current_player_home_2024_df.sort_values(by="Date")
-                except Exception as e:
-                    current_player_home_2024_df = pd.DataFrame(columns=dummy_columns)
-
-                # The height calculation would need to be adjusted for an empty DataFrame scenario
-                height = (len(current_player_home_2024_df) + 1) * 35 + 3 if not current_player_home_2024_df.empty else 0
-
-                # Custom axis configuration
-                custom_axis = alt.Axis(
-                    title="Round",
-                    titleFontSize=25,
-                    labelFontSize=17,
-                    labelAngle=0,
-                )
-
-                # Create the line chart with sorted 'DisplayRound'
-                line_chart = alt.Chart(current_player_home_2024_df).mark_line(
-                    color="#488f31",
-                    strokeWidth=3
-                ).encode(
-                    x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),  # Apply sort here
-                    y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40, labelFontSize=17))
-                )
-
-                # Create the point chart with sorted 'DisplayRound'
-                point_chart = alt.Chart(current_player_home_2024_df).mark_point(
-                    size=300,
-                    color="#488f31",
-                    strokeWidth=4,
-                    filled=True
-                ).encode(
-                    x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),  # Apply sort here
-                    y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40)),
-                    tooltip=[
-                        alt.Tooltip(field="Round", title="Round"),
-                        alt.Tooltip(field="D", title="Disposals"),
-                    ]
-                )
-
-                # Goals Line Chart
-                goals_line_chart = alt.Chart(current_player_home_2024_df).mark_line(
-                    color="#488f31",  # Specified green color for goals
-                    strokeWidth=3
-                ).encode(
-                    x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),
-                    y=alt.Y("G",
-                            axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, titleFontSize=30, labelFontSize=17,
-                                          format='d')))
-
-                # Goals Point Chart
-                goals_point_chart = alt.Chart(current_player_home_2024_df).mark_point(
-                    size=300,
-                    color="#488f31",  # Matching green color for goals points
-                    strokeWidth=3,
-                    filled=True
-                ).encode(
-                    x=alt.X('DisplayRound:N', sort=round_names),
-                    y=alt.Y("G", scale=alt.Scale(nice=False)),
-                    tooltip=[
-                        alt.Tooltip("Round", title="Round"),
-                        alt.Tooltip("G", title="Goals"),
-                    ]
-                )
-
-                # Behinds Point Chart
-                behinds_point_chart = alt.Chart(current_player_home_2024_df).mark_point(
-                    size=100,
-                    color="#f54242",  # Specified red color for behinds
-                    filled=True
-                ).encode(
-                    x=alt.X('DisplayRound:N', sort=round_names),
-                    y=alt.Y("B",
-                            axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, titleFontSize=30, labelFontSize=17,
-                                          format='d')),
-                    tooltip=[
-                        alt.Tooltip("Round", title="Round"),
-                        alt.Tooltip("B", title="Behinds"),
-                    ]
-                )
-
-                # Create a rule mark for the average goals
-                average_disposals_rule = alt.Chart(
-                    pd.DataFrame({f'{chosen_type} Disposals': [current_player_home_chosen_average_disposals]})).mark_rule(
-                    color="#AEC6CF",
-                    strokeWidth=2.5,
-                    strokeDash=[5, 5]
-                ).encode(
-                    y=f'{chosen_type} Disposals:Q'
-                )
-
-
-                # Create a rule mark for the average goals
-                average_goals_rule = alt.Chart(pd.DataFrame({f'{chosen_type} Goals': [current_player_home_chosen_average_goals]})).mark_rule(
-                    color="#AEC6CF",
-                    strokeWidth=2.5,
-                    strokeDash=[5, 5]
-                ).encode(
-                    y=f'{chosen_type} Goals:Q'
-                )
-
-
-                # Combine disposal points, lines, average line
-                disposal_chart = alt.layer(line_chart, point_chart, average_disposals_rule)
-                # Combine goal points, behind points, lines, average line
-                combined_goals_behinds_chart = alt.layer(goals_line_chart, goals_point_chart, behinds_point_chart, average_goals_rule)
+    paths = [file.path for file in list_folder(_source, selected_folder_path) if file.name.endswith('H2H Games.csv')]
+    for path, file_content in prefetcher.read_many(_source, paths).items():
+        df = read_csv(file_content, 'h2h_games')
+
+        # Remove ' H2H Games.csv' from filename for the dictionary key
+        dict_key = path.rsplit('/', 1)[-1].replace(' H2H Games.csv', '')
+        csv_dict_H2H[dict_key] = df
+
+    return compact_dict(csv_dict_H2H)
+
+
+def open_player_index():
+    if not os.path.exists(SEASON_INDEX):
+        return None
+    return content_cache.get_or_load('player_index', SEASON_INDEX, os.stat(SEASON_INDEX).st_mtime_ns,
+                                     lambda: PlayerIndex(SEASON_INDEX))
+
+
+player_index = open_player_index()
+
+use_rolling_averages = ROLLING_AVERAGES and player_index is not None
+if use_rolling_averages:
+    rolling_averages = open_rolling_averages(season.year)
+    # Only the games a rebuilt index added since the last sync are folded in
+    with stage('csv parse'):
+        rolling_averages.sync(player_index)
+
+
+# The selected match as written by the pre-render job (see prerender.py), or {} when there's no artifact built
+# from the data this process sees
+def get_prerendered(selected_folder_path, version, inputs):
+    if version is None:
+        return {}
+    return content_cache.get_or_load('prerendered', selected_folder_path, (version, inputs),
+                                     lambda: load_match(PRERENDER_DIR, parent_folder_path, version,
+                                                        selected_folder_name, json.loads(inputs)))
+
+
+def prerendered_or(namespace, key, build):
+    # An item of the pre-rendered page, decoded once, or built live when the page doesn't have it
+    # (e.g. a custom window)
+    data = prerendered.get((namespace, key))
+    if data is None:
+        return build()
+    return content_cache.get_or_load('prerendered_item', (selected_folder_path, namespace, key), prerendered_version,
+                                     lambda: decode_artifact(namespace, data))
+
+
+with stage('csv parse'):
+    prerendered_version = (current_version(PRERENDER_DIR, parent_folder_path), json.dumps(page_inputs(
+        selected_folder_version,
+        player_index.version if player_index is not None else folder_version(private_repo_contents),
+        registry_version(root_contents, private_repo_contents, season.players), get_h2h_results_versions(source),
+        game_log_version,
+        use_rolling_averages), sort_keys=True))
+    prerendered = get_prerendered(selected_folder_path, *prerendered_version)
+
+
+@content_cache.memoize
+@metrics.timed('afl_loader_seconds')
+def load_player_season(_source, path):
+    return compact(prepare_season_df(read_csv(_source.read_bytes(path), 'season')))
+
+
+# Load a player's current season, from the pre-rendered page or the index when they have been built
+def get_player_season_df(_source, team_url, player_url):
+    season_df = prerendered_or('season', (team_url, player_url), lambda: None)
+    if season_df is not None:
+        return season_df.copy()
+    if player_index is not None:
+        season_df = player_index.get(team_url, player_url)
+        if season_df is None:
+            raise KeyError(f"{team_url}/{player_url} is not in the player index")
+        return season_df
+    team_contents = list_folder(_source, team_url)
+    season_df = load_player_season(_source, f"{team_url}/{player_url}.csv",
+                                   file_version(team_contents, f"{player_url}.csv"))
+    return season_df.copy()
+
+
+# Everything the match page can ask for: both teams' averages and H2H games, plus the season file of
+# every player listed for either team (unless the player index already has them)
+def match_prefetch_tasks(selected_folder_path, selected_folder_version, teams):
+    def make_tasks(wrap):
+        # Detached, so the background reads don't count toward this rerun's upstream requests
+        counted_source = wrap(source.detached())
+        counted_private_source = wrap(private_source.detached())
+        tasks = [partial(load_player_H2H_data, counted_source, selected_folder_path, h2h_games_version)]
+        if player_index is not None:
+            if not use_rolling_averages:
+                tasks.append(partial(load_csv_data, counted_source, selected_folder_path, selected_folder_version))
+            return tasks
+        match_csv_dict = load_csv_data(counted_source, selected_folder_path, selected_folder_version)
+        for team, team_url in teams:
+            squad = set()
+            for csv_name, csv_df in match_csv_dict.items():
+                if csv_name.startswith(f"{team} "):
+                    squad.update(csv_df['Player'])
+            player_urls = player_registry.resolve_squad(team, sorted(squad)).values()
+            for player_url in dict.fromkeys(url for url in player_urls if url is not None):
+                tasks.append(partial(get_player_season_df, counted_private_source, team_url, player_url))
+        return tasks
+    return make_tasks
+
+
+# Start loading the whole match in the background, then block only on what this rerun needs (a pre-rendered
+# match has it all already)
+if not prerendered:
+    prefetcher.start((selected_folder_path, selected_folder_version),
+                     match_prefetch_tasks(selected_folder_path, selected_folder_version,
+                                          [(home_team, home_team_url), (away_team, away_team_url)]))
+
+# Load CSV data into a dictionary (the averages come from the rolling engine further down when it's on)
+with stage('csv parse'):
+    if not use_rolling_averages:
+        csv_dict_key = averages_key(False, WINDOWS)
+        csv_dict = prerendered_or('averages', csv_dict_key,
+                                  lambda: load_csv_data(source, selected_folder_path, selected_folder_version))
+        averages_version = selected_folder_version
+    csv_dict_H2H = prerendered_or('h2h_games', None,
+                                  lambda: load_player_H2H_data(source, selected_folder_path, h2h_games_version))
+
+
+# Gradient CSS for every averages table of the match (all windows, both teams) in one vectorised pass,
+# reused until the match's files (or the rolling averages) change
+def get_averages_css(selected_folder_path, averages_version, csv_dict):
+    return prerendered_or('averages_css', csv_dict_key, lambda: content_cache.get_or_load(
+        'averages_css', selected_folder_path, averages_version, lambda: averages_css(csv_dict)))
+
+
+# Both teams' averages tables for the given windows, built from the rolling engine
+def get_rolling_csv_dict(selected_folder_path, window_names):
+    def build():
+        csv_dict = {}
+        for team, team_url in [(home_team, home_team_url), (away_team, away_team_url)]:
+            csv_dict.update(rolling_averages.averages(team, team_url, window_names))
+        return compact_dict(csv_dict)
+    return content_cache.get_or_load('rolling_averages', selected_folder_path,
+                                     (rolling_averages.synced_version, tuple(window_names)), build)
+
+
+# Gradient CSS for a single table, keyed on the table's content
+def get_table_css(table_key, table_df, subset=None):
+    return prerendered_or('table_css', table_key, lambda: content_cache.get_or_load(
+        'table_css', table_key, content_hash(table_df), lambda: table_css(table_df, subset)))
+
+
+# Games matrices for hit-rate queries (see thresholds.py), built once per round: every player's season from
+# the index, and every listed player's previous games vs this round's opponent
+def get_season_matrix():
+    return content_cache.get_or_load('season_matrix', parent_folder_path, player_index.version,
+                                     lambda: GameMatrix.from_logs(player_index.game_logs(), ['team_url', 'name_url']))
+
+
+def get_h2h_matrix():
+    if game_log is not None and game_log.has_round(parent_folder_path):
+        return content_cache.get_or_load('h2h_matrix', parent_folder_path, game_log_version,
+                                         lambda: GameMatrix.from_logs(game_log.round_games(parent_folder_path),
+                                                                      ['team', 'Player Name']))
+    # A round without any Previous H2H Games files gets an empty matrix (every player on 0 games)
+    columns = ['team', 'Player Name', 'Date', 'D', 'G', 'B']
+    if USE_ROUND_STORE:
+        def build():
+            table = get_round_store(source, parent_folder_path).table('h2h_games')
+            h2h_df = pd.DataFrame(columns=columns) if table is None else table.select(columns).to_pandas()
+            return GameMatrix.from_logs(h2h_df, ['team', 'Player Name'])
+        return content_cache.get_or_load('h2h_matrix', parent_folder_path,
+                                         get_round_version(source, parent_folder_path), build)
+
+    def build_match():
+        frames = [df.assign(team=csv_name.replace(' Previous', '')) for csv_name, df in csv_dict_H2H.items()]
+        h2h_df = pd.concat(frames) if frames else pd.DataFrame(columns=columns)
+        return GameMatrix.from_logs(h2h_df, ['team', 'Player Name'])
+    return content_cache.get_or_load('h2h_matrix', selected_folder_path, h2h_games_version, build_match)
+
+
+# Season (over the chosen window) and previous-games hit rates for the listed players ({player: name_url})
+# at any thresholds
+def get_threshold_table(team, team_url, opponent, player_urls, window, thresholds_by_stat):
+    players = list(player_urls)
+    threshold_df = pd.DataFrame({'Player': players})
+    if player_index is not None:
+        keys = [(team_url, player_urls[player]) for player in players]
+        threshold_df = threshold_df.join(get_season_matrix().hit_rate_frame(keys, thresholds_by_stat, window))
+    h2h_rates_df = get_h2h_matrix().hit_rate_frame([(team, player) for player in players], thresholds_by_stat,
+                                                   suffix=f' vs {opponent}')
+    return threshold_df.join(h2h_rates_df)
+
+
+# Vega-Lite specs for a player's pair of charts (see charts.py), keyed on the player and window/opponent
+def get_chart_specs(chart_key, make_specs, games_df, label, average_disposals, average_goals):
+    def build():
+        version = (content_hash(games_df), label, str(average_disposals), str(average_goals))
+        return content_cache.get_or_load('chart_spec', chart_key, version,
+                                         lambda: make_specs(for_display(games_df), label, average_disposals,
+                                                            average_goals))
+    return prerendered_or('chart_spec', chart_key, build)
+
+
+# Round overview: H2H form for all of this round's matches, straight from the engine's lookups
+with st.expander(f"Round {CURRENT_ROUND} H2H overview"):
+    round_fixtures = [(match.home_team, match.away_team) for match in current_round_matches]
+    st.dataframe(h2h_engine.overview(round_fixtures), use_container_width=True, hide_index=True)
 
+# Selectbox to choose Averages to display
+window_options = list(WINDOWS)
+if use_rolling_averages:
+    # Any window can be served from the game logs
+    window_options.append(CUSTOM_WINDOW)
+chosen_type = st.selectbox("Game Averages", window_options)
+if chosen_type == CUSTOM_WINDOW:
+    chosen_type = f"Last {st.number_input('Games', min_value=1, max_value=rolling_averages.capacity, value=7)} Average"
+
+if use_rolling_averages:
+    with stage('csv parse'):
+        window_names = list(dict.fromkeys(window_options[:-1] + [chosen_type]))
+        csv_dict_key = averages_key(True, window_names)
+        csv_dict = prerendered_or('averages', csv_dict_key, lambda: get_rolling_csv_dict(selected_folder_path,
+                                                                                          window_names))
+        averages_version = (rolling_averages.synced_version, tuple(window_names))
+
+
+# Build the page section for one team: averages table, chosen player's season and previous games vs the opponent
+def render_team_section(team, team_url, opponent, is_home_team, csv_name, csv_df):
+    side = 'home' if is_home_team else 'away'
+
+    #Load Headers and H2H Data
+    parsed_H2H_Team_data_string = prerendered_or('form', (team, opponent), lambda: h2h_engine.form(team, opponent))
+    st.subheader(f"Previous H2H vs {opponent}: {parsed_H2H_Team_data_string}")
+    st.subheader(csv_name)
+    # Load Team DF
+    df = csv_df.sort_values(by=['Disposals'], ascending=False)
+
+    # Create columns for layout
+    col1, col2 = st.columns([1, 6])
+
+    # Sort player names alphabetically and create st.radio in the first column for player select
+    with col1:
+        sorted_players = sorted(df['Player'].unique())
+        # Every listed player's season file, resolved up front; None for a player the workbook doesn't have
+        player_urls = player_registry.resolve_squad(team, sorted_players)
+        # Only the visible team's radio exists on a rerun, so remember each team's pick across team switches
+        remembered_player = st.session_state.get(f'selected_player_{side}')
+        selected_index = sorted_players.index(remembered_player) if remembered_player in sorted_players else 0
+        selected_player = st.radio("Select a Player", sorted_players, index=selected_index, key=f'player_radio_{side}')
+        st.session_state[f'selected_player_{side}'] = selected_player
+        selected_player_url = player_urls[selected_player]
+
+    current_player_chosen_average_df = df[df["Player"] == selected_player]
+    current_player_chosen_average_disposals = current_player_chosen_average_df["Disposals"].iloc[0]
+    current_player_chosen_average_goals = current_player_chosen_average_df["Goals"].iloc[0]
+
+    # Display the DataFrame in the second column
+    with col2:
+        with stage('styler build'):
+            averages_css = get_averages_css(selected_folder_path, averages_version, csv_dict)[csv_name]
+            st.dataframe(apply_css(for_display(df[styled_columns]).style.format({"Disposals": "{:.2f}", "Goals": "{:.2f}",
+                                                                    "Behinds": "{:.2f}", "Frees For": "{:.2f}"}),
+                                   averages_css), use_container_width=True, height=900,
+                         hide_index=True)
+
+    # Hit rates for thresholds the averages table doesn't have, e.g. 27+ disposals
+    with st.expander("Hit rates for other thresholds"):
+        threshold_col1, threshold_col2 = st.columns(2)
+        disposal_thresholds = parse_thresholds(threshold_col1.text_input("Disposals", "15, 20, 25, 30",
+                                                                         key=f'disposal_thresholds_{side}'))
+        goal_thresholds = parse_thresholds(threshold_col2.text_input("Goals", "1, 2, 3", key=f'goal_thresholds_{side}'))
+        with stage('threshold query'):
+            threshold_df = get_threshold_table(team, team_url, opponent, player_urls, window_size(chosen_type),
+                                               {'D': disposal_thresholds, 'G': goal_thresholds})
+        st.dataframe(threshold_df, use_container_width=True, hide_index=True)
+
+    # -------------------- CURRENT SEASON DATA
+    st.title(f"{selected_player} Season {season.year}")
+    with stage('csv parse'):
+        if selected_player_url is None:
+            # Not in the players workbook, so there's no season file to look for
+            current_player_2024_df = pd.DataFrame(columns=dummy_columns)
+        else:
+            try:
+                current_player_2024_df = get_player_season_df(private_source, team_url, selected_player_url)
+            except (KeyError, FileNotFoundError):
+                # No season file for this player (yet)
+                current_player_2024_df = pd.DataFrame(columns=dummy_columns)
+            except RateLimited as e:
+                st.warning(f"{e}. {selected_player}'s season will show once it resets.")
+                current_player_2024_df = pd.DataFrame(columns=dummy_columns)
+            except UpstreamError as e:
+                st.warning(f"GitHub didn't answer for {selected_player}'s season ({e}). It will show on a later rerun.")
+                current_player_2024_df = pd.DataFrame(columns=dummy_columns)
+
+    # The height calculation would need to be adjusted for an empty DataFrame scenario
+    height = (len(current_player_2024_df) + 1) * 35 + 3 if not current_player_2024_df.empty else 0
+
+    with stage('chart spec build'):
+        disposal_spec, goals_spec = get_chart_specs(
+            season_chart_key(team_url, selected_player_url, chosen_type), season_specs, current_player_2024_df,
+            chosen_type, current_player_chosen_average_disposals, current_player_chosen_average_goals)
+
+        col1, col2 = st.columns(2)
+
+        # Place each chart in a column
+        with col1:
+            st.vega_lite_chart(disposal_spec, use_container_width=True, theme="streamlit")
+        with col2:
+            st.vega_lite_chart(goals_spec, use_container_width=True, theme="streamlit")
+
+    if not current_player_2024_df.empty:
+        # Display Dataframe of Current Chosen Player Stats current year data
+        with stage('styler build'):
+            season_table_df, season_subset = season_table(current_player_2024_df)
+            season_css = get_table_css(season_key(team_url, selected_player_url), season_table_df, season_subset)
+            st.dataframe(apply_css(for_display(season_table_df).style.format({'Date': lambda x: x.strftime('%d-%m-%Y')}), season_css),
+                         hide_index=True, use_container_width=True, height=height)
+    else:
+        st.write(f"No {season.year} Game Data to display for {selected_player}")
+
+
+
+
+    # ------------------- PREVIOUS GAMES
+    st.title(f"{selected_player} Previous games vs. {opponent}")
+
+    for csv_name2, df in csv_dict_H2H.items():
+        if team in csv_name2:
+            # Logic for team DataFrame (Year moved next to the name for clarity)
+            current_player_prev_vs_opponent_df = previous_games(df, selected_player)
+            current_player_prev_vs_opponent_average_disposals = current_player_prev_vs_opponent_df["D"].mean()
+            current_player_prev_vs_opponent_average_goals = current_player_prev_vs_opponent_df["G"].mean()
+
+            # Display the select player previous games dataframe
+            if not current_player_prev_vs_opponent_df.empty:
+                with stage('styler build'):
+                    h2h_table_df = previous_table(current_player_prev_vs_opponent_df)
+                    h2h_css = get_table_css(previous_key(csv_name2, selected_player), h2h_table_df)
+                    st.dataframe(apply_css(for_display(h2h_table_df).style.format({'Date': lambda x: x.strftime('%d-%m-%Y')}), h2h_css),
+                                 use_container_width=True, hide_index=True)
+            else:
+                st.write(f"No Previous Game Data to display for {selected_player}")
+
+            with stage('chart spec build'):
+                disposal_spec, goals_spec = get_chart_specs(
+                    previous_key(csv_name2, selected_player), previous_specs, current_player_prev_vs_opponent_df,
+                    opponent, current_player_prev_vs_opponent_average_disposals,
+                    current_player_prev_vs_opponent_average_goals)
+
+                st.write("")
+
+                # Using st.columns to create two columns
                 col1, col2 = st.columns(2)
 
                 # Place each chart in a column
                 with col1:
-                    st.altair_chart(disposal_chart, use_container_width=True, theme="streamlit")
+                    st.vega_lite_chart(disposal_spec, use_container_width=True, theme="streamlit")
+
                 with col2:
-                    st.altair_chart(combined_goals_behinds_chart, use_container_width=True, theme="streamlit")
-
-                if not current_player_home_2024_df.empty:
-                    # Display Dataframe of Current Chosen Player Stats current year data
-                    st.dataframe(current_player_home_2024_df[columns_to_display].style.format(
-                        {'Date': lambda x: x.strftime('%d-%m-%Y')}).background_gradient(axis=0, cmap=cmap,
-                        subset=[col for col in current_player_home_2024_df.columns if col not in exclude_columns_cmap]),
-                        hide_index=True, use_container_width=True, height=height)
-                else:
-                    st.write(f"No {CURRENT_YEAR} Game Data to display for {selected_player_home}")
-
-
-
-
-                # ------------------- PREVIOUS GAMES
-                st.title(f"{selected_player_home} Previous games vs. {away_team}")
-
-                for csv_name2, df in csv_dict_H2H.items():
-                    if home_team in csv_name2:
-                        # Logic for home team DataFrame
-                        df["Year"] = df["Year"].astype(str)
-                        current_player_home_prev_vs_opponent_df = df[df["Player Name"] == selected_player_home]
-                        current_player_home_prev_vs_opponent_average_disposals = current_player_home_prev_vs_opponent_df["D"].mean()
-                        current_player_home_prev_vs_opponent_average_goals = current_player_home_prev_vs_opponent_df["G"].mean()
-
-                        # Rearrange columns for clarity
-                        columns_except_year = [col for col in current_player_home_prev_vs_opponent_df.columns if col != 'Year']
-                        columns_except_year.insert(1, 'Year')
-                        current_player_home_prev_vs_opponent_df = current_player_home_prev_vs_opponent_df[columns_except_year]
-
-                        columns_to_display_h2h = [col for col in current_player_home_prev_vs_opponent_df.columns if
-                                                  col not in exclude_columns]
-
-                        # Display the select player previous games dataframe
-                        if not current_player_home_prev_vs_opponent_df.empty:
-                            st.dataframe(current_player_home_prev_vs_opponent_df[columns_to_display_h2h].style.format({'Date': lambda x: x.strftime('%d-%m-%Y')})
-                                         .background_gradient(axis=0, cmap=cmap), use_container_width=True,
-                                         hide_index=True)
-                        else:
-                            st.write(f"No Previous Game Data to display for {selected_player_home}")
-
-                        custom_axis = alt.Axis(
-                            title='Year',
-                            titleFontSize=25,
-                            tickCount=5,
-                            labelExpr="year(datum.value)",
-                            labelFontSize=20
-                        )
-
-                        # Disposal Chart using Date for x-axis
-                        disposal_chart = alt.Chart(current_player_home_prev_vs_opponent_df).mark_point(
-                            size=300,
-                            color="#488f31",
-                            strokeWidth=4,
-                            filled=True
-                        ).encode(
-                            x=alt.X('Date:T', axis=custom_axis,
-                                    scale=alt.Scale(domainMin=2021, domainMax=2025, nice=True)),
-                            # Use 'Date' for x-axis but label it as 'Year' for clarity
-                            y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40)),
-                            tooltip=[
-                                alt.Tooltip(field="Year", title="Year"),
-                                alt.Tooltip(field="Round", title="Round"),
-                                alt.Tooltip(field="D", title="Disposals"),
-                            ]
-                        )
-
-                        # Disposal Line Chart
-                        disposal_line_chart = alt.Chart(current_player_home_prev_vs_opponent_df).mark_line(
-                            color="#488f31",  # Adjust color to match your disposal points
-                            strokeWidth=3  # Adjust strokeWidth to match your styling
-                        ).encode(
-                            x=alt.X('Date:T', axis=custom_axis),
-                            y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40))
-                        )
-
-
-                        # Goals Chart using Date for x-axis
-                        goals_chart = alt.Chart(current_player_home_prev_vs_opponent_df).mark_point(
-                            size=300,
-                            color="#488f31",
-                            strokeWidth=4,
-                            filled=True
-                        ).encode(
-                            x=alt.X('Date:T', axis=custom_axis, scale=alt.Scale(domainMin=2021, domainMax=2025,
-                                                                                nice=True)),
-                            # Use 'Date' for x-axis but label it as 'Year'
-                            y=alt.Y("G",
-                                    axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, format='d', tickCount=5, titleFontSize=30),
-                                    scale=alt.Scale(domainMin=0, nice=False)),
-                            tooltip=[
-                                alt.Tooltip(field="Year", title="Year"),
-                                alt.Tooltip(field="Round", title="Round"),
-                                alt.Tooltip(field="G", title="Goals")
-                            ]
-                        )
-
-                        # Goals Line Chart
-                        goals_line_chart = alt.Chart(current_player_home_prev_vs_opponent_df).mark_line(
-                            color="#488f31",  # You can choose a different color for distinction
-                            strokeWidth=3  # Match the point border thickness
-                        ).encode(
-                            x=alt.X('Date:T', axis=custom_axis,
-                                    scale=alt.Scale(domainMin=2021, domainMax=2025, nice=True)),
-                            y=alt.Y("G", axis=alt.Axis(labelAngle=0, format='d', tickCount=5,
-                                                       titleFontSize=30))
-                        )
-
-                        # Behinds Chart using Date for x-axis
-                        behinds_chart = alt.Chart(current_player_home_prev_vs_opponent_df).mark_circle(size=100, color="#f54242").encode(
-                            x=alt.X('Date:T', axis=custom_axis,
-                                    scale=alt.Scale(domainMin=2021, domainMax=2025, nice=False)),
-                            # Same custom axis for behinds
-                            y=alt.Y("B", axis=alt.Axis(title="Goals 🟢 Behinds 🔴", format='d', tickCount=5, titleFontSize=30),
-                                    scale=alt.Scale(domainMin=0, nice=False)),
-                            tooltip=[
-                                alt.Tooltip(field="Year", title="Year"),
-                                alt.Tooltip(field="Round", title="Round"),
-                                alt.Tooltip(field="B", title="Behinds")
-                            ]
-                        )
-
-                        # Create a rule mark for the average goals
-                        average_disposals_rule = alt.Chart(
-                            pd.DataFrame({f'Average Disposals vs {away_team}': [
-                                current_player_home_prev_vs_opponent_average_disposals]})).mark_rule(
-                            color="#AEC6CF",
-                            strokeWidth=2.5,
-                            strokeDash=[5, 5]
-                        ).encode(
-                            y=f'Average Disposals vs {away_team}:Q'
-                        )
-
-                        # Create a rule mark for the average goals
-                        average_goals_rule = alt.Chart(pd.DataFrame(
-                            {f'Average Goals vs {away_team}': [current_player_home_prev_vs_opponent_average_goals]})).mark_rule(
-                            color="#AEC6CF",
-                            strokeWidth=2.5,
-                            strokeDash=[5, 5]
-                        ).encode(
-                            y=f'Average Goals vs {away_team}:Q'
-                        )
-
-                        # Combine disposal points, lines, average line
-                        combined_disposal_chart = alt.layer(disposal_line_chart, disposal_chart, average_disposals_rule)
-
-                        # Combine goal points, behinds points, goal lines, average line
-                        combined_chart = alt.layer(goals_chart, behinds_chart, goals_line_chart, average_goals_rule)
-
-                        # Make labels and titles bigger
-                        combined_disposal_chart = combined_disposal_chart.configure_axisY(labelFontSize=20, titleFontSize=20)
-                        combined_chart = combined_chart.configure_axisY(labelFontSize=30, titleFontSize=20)
-
-                        st.write("")
-
-                        # Using st.columns to create two columns
-                        col1, col2 = st.columns(2)
-
-                        # Place each chart in a column
-                        with col1:
-                            st.altair_chart(combined_disposal_chart, use_container_width=True, theme="streamlit")
-
-                        with col2:
-                            st.altair_chart(combined_chart, use_container_width=True, theme="streamlit")
-
-
-        with away_team_tab:
-            if away_team in csv_name:
-                # Load Headers and H2H Data
-                parsed_H2H_Team_data_string = parse_team_H2H_data(away_team, previous_H2H_csv, False)
-                st.subheader(f"Previous H2H vs {home_team}: {parsed_H2H_Team_data_string}")
-                st.subheader(csv_name)
-                # Load Away Team DF
-                df = csv_df.sort_values(by=['Disposals'], ascending=False)
-
-                # Create columns for layout
-                col1, col2 = st.columns([1, 6])
-
-                # Sort player names alphabetically and create st.radio in the first column for player select
-                with col1:
-                    sorted_players_away = sorted(df['Player'].unique())
-                    selected_player_away = st.radio("Select a Player", sorted_players_away)
-                    selected_player_away_url = players_df.loc[players_df['Player'] == selected_player_away, 'name_url'].iloc[0]
+                    st.vega_lite_chart(goals_spec, use_container_width=True, theme="streamlit")
 
-                current_player_away_chosen_average_df = df[df["Player"] == selected_player_away]
-                current_player_away_chosen_average_disposals = current_player_away_chosen_average_df["Disposals"].iloc[0]
-                current_player_away_chosen_average_goals = current_player_away_chosen_average_df["Goals"].iloc[0]
 
-                # Display the DataFrame in the second column
-                with col2:
-                    st.dataframe(df[styled_columns].style.format({"Disposals": "{:.2f}", "Goals": "{:.2f}",
-                                                                  "Behinds": "{:.2f}", "Frees For": "{:.2f}"})
-                                 .background_gradient(axis=0, cmap=cmap), use_container_width=True, height=900,
-                                 hide_index=True)
-
-                # -------------------- CURRENT SEASON DATA
-                st.title(f"{selected_player_away} Season {CURRENT_YEAR}")
-                current_player_away_file_path = f"{away_team_url}/{selected_player_away_url}.csv"
-
-                try:
-                    file_content = private_repo.get_contents(current_player_away_file_path)
-                    content_decoded = base64.b64decode(file_content.content)
-                    csv_data = BytesIO(content_decoded)
-                    current_player_away_2024_df = pd.read_csv(csv_data)
-                    current_player_away_2024_df['Date'] = pd.to_datetime(current_player_away_2024_df['Date'],
-                                                                         dayfirst=True)
-                    current_player_away_2024_df = current_player_away_2024_df.drop(columns=drop_columns_2024)
-                    current_player_away_2024_df['DisplayRound'] = current_player_away_2024_df['Round'].apply(
-                        lambda x: finals_round_mapping.get(x, x))
-                    columns_to_display = [col for col in current_player_away_2024_df.columns if
-                                          col not in exclude_columns]
-                    current_player_away_2024_df = current_player_away_2024_df.sort_values(by="Date")
-
-                except Exception as e:
-                    current_player_away_2024_df = pd.DataFrame(columns=dummy_columns)
-
-                # Adjust the height calculation for an empty DataFrame scenario
-                height = (len(current_player_away_2024_df) + 1) * 35 + 3 if not current_player_away_2024_df.empty else 0
-
-                # Custom axis configuration
-                custom_axis = alt.Axis(
-                    title="Round",
-                    titleFontSize=25,
-                    labelFontSize=17,
-                    labelAngle=0,
-                )
-
-                # Create the line chart with sorted 'DisplayRound'
-                line_chart = alt.Chart(current_player_away_2024_df).mark_line(
-                    color="#488f31",
-                    strokeWidth=3
-                ).encode(
-                    x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),  # Apply sort here
-                    y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40, labelFontSize=17))
-                )
-
-                # Create the point chart with sorted 'DisplayRound'
-                point_chart = alt.Chart(current_player_away_2024_df).mark_point(
-                    size=300,
-                    color="#488f31",
-                    strokeWidth=4,
-                    filled=True
-                ).encode(
-                    x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),  # Apply sort here
-                    y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40)),
-                    tooltip=[
-                        alt.Tooltip(field="Round", title="Round"),
-                        alt.Tooltip(field="D", title="Disposals"),
-                    ]
-                )
-
-                # Goals Line Chart
-                goals_line_chart = alt.Chart(current_player_away_2024_df).mark_line(
-                    color="#488f31",  # Specified green color for goals
-                    strokeWidth=3
-                ).encode(
-                    x=alt.X('DisplayRound:N', axis=custom_axis, sort=round_names),
-                    y=alt.Y("G",
-                            axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, titleFontSize=30, labelFontSize=17,
-                                          format='d')))
-
-                # Goals Point Chart
-                goals_point_chart = alt.Chart(current_player_away_2024_df).mark_point(
-                    size=300,
-                    color="#488f31",  # Matching green color for goals points
-                    strokeWidth=3,
-                    filled=True
-                ).encode(
-                    x=alt.X('DisplayRound:N', sort=round_names),
-                    y=alt.Y("G", scale=alt.Scale(nice=False)),
-                    tooltip=[
-                        alt.Tooltip("Round", title="Round"),
-                        alt.Tooltip("G", title="Goals"),
-                    ]
-                )
-
-                # Behinds Point Chart
-                behinds_point_chart = alt.Chart(current_player_away_2024_df).mark_point(
-                    size=100,
-                    color="#f54242",  # Specified red color for behinds
-                    filled=True
-                ).encode(
-                    x=alt.X('DisplayRound:N', sort=round_names),
-                    y=alt.Y("B",
-                            axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, titleFontSize=30, labelFontSize=17,
-                                          format='d')),
-                    tooltip=[
-                        alt.Tooltip("Round", title="Round"),
-                        alt.Tooltip("B", title="Behinds"),
-                    ]
-                )
-
-                # Create a rule mark for the average goals
-                average_disposals_rule = alt.Chart(
-                    pd.DataFrame(
-                        {f'{chosen_type} Disposals': [current_player_away_chosen_average_disposals]})).mark_rule(
-                    color="#AEC6CF",
-                    strokeWidth=2.5,
-                    strokeDash=[5, 5]
-                ).encode(
-                    y=f'{chosen_type} Disposals:Q'
-                )
-
-                # Create a rule mark for the average goals
-                average_goals_rule = alt.Chart(
-                    pd.DataFrame({f'{chosen_type} Goals': [current_player_away_chosen_average_goals]})).mark_rule(
-                    color="#AEC6CF",
-                    strokeWidth=2.5,
-                    strokeDash=[5, 5]
-                ).encode(
-                    y=f'{chosen_type} Goals:Q'
-                )
-
-                # Combine disposal points, lines, average line
-                disposal_chart = alt.layer(line_chart, point_chart, average_disposals_rule)
-                # Combine goal points, behind points, lines, average line
-                combined_goals_behinds_chart = alt.layer(goals_line_chart, goals_point_chart, behinds_point_chart,
-                                                         average_goals_rule)
+# st.tabs runs the code for every tab on each rerun, so pick the team with a radio and build only that section
+team_options = [f'Home: {home_team}', f'Away: {away_team}']
+selected_team_option = st.radio("Team", team_options, horizontal=True, label_visibility="collapsed", key='team_radio')
 
-                col1, col2 = st.columns(2)
+if selected_team_option == team_options[0]:
+    team_args = (home_team, home_team_url, away_team, True)
+else:
+    team_args = (away_team, away_team_url, home_team, False)
 
-                # Place each chart in a column
-                with col1:
-                    st.altair_chart(disposal_chart, use_container_width=True, theme="streamlit")
-                with col2:
-                    st.altair_chart(combined_goals_behinds_chart, use_container_width=True, theme="streamlit")
-
-
-                if not current_player_away_2024_df.empty:
-                    # Display Dataframe of Current Chosen Player Stats current year data
-                    st.dataframe(current_player_away_2024_df[columns_to_display].style.format(
-                        {'Date': lambda x: x.strftime('%d-%m-%Y')})
-                                 .background_gradient(axis=0, cmap=cmap,
-                                                      subset=[
-                                                          col for col in current_player_away_2024_df.columns if
-                                                          col not in exclude_columns_cmap]),
-                                 hide_index=True, use_container_width=True, height=height)
-                else:
-                    st.write(f"No {CURRENT_YEAR} Game Data to display for {selected_player_away}")
-
-                # Display Dataframe of Current Chosen Player Stats current year data
-
-
-                # ------------------- PREVIOUS GAMES
-                st.title(f"{selected_player_away} Previous games vs. {home_team}")
-
-                for csv_name2, df in csv_dict_H2H.items():
-                    if away_team in csv_name2:
-                        # Logic for away team DataFrame
-                        df["Year"] = df["Year"].astype(str)
-                        current_player_away_prev_vs_opponent_df = df[df["Player Name"] == selected_player_away]
-
-                        # Rearrange columns for clarity
-                        columns_except_year = [col for col in current_player_away_prev_vs_opponent_df.columns if
-                                               col != 'Year']
-                        columns_except_year.insert(1, 'Year')
-                        current_player_away_prev_vs_opponent_df = current_player_away_prev_vs_opponent_df[
-                            columns_except_year]
-
-                        columns_to_display_h2h = [col for col in current_player_away_prev_vs_opponent_df.columns if
-                                                  col not in exclude_columns]
-
-                        current_player_away_prev_vs_opponent_average_disposals = current_player_away_prev_vs_opponent_df["D"].mean()
-                        current_player_away_prev_vs_opponent_average_goals = current_player_away_prev_vs_opponent_df["G"].mean()
-
-                        # Display the select player previous games dataframe
-                        if not current_player_away_prev_vs_opponent_df.empty:
-                            st.dataframe(current_player_away_prev_vs_opponent_df[columns_to_display_h2h].style.format(
-                                {'Date': lambda x: x.strftime('%d-%m-%Y')})
-                                         .background_gradient(axis=0, cmap=cmap), use_container_width=True,
-                                         hide_index=True)
-                        else:
-                            st.write(f"No Previous Game Data to display for {selected_player_home}")
-
-                        custom_axis = alt.Axis(
-                            title='Year',
-                            titleFontSize=25,
-                            tickCount=5,
-                            labelExpr="year(datum.value)",
-                            labelFontSize=20
-                        )
-
-                        # Disposal Chart using Date for x-axis
-                        disposal_chart = alt.Chart(current_player_away_prev_vs_opponent_df).mark_point(
-                            size=300,
-                            color="#488f31",
-                            strokeWidth=4,
-                            filled=True
-                        ).encode(
-                            x=alt.X('Date:T', axis=custom_axis,
-                                    scale=alt.Scale(domainMin=2021, domainMax=2025, nice=True)),
-                            # Use 'Date' for x-axis but label it as 'Year' for clarity
-                            y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40)),
-                            tooltip=[
-                                alt.Tooltip(field="Year", title="Year"),
-                                alt.Tooltip(field="Round", title="Round"),
-                                alt.Tooltip(field="D", title="Disposals"),
-                            ]
-                        )
-
-                        # Disposal Line Chart
-                        disposal_line_chart = alt.Chart(current_player_away_prev_vs_opponent_df).mark_line(
-                            color="#488f31",  # Adjust color to match your disposal points
-                            strokeWidth=3  # Adjust strokeWidth to match your styling
-                        ).encode(
-                            x=alt.X('Date:T', axis=custom_axis),
-                            y=alt.Y("D", axis=alt.Axis(title="Disposals 🟢", labelAngle=0, titleFontSize=40))
-                        )
-
-                        # Goals Chart using Date for x-axis
-                        goals_chart = alt.Chart(current_player_away_prev_vs_opponent_df).mark_point(
-                            size=300,
-                            color="#488f31",
-                            strokeWidth=4,
-                            filled=True
-                        ).encode(
-                            x=alt.X('Date:T', axis=custom_axis, scale=alt.Scale(domainMin=2021, domainMax=2025,
-                                                                                nice=True)),
-                            # Use 'Date' for x-axis but label it as 'Year'
-                            y=alt.Y("G",
-                                    axis=alt.Axis(title="Goals 🟢 Behinds 🔴", labelAngle=0, format='d', tickCount=5,
-                                                  titleFontSize=30),
-                                    scale=alt.Scale(domainMin=0, nice=False)),
-                            tooltip=[
-                                alt.Tooltip(field="Year", title="Year"),
-                                alt.Tooltip(field="Round", title="Round"),
-                                alt.Tooltip(field="G", title="Goals")
-                            ]
-                        )
-
-                        # Goals Line Chart
-                        goals_line_chart = alt.Chart(current_player_away_prev_vs_opponent_df).mark_line(
-                            color="#488f31",  # You can choose a different color for distinction
-                            strokeWidth=3  # Match the point border thickness
-                        ).encode(
-                            x=alt.X('Date:T', axis=custom_axis,
-                                    scale=alt.Scale(domainMin=2021, domainMax=2025, nice=True)),
-                            y=alt.Y("G", axis=alt.Axis(labelAngle=0, format='d', tickCount=5,
-                                                       titleFontSize=30))
-                        )
-
-                        # Behinds Chart using Date for x-axis
-                        behinds_chart = alt.Chart(current_player_away_prev_vs_opponent_df).mark_circle(size=100,
-                                                                                                       color="#f54242").encode(
-                            x=alt.X('Date:T', axis=custom_axis,
-                                    scale=alt.Scale(domainMin=2021, domainMax=2025, nice=False)),
-                            # Same custom axis for behinds
-                            y=alt.Y("B", axis=alt.Axis(title="Goals 🟢 Behinds 🔴", format='d', tickCount=5,
-                                                       titleFontSize=30),
-                                    scale=alt.Scale(domainMin=0, nice=False)),
-                            tooltip=[
-                                alt.Tooltip(field="Year", title="Year"),
-                                alt.Tooltip(field="Round", title="Round"),
-                                alt.Tooltip(field="B", title="Behinds")
-                            ]
-                        )
-
-                        # Create a rule mark for the average goals
-                        average_disposals_rule = alt.Chart(
-                            pd.DataFrame({f'Average Disposals vs {home_team}': [
-                                current_player_away_prev_vs_opponent_average_disposals]})).mark_rule(
-                            color="#AEC6CF",
-                            strokeWidth=2.5,
-                            strokeDash=[5, 5]
-                        ).encode(
-                            y=f'Average Disposals vs {home_team}:Q'
-                        )
-
-                        # Create a rule mark for the average goals
-                        average_goals_rule = alt.Chart(pd.DataFrame(
-                            {f'Average Goals vs {home_team}': [current_player_away_prev_vs_opponent_average_goals]})).mark_rule(
-                            color="#AEC6CF",
-                            strokeWidth=2.5,
-                            strokeDash=[5, 5]
-                        ).encode(
-                            y=f'Average Goals vs {home_team}:Q'
-                        )
-
-                        # Combine disposal points, lines, average line
-                        combined_disposal_chart = alt.layer(disposal_line_chart, disposal_chart, average_disposals_rule)
-
-                        # Combine goal points, behinds points, goal lines, average line
-                        combined_chart = alt.layer(goals_chart, behinds_chart, goals_line_chart, average_goals_rule)
-
-                        # Make labels and titles bigger
-                        combined_disposal_chart = combined_disposal_chart.configure_axisY(labelFontSize=20,
-                                                                                          titleFontSize=20)
-                        combined_chart = combined_chart.configure_axisY(labelFontSize=30, titleFontSize=20)
-
-                        st.write("")
-
-                        # Using st.columns to create two columns
-                        col1, col2 = st.columns(2)
-
-                        # Place each chart in a column
-                        with col1:
-                            st.altair_chart(combined_disposal_chart, use_container_width=True, theme="streamlit")
-
-                        with col2:
-                            st.altair_chart(combined_chart, use_container_width=True, theme="streamlit")
+# Display the CSV file for the chosen team and averages window
+for csv_name, csv_df in csv_dict.items():
+    if chosen_type in csv_name and team_args[0] in csv_name:
+        render_team_section(*team_args, csv_name, csv_df)
+
+metrics.observe('afl_rerun_seconds', time.perf_counter() - rerun_started)
+metrics.observe('afl_rerun_upstream_requests', source.calls() + private_source.calls())
@@ -0,0 +1,110 @@
+import hashlib
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Precomputed table gradients. Styler.background_gradient runs matplotlib and
+# builds a CSS string per cell in Python on every rerun. gradient_css() produces
+# the same CSS for a whole batch of tables in one numpy pass (e.g. all eight
+# averages tables of a match), and apply_css() hands it to a Styler as a
+# ready-made frame, so a rerun only pays for Styler's HTML translation.
+# LinearColormap stands in for matplotlib's LinearSegmentedColormap.from_list, so
+# the page doesn't import matplotlib at all.
+
+_HEX = np.array([format(value, '02x') for value in range(256)], dtype=object)
+
+
+def _to_rgba(color):
+    # '#rrggbb' or an (r, g, b[, a]) tuple of floats
+    if isinstance(color, str):
+        color = color.lstrip('#')
+        return tuple(int(color[i:i + 2], 16) / 255 for i in (0, 2, 4)) + (1.0,)
+    return tuple(float(channel) for channel in color) + (1.0,) * (4 - len(color))
+
+
+class LinearColormap:
+    # Same lookup table and indexing as LinearSegmentedColormap.from_list(name, colors, N)
+    def __init__(self, colors, N=256):
+        self.N = N
+        y = np.array([_to_rgba(color) for color in colors])
+        x = np.linspace(0, 1, len(colors)) * (N - 1)
+        xind = (N - 1) * np.linspace(0, 1, N)
+        ind = np.searchsorted(x, xind)[1:-1]
+        distance = (xind[1:-1] - x[ind - 1]) / (x[ind] - x[ind - 1])
+        lut = np.concatenate([y[:1], distance[:, None] * (y[ind] - y[ind - 1]) + y[ind - 1], y[-1:]])
+        lut = np.clip(lut, 0.0, 1.0)
+        # Rows N, N+1, N+2: under, over and bad (NaN) colours
+        self._lut = np.concatenate([lut, lut[:1], lut[-1:], np.zeros((1, 4))])
+
+    def __call__(self, X):
+        xa = np.array(X, dtype=float)
+        mask_bad = np.isnan(xa)
+        with np.errstate(invalid='ignore'):
+            xa *= self.N
+            xa[xa < 0] = -1
+            xa[xa == self.N] = self.N - 1
+            np.clip(xa, -1, self.N, out=xa)
+            xa = xa.astype(int)
+        xa[xa > self.N - 1] = self.N + 1
+        xa[xa < 0] = self.N
+        xa[mask_bad] = self.N + 2
+        return self._lut.take(xa, axis=0, mode='clip')
+
+
+def content_hash(df):
+    digest = hashlib.sha1(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    digest.update('\0'.join(map(str, df.columns)).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def numeric_columns(df):
+    # The columns background_gradient colours when no subset is given
+    return list(df.select_dtypes(include=np.number).columns)
+
+
+def gradient_css(frames, cmap, subsets=None, text_color_threshold=0.408):
+    # Same output as Styler.background_gradient(axis=0, cmap=cmap, subset=...) for each frame,
+    # computed for every column of every frame at once. Returns one CSS DataFrame per frame.
+    if subsets is None:
+        subsets = [numeric_columns(df) for df in frames]
+    blocks = [df[subset].to_numpy(dtype=float) for df, subset in zip(frames, subsets)]
+    rows = max((len(block) for block in blocks), default=0)
+    # Pad every table to the same height with NaN so they share one array; NaN doesn't affect min/max
+    padded = np.full((rows, sum(block.shape[1] for block in blocks)), np.nan)
+    offset = 0
+    for block in blocks:
+        padded[:len(block), offset:offset + block.shape[1]] = block
+        offset += block.shape[1]
+
+    with warnings.catch_warnings(), np.errstate(invalid='ignore', divide='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        smin = np.nanmin(padded, axis=0)
+        smax = np.nanmax(padded, axis=0)
+        spread = smax - smin
+        # matplotlib's Normalize maps a constant column to 0
+        normed = np.where(spread > 0, (padded - smin) / np.where(spread > 0, spread, 1), 0.0)
+        normed[np.isnan(padded)] = np.nan
+    rgbas = cmap(normed)
+
+    rgb = rgbas[..., :3]
+    linear = np.where(rgb <= 0.04045, rgb / 12.92, ((rgb + 0.055) / 1.055) ** 2.4)
+    luminance = linear @ np.array([0.2126, 0.7152, 0.0722])
+    text_color = np.where(luminance < text_color_threshold, '#f1f1f1', '#000000').astype(object)
+    channels = _HEX[np.round(rgb * 255).astype(int)]
+    css = ('background-color: #' + channels[..., 0] + channels[..., 1] + channels[..., 2] +
+           ';color: ' + text_color + ';')
+
+    results = []
+    offset = 0
+    for df, subset, block in zip(frames, subsets, blocks):
+        width = block.shape[1]
+        results.append(pd.DataFrame(css[:len(block), offset:offset + width], index=df.index, columns=subset))
+        offset += width
+    return results
+
+
+def apply_css(styler, css):
+    # Attach precomputed cell CSS; Styler._compute() then just copies it
+    css = css.reindex(index=styler.data.index)
+    return styler.apply(lambda _: css, axis=None, subset=list(css.columns))
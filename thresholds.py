@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from cache import size_of
+
+# Hit rates ("how often does he get 27+ disposals?") for any thresholds, for
+# every player at once. GameMatrix packs a set of game logs into one NaN-padded
+# players x games array per stat, right-aligned so a player's latest game is
+# always the last column; a window is then a column slice, and a vector of
+# thresholds is a single broadcast comparison over all players.
+
+# How the averages tables name their threshold columns
+STAT_LABELS = {'D': lambda threshold: f'{threshold} Dis. %',
+               'G': lambda threshold: f'{threshold} Goal{"" if threshold == 1 else "s"} %',
+               'B': lambda threshold: f'{threshold} Behind{"" if threshold == 1 else "s"} %'}
+
+
+def parse_thresholds(text):
+    # '15, 20, 27' -> [15, 20, 27]; anything that isn't a whole number is skipped
+    thresholds = []
+    for part in text.replace(';', ',').split(','):
+        part = part.strip().rstrip('+')
+        if part.isdigit():
+            thresholds.append(int(part))
+    return sorted(set(thresholds))
+
+
+class GameMatrix:
+    def __init__(self, keys, matrices):
+        self.keys = keys
+        self.matrices = matrices
+        self._rows = {key: row for row, key in enumerate(keys)}
+
+    @classmethod
+    def from_logs(cls, logs_df, key_columns, stats=('D', 'G', 'B'), date_column='Date'):
+        if logs_df.empty:
+            return cls([], {stat: np.full((0, 0), np.nan) for stat in stats})
+        logs_df = logs_df.sort_values(key_columns + [date_column], kind='stable')
+        codes, uniques = pd.MultiIndex.from_frame(logs_df[key_columns]).factorize()
+        counts = np.bincount(codes, minlength=len(uniques))
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        width = int(counts.max()) if len(counts) else 0
+        # Game i of a player with n games goes to column width - n + i
+        columns = width - counts[codes] + (np.arange(len(codes)) - starts[codes])
+        matrices = {}
+        for stat in stats:
+            matrix = np.full((len(uniques), width), np.nan)
+            matrix[codes, columns] = logs_df[stat].to_numpy(dtype=float)
+            matrices[stat] = matrix
+        return cls(list(uniques), matrices)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def nbytes(self):
+        return size_of(self.matrices) + size_of(self.keys) + size_of(self._rows)
+
+    def rows(self, keys):
+        # Row numbers for keys, -1 where the key has no games
+        return np.array([self._rows.get(key, -1) for key in keys], dtype=int)
+
+    def hit_rates(self, stat, thresholds, window=None, rows=None):
+        # (games played, % of those games at or above each threshold) as arrays of shape (P,) and (P, T)
+        values = self.matrices[stat]
+        if rows is not None:
+            values = values[rows]
+        if window is not None:
+            values = values[:, -window:]
+        played = np.count_nonzero(~np.isnan(values), axis=1)
+        # NaN padding compares False, so it never counts as a hit
+        hits = np.count_nonzero(values[:, :, None] >= np.asarray(thresholds, dtype=float), axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rates = np.round(100 * hits / played[:, None])
+        return played, rates
+
+    def hit_rate_frame(self, keys, thresholds_by_stat, window=None, suffix=''):
+        # One row per key (in order; keys without games get 0 games and NaN rates)
+        rows = self.rows(keys)
+        found = rows >= 0
+        frame = {f'Games{suffix}': np.zeros(len(keys), dtype=int)}
+        for stat, thresholds in thresholds_by_stat.items():
+            played, rates = self.hit_rates(stat, thresholds, window, rows[found])
+            frame[f'Games{suffix}'][found] = played
+            for position, threshold in enumerate(thresholds):
+                column = np.full(len(keys), np.nan)
+                column[found] = rates[:, position]
+                frame[STAT_LABELS[stat](threshold) + suffix] = column
+        return pd.DataFrame(frame)
@@ -0,0 +1,146 @@
+import os
+import time
+import argparse
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from data_source import Entry, GitHubRestDataSource, MirrorDataSource
+from http_client import FetchClient
+from archive import load_catalog
+
+# Tree sync for a mirror of one of the GitHub repos. One recursive git-tree
+# request lists every path and blob SHA at a single commit; the mirror's
+# listings are all replaced from it, and only the blobs under the wanted
+# prefixes whose SHA differs from the mirror's manifest are downloaded, in
+# parallel. A refresh costs 2 requests (branch head + tree) plus one per changed
+# file, instead of one per directory and one per file through the contents API.
+#
+#   python tree_sync.py                 root files plus the current round
+#   python tree_sync.py --round 20 --round 19
+#
+# Rounds are found through the repo's catalog (see archive.py), so the same
+# round numbers work for the flat and the partitioned layout.
+
+# What one sync did: the commit, how many blobs it fetched and removed, and the API requests made
+SyncResult = namedtuple('SyncResult', ['commit', 'fetched', 'removed', 'requests'])
+# A repo at one commit: {file path: blob SHA}
+Snapshot = namedtuple('Snapshot', ['commit', 'blobs'])
+
+
+def tree_listings(elements):
+    # Directory listings, shaped like the contents API's, for every directory in a recursive tree
+    listings = {'': []}
+    for element in elements:
+        if element.type not in ('tree', 'blob'):
+            continue
+        parent, _, name = element.path.rpartition('/')
+        entry_type = 'dir' if element.type == 'tree' else 'file'
+        listings.setdefault(parent, []).append(Entry(name, element.path, entry_type, element.sha, element.size or 0))
+        if entry_type == 'dir':
+            listings.setdefault(element.path, [])
+    for entries in listings.values():
+        entries.sort(key=lambda entry: entry.name)
+    return listings
+
+
+def in_prefixes(path, prefixes, root_files):
+    # A prefix is a folder or a single file
+    if '/' not in path and root_files:
+        return True
+    return any(path == prefix or path.startswith(prefix + '/') for prefix in prefixes)
+
+
+class TreeSync:
+    def __init__(self, mirror, upstream=None, workers=8):
+        # upstream is a GitHub data source (the mirror's own by default)
+        self.mirror = mirror
+        self.upstream = upstream if upstream is not None else mirror.upstream
+        self.workers = workers
+
+    def snapshot(self, commit=None):
+        # Lists the whole repo at commit (default: the head of the default branch) and points the mirror at it
+        requests = 1
+        if commit is None:
+            commit = self.upstream.head_commit()
+            requests += 1
+        tree = self.upstream.git_tree(commit)
+        if tree.truncated:
+            raise RuntimeError(f"Git tree for {commit} is too large for one recursive request")
+        blobs = {element.path: element.sha for element in tree.elements if element.type == 'blob'}
+        self.mirror.replace_listings(tree_listings(tree.elements), commit)
+        # Mirrored files that no longer exist at this commit
+        removed = [path for path in list(self.mirror.manifest['files']) if path not in blobs]
+        for path in removed:
+            self.mirror.remove(path, save=False)
+        return Snapshot(commit, blobs), requests, len(removed)
+
+    def fetch(self, snapshot, prefixes=(), root_files=True):
+        # Downloads the wanted blobs the mirror doesn't already hold at the snapshot's SHA
+        files = self.mirror.manifest['files']
+        changed = [(path, sha) for path, sha in snapshot.blobs.items()
+                   if in_prefixes(path, prefixes, root_files) and
+                   (files.get(path) != sha or not os.path.exists(self.mirror.local._full_path(path)))]
+
+        def download(item):
+            path, sha = item
+            self.mirror.store(path, self.upstream.git_blob(sha), sha, save=False)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            list(pool.map(download, changed))
+        self.mirror.save_manifest()
+        return len(changed)
+
+    def sync(self, prefixes=(), root_files=True, commit=None):
+        snapshot, requests, removed = self.snapshot(commit)
+        fetched = self.fetch(snapshot, prefixes, root_files)
+        return SyncResult(snapshot.commit, fetched, removed, requests + fetched)
+
+    def sync_rounds(self, round_numbers=None, commit=None, prefixes=()):
+        # Root files first, so the rounds (the current one by default) and the season's own files come from
+        # the synced catalog
+        snapshot, requests, removed = self.snapshot(commit)
+        fetched = self.fetch(snapshot)
+        catalog = load_catalog(self.mirror)
+        year = catalog.current_year
+        season = catalog.season(year)
+        prefixes = list(prefixes) + [catalog.round_path(year, number)
+                                     for number in round_numbers or [catalog.current_round]]
+        prefixes += [path for path in (season.fixture, season.game_log) if path and '/' in path]
+        fetched += self.fetch(snapshot, prefixes, root_files=False)
+        return SyncResult(snapshot.commit, fetched, removed, requests + fetched)
+
+    def sync_current_round(self, commit=None):
+        return self.sync_rounds(commit=commit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sync a local mirror of a GitHub repo from one recursive git tree')
+    parser.add_argument('--repo', default='hermclane/AFL')
+    parser.add_argument('--mirror', help='mirror directory (default: .mirror/<repo name> next to the app)')
+    parser.add_argument('--round', type=int, action='append',
+                        help="round(s) of the current season to fetch (default: the current round)")
+    parser.add_argument('--prefix', action='append', default=[], help='other top-level folders to fetch')
+    parser.add_argument('--commit', help='sync to this commit instead of the branch head')
+    parser.add_argument('--workers', type=int, default=8)
+    args = parser.parse_args()
+
+    load_dotenv()
+    token = os.getenv('GITHUB_TOKEN2') if args.repo.endswith('AFLPlayerStatsRepo') else os.getenv('GITHUB_TOKEN')
+    upstream = GitHubRestDataSource(FetchClient(token=token, pool_size=args.workers), args.repo)
+    mirror_root = args.mirror or os.path.join(os.path.dirname(os.path.abspath(__file__)), '.mirror',
+                                              args.repo.split('/')[-1])
+    tree_sync = TreeSync(MirrorDataSource(upstream, mirror_root), workers=args.workers)
+
+    start = time.perf_counter()
+    if args.prefix and not args.round:
+        result = tree_sync.sync(args.prefix, commit=args.commit)
+    else:
+        result = tree_sync.sync_rounds(args.round, commit=args.commit, prefixes=args.prefix)
+    print(f"{mirror_root} @ {result.commit[:10]}: {result.fetched} fetched, {result.removed} removed, "
+          f"{result.requests} requests ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == '__main__':
+    main()